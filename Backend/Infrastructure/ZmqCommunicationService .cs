@@ -1,3 +1,5 @@
+using System.Buffers.Binary;
+using System.Text;
 using System.Text.Json;
 using Backend.Infrastructure.Interface;
 using NetMQ;
@@ -11,6 +13,12 @@ public class ZmqCommunicationService : BackgroundService
 
     private const string RovDataReceiverAddress = "tcp://127.0.0.1:5006";
 
+    // Binary autonomy packet (PythonScripts/rov_wire.py), little endian:
+    // version (u8), type (u8), flags (u16), seq (u32), capture timestamp (f64), 4 x axis (i16)
+    private const byte WireVersion = 1;
+    private const byte MsgAutonomy = 1;
+    private const int AutonomyPacketSize = 24;
+
     public ZmqCommunicationService(ICommandQueueService<Dictionary<string, object>> commandQueue, ILogger<ZmqCommunicationService> logger)
     {
         _logger = logger;
@@ -31,8 +39,16 @@ public class ZmqCommunicationService : BackgroundService
         {
             while (!stoppingToken.IsCancellationRequested)
             {
-                if (_rovDataReceiver.TryReceiveFrameString(out string message))
+                if (_rovDataReceiver.TryReceiveFrameBytes(out byte[]? frame))
                 {
+                    // JSON messages start with '{', which is never a valid binary version byte
+                    if (frame.Length > 0 && frame[0] != (byte)'{')
+                    {
+                        await EnqueueBinaryAutonomy(frame, stoppingToken);
+                        continue;
+                    }
+
+                    string message = Encoding.UTF8.GetString(frame);
                     _logger.LogDebug($"[ROV DATA] Received raw: {message}");
 
                     try
@@ -80,4 +96,33 @@ public class ZmqCommunicationService : BackgroundService
             _rovDataReceiver?.Dispose();
         }
     }
+
+    private async Task EnqueueBinaryAutonomy(byte[] frame, CancellationToken stoppingToken)
+    {
+        if (frame.Length != AutonomyPacketSize || frame[0] != WireVersion || frame[1] != MsgAutonomy)
+        {
+            _logger.LogWarning($"Received unknown binary message ({frame.Length} bytes, version {frame[0]})");
+            return;
+        }
+
+        var span = frame.AsSpan();
+        uint seq = BinaryPrimitives.ReadUInt32LittleEndian(span.Slice(4));
+        var payload = new int[4];
+        for (int i = 0; i < payload.Length; i++)
+        {
+            payload[i] = BinaryPrimitives.ReadInt16LittleEndian(span.Slice(16 + 2 * i));
+        }
+        _logger.LogDebug($"[ROV DATA] Received packet {seq}: [{string.Join(", ", payload)}]");
+
+        var command = new Dictionary<string, object>
+        {
+            { "autonom_data", payload }
+        };
+
+        var enqueued = await _commandQueue.EnqueueAsync(command, stoppingToken);
+        if (!enqueued)
+        {
+            _logger.LogWarning("Failed to enqueue autonom_data command.");
+        }
+    }
 }
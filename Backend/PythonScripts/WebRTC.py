@@ -1,96 +1,438 @@
 import asyncio
+import fractions
+import itertools
+import json
+import threading
 import time
+import uuid
+import weakref
 
+import aiortc
+import aiortc.sdp
+import cv2
 import numpy as np
-from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
-from av import VideoFrame
+from aiortc import RTCPeerConnection, RTCRtpSender, RTCSessionDescription, VideoStreamTrack
+from av import Packet, VideoFrame
 from aiohttp import web
 import aiohttp_cors
-import multiprocessing
+
+from frame_relay import FrameRelay
+from h264_passthrough import H264Passthrough
+from jpeg_cache import JpegCache
+from mode_registry import CAMERA_ORDER, cameras_for_mode, is_mosaic, is_passthrough, stream_flags
+from mosaic import MosaicRelay
+from shared_encoder import SharedH264Encoder, black_keyframe
+from stream_adaptation import ENCODER_BITRATE_LIMITS, MIN_BITRATE, TrackAdapter, split_budget
+
+
+# RTP video clock; frame pts are capture times on this clock
+VIDEO_CLOCK_RATE = 90000
+VIDEO_TIME_BASE = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+
+DEFAULT_BANDWIDTH_BUDGET = 8000000  # bits/s for all tracks of all peers together
+ADAPT_INTERVAL = 1.0  # Seconds between reading RTCP stats and adapting the tracks
+OVERLAY_MAX_BUFFERED = 65536  # Bytes queued on an overlay channel before its messages are dropped
+MJPEG_DEFAULT_FPS = 10
+MJPEG_MAX_FPS = 30
+MJPEG_BOUNDARY = "frame"
+
+# aiortc has no public accessor for a sender's encoder. Its private attribute is only used
+# on the aiortc versions it was checked on (the pinned 1.5 up to 1.15); on others the
+# encoder bitrate is left to aiortc and each track is budgeted at the codec maximum.
+PEER_ENCODER_ATTR = "_RTCRtpSender__encoder"
+PEER_ENCODER_VERSIONS = ((1, 5), (1, 15))
+AIORTC_VERSION = tuple(int(part) for part in aiortc.__version__.split(".")[:2])
+PEER_ENCODER_ACCESS = PEER_ENCODER_VERSIONS[0] <= AIORTC_VERSION <= PEER_ENCODER_VERSIONS[1]
+if not PEER_ENCODER_ACCESS:
+    print(f"[WebRTC] aiortc {aiortc.__version__} is not a checked version, track bitrates are not set")
+
+H264_MIME_TYPES = ("video/H264", "video/rtx")
+
+TRACK_ORDER = itertools.count()  # Older tracks keep streaming when the budget cannot cover all
+
+
+def restrict_video_codecs(sdp, mime_types):
+    """
+    The SDP with only the codecs in `mime_types` left in its video sections. rtx entries
+    whose apt points to a removed codec are dropped by aiortc's codec matching.
+    """
+    description = aiortc.sdp.SessionDescription.parse(sdp)
+    for media in description.media:
+        if media.kind == "video":
+            media.rtp.codecs = [codec for codec in media.rtp.codecs if codec.mimeType in mime_types]
+            media.fmt = [codec.payloadType for codec in media.rtp.codecs]
+    return str(description)
+
+
+def set_flag(flag, value):
+    if value:
+        flag.set()
+    else:
+        flag.clear()
+
+
+def parse_crop(crop):
+    """Validates a crop rectangle [x, y, width, height] in fractions of the frame. None means the whole frame."""
+    if crop is None:
+        return None
+    x, y, width, height = (float(value) for value in crop)
+    if not (0.0 <= x < 1.0 and 0.0 <= y < 1.0 and width > 0.0 and height > 0.0):
+        raise ValueError(f"crop {crop} is outside the frame")
+    return x, y, min(width, 1.0 - x), min(height, 1.0 - y)
 
 
 class WebRTCServer:
-    def __init__(self, frame_queues, mode_value):
+    def __init__(self, frame_queues, mode_value, encode_once=False, passthrough=False,
+                 bandwidth_budget=DEFAULT_BANDWIDTH_BUDGET, overlays=None):
         self.frame_queues = frame_queues
         self.mode_value = mode_value
         self.pcs = set()
-        self.active_flags = [multiprocessing.Value("b", False) for _ in frame_queues]
+        self.active_flags = [threading.Event() for _ in frame_queues]
+        self.relays = []  # One FrameRelay per frame queue, created on the server loop
+        # encode_once: one H.264 encoder per camera shared by all peers, instead of one per track
+        self.encode_once = encode_once
+        self.encoders = []
+        # passthrough: in PASSTHROUGH_MODES the ROV's own H.264 is forwarded, nothing is decoded
+        self.passthrough = passthrough
+        self.passthrough_flags = [threading.Event() for _ in frame_queues]
+        self.passthrough_relays = []
+        # Mosaic modes stream all their cameras composited into one extra (fifth) track
+        self.mosaic_flag = threading.Event()
+        self.mosaic_relay = None
+        self.mosaic_encoder = None
+        # Total video bitrate on the tether, shared by every track that is streaming
+        self.bandwidth_budget = bandwidth_budget
+        self.tracks = weakref.WeakSet()
+        self.peers = {}  # Peer id (returned by /connect) -> its tracks, for /roi
+        # Detection results (OverlayBus) go to every peer's "overlays" data channel
+        self.overlays = overlays
+        self.overlay_channels = set()
+        self.overlays_dropped = 0
+        self.loop = None
+        # JPEGs of the latest frames for /snapshot and /mjpeg, without a WebRTC session
+        self.snapshots = JpegCache(dict(zip(CAMERA_ORDER, frame_queues)))
+        self.stopping = False  # Ends MJPEG streams, the HTTP server waits for its handlers
+        self.epoch = time.time()
         self.server_runner = None
         self.server_site = None
 
+    def to_video_frame(self, frame, seq, timestamp, views=((None, 1.0),)):
+        """
+        Runs once per frame on the relay thread, the result is shared by every viewer:
+        {(crop, scale): VideoFrame} for every view a viewer asked for. Cropping and scaling
+        happen before the conversion, so a smaller stream is cheaper all the way down to the encoder.
+        """
+        return {(crop, scale): self.make_video_frame(frame, timestamp, scale, crop) for crop, scale in views}
+
+    def make_video_frame(self, frame, timestamp, scale=1.0, crop=None):
+        if crop is not None:
+            # A view into the full resolution frame, nothing is copied. Even offsets and sizes for 4:2:0
+            height, width = frame.shape[:2]
+            x, y, crop_width, crop_height = crop
+            left, top = int(x * width) & ~1, int(y * height) & ~1
+            crop_width = max(2, int(crop_width * width) & ~1)
+            crop_height = max(2, int(crop_height * height) & ~1)
+            frame = frame[top:top + crop_height, left:left + crop_width]
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            # Even sizes, the encoders work on 4:2:0
+            size = (max(2, int(width * scale) & ~1), max(2, int(height * scale) & ~1))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        # Single channel frames come from GRAY8 capture profiles
+        video_frame = VideoFrame.from_ndarray(frame, format="gray" if frame.ndim == 2 else "bgr24")
+        # Viewers must not set their own pts on a shared frame, so it carries the capture time
+        video_frame.pts = int((timestamp - self.epoch) * VIDEO_CLOCK_RATE)
+        video_frame.time_base = VIDEO_TIME_BASE
+        return video_frame
+
+    def start_relays(self):
+        loop = asyncio.get_event_loop()
+        names = CAMERA_ORDER[:len(self.frame_queues)]
+        if self.encode_once:
+            self.encoders = [SharedH264Encoder(name) for name in names]
+        for i, (name, frame_queue, active) in enumerate(zip(names, self.frame_queues, self.active_flags)):
+            if self.encode_once:
+                relay = FrameRelay(name, frame_queue, active, loop, self.encode_with(self.encoders[i]), replace_pending=False)
+            else:
+                relay = FrameRelay(name, frame_queue, active, loop, self.to_video_frame)
+            self.relays.append(relay)
+        if self.passthrough:
+            self.passthrough_relays = [
+                H264Passthrough(name, active, loop) for name, active in zip(names, self.passthrough_flags)]
+
+        rings = dict(zip(names, self.frame_queues))
+        if self.encode_once:
+            self.mosaic_encoder = SharedH264Encoder("Mosaic")
+            self.encoders.append(self.mosaic_encoder)
+            self.mosaic_relay = MosaicRelay(rings, self.mosaic_flag, loop, self.encode_with(self.mosaic_encoder))
+            self.mosaic_relay.replace_pending = False
+        else:
+            self.mosaic_relay = MosaicRelay(rings, self.mosaic_flag, loop, self.to_video_frame)
+
+    def encode_with(self, encoder):
+        def convert(frame, seq, timestamp, views):
+            # One stream for all viewers, adapted through the encoder bitrate only
+            return encoder.encode(self.make_video_frame(frame, timestamp))
+        return convert
+
+    def create_tracks(self, pc, video_sections):
+        """
+        One track per camera for a new peer, fed by the camera's decoded and passthrough relays,
+        plus the mosaic track if the offer has a video section left for it.
+        """
+        tracks = []
+        for i, relay in enumerate(self.relays):
+            subscription = relay.subscribe(depth=30)
+            if self.passthrough:
+                self.passthrough_relays[i].attach(subscription)
+            encoder = self.encoders[i] if self.encode_once else None
+            tracks.append(self.ProcessedFrameStream(subscription, encoder))
+        # Last track; aiortc cannot answer with more tracks than the offer has video sections
+        if video_sections > len(tracks):
+            tracks.append(self.ProcessedFrameStream(self.mosaic_relay.subscribe(depth=30), self.mosaic_encoder))
+        # Called after the offer is applied: addTrack() fills the offer's transceivers in m-line
+        # order, so m-line i carries camera i. Tracks added before the offer end up on the
+        # m-lines in reverse order with aiortc 1.5, whose offer matching keeps the last fit.
+        for track in tracks:
+            track.sender = pc.addTrack(track)
+            self.tracks.add(track)
+
+        if self.encode_once or self.passthrough:
+            # Tracks send ready-made H.264 packets, the peer has to use H.264. This answer's
+            # codecs were already restricted in the offer, the preference covers renegotiation
+            h264 = [codec for codec in RTCRtpSender.getCapabilities("video").codecs
+                    if codec.mimeType in H264_MIME_TYPES]
+            for transceiver in pc.getTransceivers():
+                if transceiver.sender.track in tracks:
+                    transceiver.setCodecPreferences(h264)
+        return tracks
+
+    def forward_overlay(self, message):
+        """OverlayBus listener, called on the task thread."""
+        if self.loop is not None and self.overlay_channels:
+            self.loop.call_soon_threadsafe(self.send_overlay, message)
+
+    def update_overlay_viewers(self):
+        """Tells the OverlayBus how many viewers there are and how many draw the overlays."""
+        if self.overlays is not None:
+            self.overlays.set_viewers(len(self.peers), len(self.overlay_channels))
+
+    def send_overlay(self, message):
+        # Same clock as the video frame pts, so the frontend can match overlay and frame
+        message["pts"] = int((message["timestamp"] - self.epoch) * VIDEO_CLOCK_RATE)
+        data = json.dumps(message, separators=(",", ":"))
+        for channel in list(self.overlay_channels):
+            if channel.readyState != "open":
+                continue
+            if channel.bufferedAmount > OVERLAY_MAX_BUFFERED:
+                self.overlays_dropped += 1  # Only the latest overlay matters, do not queue up on a slow link
+                continue
+            channel.send(data)
+
     class ProcessedFrameStream(VideoStreamTrack):
-        """ This is the inner class that processes the video frames and streams them """
-        def __init__(self, frame_queue, active_flag):
+        """
+        Streams one camera to one peer. Items are VideoFrames (encoded by aiortc) or lists
+        of H.264 av.Packets (from a SharedH264Encoder or the ROV passthrough), which aiortc
+        only packetizes. Packets are only useful from a keyframe on, so a new or lagging
+        viewer asks for one and skips ahead until it arrives.
+        """
+        def __init__(self, subscription, encoder=None):
             super().__init__()
-            self.frame_queue = frame_queue
-            self.active_flag = active_flag
+            self.subscription = subscription
+            self.encoder = encoder
+            self.pending = []
+            self.dropped = 0
+            self.need_keyframe = True
+            if encoder is not None:
+                encoder.request_keyframe()
             self.last_time = time.time()  # For FPS calculation
             self.frame_count = 0  # To count the number of frames
             self.fps = 0  # To store the calculated FPS
             self.first_frame_sent = False
-            self.black_frame = VideoFrame.from_ndarray(np.zeros((720, 1280, 3), dtype=np.uint8), format="bgr24")
+            self.sender = None
+            self.adapter = TrackAdapter()
+            self.bitrate_set = None
+            self.max_fps = None
+            self.last_sent = 0.0
+            self.paused = False  # No bitrate left in the budget for this track
+            self.packets = False  # Items are H.264 packets (shared encoder or passthrough)
+            self.order = next(TRACK_ORDER)
+
+        def black_frame(self):
+            if self.encoder is not None:
+                return black_keyframe()  # Keep the per-peer encoder unused
+            # Same size as the stream will have, so the encoder does not restart on the first frame
+            height, width = self.frame_shape()
+            scale = self.subscription.scale
+            size = (max(2, int(height * scale) & ~1), max(2, int(width * scale) & ~1))
+            black_frame = VideoFrame.from_ndarray(np.zeros(size + (3,), dtype=np.uint8), format="bgr24")
+            black_frame.pts = 0
+            black_frame.time_base = VIDEO_TIME_BASE
+            return black_frame
+
+        async def next_item(self):
+            while not self.pending:
+                item = await self.subscription.get()
+                self.packets = isinstance(item, list)
+                self.pending = list(item) if self.packets else [item]  # Lists are shared by all viewers
+                if self.subscription.dropped != self.dropped:
+                    # A packet stream is missing references now, resync on a keyframe
+                    self.dropped = self.subscription.dropped
+                    self.need_keyframe = True
+                    if self.encoder is not None:
+                        self.encoder.request_keyframe()
+            return self.pending.pop(0)
+
+        def streaming(self):
+            return self.readyState == "live" and any(relay.active.is_set() for relay in self.subscription.relays)
+
+        def frame_shape(self):
+            return self.subscription.relays[0].frame_shape or (720, 1280)
+
+        @property
+        def camera(self):
+            return self.subscription.relays[0].name
+
+        def set_crop(self, crop):
+            """
+            Streams only a region of the camera, cut from the full resolution frame. The bitrate
+            stays the one of the whole frame, so the region gets more detail.
+            """
+            if self.encoder is not None:
+                raise ValueError(f"{self.camera} shares one encoder with all viewers, it cannot be cropped per viewer")
+            self.subscription.crop = parse_crop(crop)
+            print(f"[WebRTC] {self.camera}: crop {self.subscription.crop}")
+
+        def peer_encoder(self):
+            """aiortc's encoder for this track (created on the first frame), None where it is not accessible."""
+            if not PEER_ENCODER_ACCESS:
+                return None
+            return getattr(self.sender, PEER_ENCODER_ATTR, None)
+
+        def bitrate_floor(self):
+            """The lowest bitrate this track can be held to, see split_budget()."""
+            if self.encoder is not None or self.packets:
+                return MIN_BITRATE  # Shared encoder bitrate is ours to set, passthrough is the ROV's
+            encoder = self.peer_encoder()
+            low, high = ENCODER_BITRATE_LIMITS.get(type(encoder).__name__, ENCODER_BITRATE_LIMITS["H264Encoder"])
+            return low if PEER_ENCODER_ACCESS else high
+
+        def pause(self, paused):
+            if paused != self.paused:
+                print(f"[ADAPT] {self.camera}: {'paused, over the bandwidth budget' if paused else 'resumed'}")
+                if not paused:
+                    self.need_keyframe = True  # A packet stream resumes on a keyframe
+                    if self.encoder is not None:
+                        self.encoder.request_keyframe()
+            self.paused = paused
+
+        def remb_estimate(self):
+            """The REMB bitrate, if a REMB message changed the encoder target since we last set it."""
+            encoder = self.peer_encoder()
+            bitrate = getattr(encoder, "target_bitrate", None)
+            if bitrate is None or bitrate == self.bitrate_set:
+                return None
+            return bitrate
+
+        def apply(self, scale, fps, bitrate):
+            self.subscription.scale = scale
+            self.max_fps = fps
+            encoder = self.peer_encoder()
+            if self.encoder is None and hasattr(encoder, "target_bitrate"):
+                encoder.target_bitrate = bitrate  # aiortc clamps it to its own limits
+                self.bitrate_set = encoder.target_bitrate
 
         async def recv(self):
+            # To send one black frame to frontend to mute the tracks as start status.
+            if not self.first_frame_sent:
+                self.first_frame_sent = True
+                return self.black_frame()  # Return the dummy frame to the track
+
+            # Waits without polling; inactive streams simply get no frames
             while True:
-                # To send one black frame to frontend to mute the tracks as start status.
-                if not self.first_frame_sent:
-                    self.first_frame_sent = True
-                    current_time = time.time()#
-
-                    pts, time_base = await self.next_timestamp()
-                    self.black_frame.pts = pts
-                    self.black_frame.time_base = time_base
-                    return self.black_frame  # Return the dummy frame to the track
-
-                if not self.active_flag.value:
-                    await asyncio.sleep(1)
-                    continue
-                current_time = time.time()
-            
-                if self.frame_queue.empty():
-                    await asyncio.sleep(0.01)
+                item = await self.next_item()
+                if self.paused:
                     continue
-
-                # Track the time before getting the frame
-                current_time = time.time()
-
-                pts, time_base = await self.next_timestamp()
-
-                frame = self.frame_queue.get()
-
-                # Calculate FPS (every 1 second)
-                self.frame_count += 1
-                time_diff = current_time - self.last_time
-
-                if time_diff >= 1.0:  # If 1 second has passed
-                    self.fps = self.frame_count / time_diff
-                    self.frame_count = 0 
-                    self.last_time = current_time
-                    print(f"FPS: {self.fps:.2f}")
-
-                video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
-                video_frame.pts = pts
-                video_frame.time_base = time_base
-
-                return video_frame
+                if isinstance(item, dict):
+                    now = time.monotonic()
+                    if self.max_fps and now - self.last_sent < 0.9 / self.max_fps:
+                        continue  # Frame rate reduced by adaptation
+                    self.last_sent = now
+                    # The requested view, or the closest one if the relay has not caught up yet
+                    crop, scale = self.subscription.view
+                    views = [view for view in item if view[0] == crop] or list(item)
+                    item = item[min(views, key=lambda view: abs(view[1] - scale))]
+                if not isinstance(item, Packet):
+                    self.need_keyframe = True  # aiortc's encoder continues, a later packet source restarts
+                    break
+                if not (self.need_keyframe and not item.is_keyframe):
+                    self.need_keyframe = False
+                    break
+
+            # Calculate FPS (every 1 second)
+            current_time = time.time()
+            self.frame_count += 1
+            time_diff = current_time - self.last_time
+
+            if time_diff >= 1.0:  # If 1 second has passed
+                self.fps = self.frame_count / time_diff
+                self.frame_count = 0
+                self.last_time = current_time
+                print(f"FPS: {self.fps:.2f}")
+
+            return item
+
+        def stop(self):
+            super().stop()
+            self.subscription.close()
 
     async def handle_peerjs_offer(self, request):
         """ Handles WebRTC offers from PeerJS clients """
         pc = RTCPeerConnection()
         self.pcs.add(pc)
+        peer_id = uuid.uuid4().hex
 
         try:
             data = await request.json()
 
-            offer = RTCSessionDescription(sdp=data["sdp"], type=data["type"])
+            sdp = data["sdp"]
+            if self.encode_once or self.passthrough:
+                # aiortc settles the codecs in setRemoteDescription(), before any track is added
+                sdp = restrict_video_codecs(sdp, H264_MIME_TYPES)
+            offer = RTCSessionDescription(sdp=sdp, type=data["type"])
             await pc.setRemoteDescription(offer)
 
+            # Attach the correct video streams, each viewer subscribes to the shared relays.
+            video_sections = sum(line.startswith("m=video") for line in sdp.splitlines())
+            tracks = self.create_tracks(pc, video_sections)
+            self.peers[peer_id] = tracks
+            self.update_overlay_viewers()
+
             print("[WebRTC] Received offer from PeerJS client")
 
-            # Attach the correct video streams
-            for i, queue in enumerate(self.frame_queues):
-                track = self.ProcessedFrameStream(queue, self.active_flags[i])
-                pc.addTrack(track)
+            @pc.on("datachannel")
+            def on_datachannel(channel):
+                # The viewer opens it; messages are JSON, one per analysed frame
+                if channel.label == "overlays":
+                    self.overlay_channels.add(channel)
+                    self.update_overlay_viewers()
+
+                    @channel.on("close")
+                    def on_close():
+                        self.overlay_channels.discard(channel)
+                        self.update_overlay_viewers()
+                # Any channel of the peer also takes requests, e.g. {"type": "roi", ...}
+                channel.on("message", lambda message: self.handle_channel_message(tracks, message))
+
+            @pc.on("connectionstatechange")
+            async def on_connectionstatechange():
+                if pc.connectionState in ("failed", "closed"):
+                    for track in tracks:
+                        track.stop()  # Unsubscribes from the relay
+                    self.pcs.discard(pc)
+                    self.peers.pop(peer_id, None)
+                    self.update_overlay_viewers()
+                    await pc.close()
 
             # Create an SDP answer and send it back
             answer = await pc.createAnswer()
@@ -99,15 +441,110 @@ class WebRTCServer:
             print("[WebRTC] Sending Answer to PeerJS Client")
             return web.json_response({
                 "sdp": pc.localDescription.sdp,
-                "type": pc.localDescription.type
+                "type": pc.localDescription.type,
+                "peer": peer_id  # Identifies this connection to /roi
             })
 
         except Exception as e:
             print(f"[Error] WebRTC handling failed: {e}")
+            self.pcs.discard(pc)
+            self.peers.pop(peer_id, None)
+            self.update_overlay_viewers()
+            await pc.close()
             return web.Response(status=500)
 
-        finally:
-            self.pcs.discard(pc)
+    def set_roi(self, tracks, request):
+        """Applies {"camera": name, "crop": [x, y, width, height] or null} to the peer's track of that camera."""
+        for track in tracks:
+            if track.camera == request.get("camera"):
+                track.set_crop(request.get("crop"))
+                return
+        raise ValueError(f"no track for camera {request.get('camera')}")
+
+    def handle_channel_message(self, tracks, message):
+        try:
+            request = json.loads(message)
+            if request.get("type") == "roi":
+                self.set_roi(tracks, request)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"[WebRTC] Invalid data channel request: {e}")
+
+    async def handle_roi(self, request):
+        """ Sets the crop of one of a peer's tracks: {"peer": id from /connect, "camera": name, "crop": [...]} """
+        try:
+            data = await request.json()
+            tracks = self.peers.get(data.get("peer"))
+            if tracks is None:
+                return web.json_response({"error": "unknown peer"}, status=404)
+            self.set_roi(tracks, data)
+        except (ValueError, TypeError, AttributeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"camera": data["camera"], "crop": data.get("crop")})
+
+    def snapshot_etag(self, seq):
+        # Ring sequence numbers start over with the server, the epoch keeps old ETags from matching
+        return f'"{int(self.epoch)}-{seq}"'
+
+    async def handle_snapshot(self, request):
+        """ Latest frame of a camera as JPEG; answers 304 while the client's copy is still the newest """
+        name = request.match_info["camera"]
+        if name not in self.snapshots.rings:
+            return web.json_response({"error": f"unknown camera {name}"}, status=404)
+
+        ring = self.snapshots.rings[name]
+        etag = self.snapshot_etag(ring.write_seq)
+        if_none_match = request.headers.get("If-None-Match", "")
+        if ring.write_seq and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return web.Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        snapshot = await self.snapshots.latest(name)
+        if snapshot is None:
+            return web.json_response({"error": f"no frame from {name} yet"}, status=503)
+        seq, timestamp, jpeg = snapshot
+        return web.Response(body=jpeg, content_type="image/jpeg", headers={
+            "ETag": self.snapshot_etag(seq),
+            "Cache-Control": "no-cache",  # Always revalidate, a new frame is likely
+            "X-Frame-Seq": str(seq),
+            "X-Capture-Time": f"{timestamp:.6f}",
+        })
+
+    async def handle_mjpeg(self, request):
+        """ multipart/x-mixed-replace JPEG stream of a camera, at most ?fps= frames per second """
+        name = request.match_info["camera"]
+        if name not in self.snapshots.rings:
+            return web.json_response({"error": f"unknown camera {name}"}, status=404)
+        try:
+            fps = min(MJPEG_MAX_FPS, max(0.1, float(request.query.get("fps", MJPEG_DEFAULT_FPS))))
+        except ValueError:
+            return web.json_response({"error": "fps must be a number"}, status=400)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+        period = 1.0 / fps
+        last_seq = None
+        try:
+            while not self.stopping and request.transport is not None and not request.transport.is_closing():
+                started = time.monotonic()
+                snapshot = await self.snapshots.latest(name)
+                if snapshot is not None and snapshot[0] != last_seq:  # Nothing is sent while the camera is idle
+                    last_seq, _, jpeg = snapshot
+                    await response.write(
+                        f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                        + jpeg + b"\r\n")
+                await asyncio.sleep(max(0.0, period - (time.monotonic() - started)))
+        except ConnectionResetError:
+            pass  # Client went away
+        return response
+
+    async def handle_mosaic_layout(self, request):
+        """ Where each camera is inside the mosaic track, so the frontend can label and crop tiles """
+        layout = self.mosaic_relay.layout()
+        layout["active"] = self.mosaic_flag.is_set()
+        layout["cameras"] = list(cameras_for_mode(self.mode_value.value)) if layout["active"] else []
+        return web.json_response(layout)
 
     async def start_peer_server(self):
         """ Starts the aiohttp web server for handling PeerJS signaling requests """
@@ -123,6 +560,10 @@ class WebRTCServer:
         })
 
         app.router.add_post("/connect", self.handle_peerjs_offer)
+        app.router.add_get("/mosaic/layout", self.handle_mosaic_layout)
+        app.router.add_post("/roi", self.handle_roi)
+        app.router.add_get("/snapshot/{camera}", self.handle_snapshot)
+        app.router.add_get("/mjpeg/{camera}", self.handle_mjpeg)
 
         # Enable CORS for the route
         for route in list(app.router.routes()):
@@ -145,42 +586,78 @@ class WebRTCServer:
             if current_mode != prev_mode:
                 print(f"[WebRTC] Mode changed to: {current_mode}")
 
-                # Update active flags for video streams based on mode
-                mode_configs = {
-                    0: [False, False, False, False],  # Disable all
-                    1: [False, False, True, True],  # Manual mode
-                    2: [False, False, True, True],  # Docking
-                    3: [False, False, False, True],  # Pipeline
-                    4: [True, True, True, False],  # Seagrass
-                    5: [True, True, True, True],  # All cameras
-                    6: [True, False, True, False]  # Test mode
-                }
-                # What each index represents:
-                #[stereo_left_queue, stereo_right_queue, down_queue, manipulator_queue]
-
-                for i in range(len(self.active_flags)):
-                    self.active_flags[i].value = mode_configs.get(current_mode, [False] * len(self.active_flags))[i]
+                # Same camera set the TaskManager opened for this mode, in CAMERA_ORDER:
+                # [stereo_left_queue, stereo_right_queue, down_queue, manipulator_queue]
+                use_passthrough = self.passthrough and is_passthrough(current_mode)
+                for i, active in enumerate(stream_flags(current_mode)):
+                    set_flag(self.active_flags[i], active and not use_passthrough)
+                    set_flag(self.passthrough_flags[i], active and use_passthrough)
+                set_flag(self.mosaic_flag, is_mosaic(current_mode))
 
                 prev_mode = current_mode
 
-            await asyncio.sleep(1)
+            await asyncio.sleep(0.1)
+
+    async def adapt_streams(self):
+        """
+        Adapts every streaming track to its link (RTCP loss, RTT and REMB) while keeping
+        the sum of all track bitrates within the bandwidth budget.
+        """
+        while True:
+            await asyncio.sleep(ADAPT_INTERVAL)
+            tracks = [track for track in list(self.tracks) if track.sender is not None and track.streaming()]
+            if not tracks:
+                continue
+            tracks.sort(key=lambda track: track.order)
+            allowances = split_budget(self.bandwidth_budget, [track.bitrate_floor() for track in tracks])
+            for track, allowance in zip(tracks, allowances):
+                track.pause(allowance is None)
+                if allowance is None:
+                    continue
+                try:
+                    report = await track.sender.getStats()
+                except Exception as e:
+                    print(f"[WebRTC] Could not read stats: {e}")
+                    continue
+                track.adapter.update(report, track.remb_estimate())
+                track.apply(*track.adapter.choose(allowance, track.frame_shape()))
+
+            # A shared encoder can only send one stream, sized for its weakest viewer
+            for encoder in self.encoders:
+                bitrates = [track.adapter.bitrate for track in tracks if track.encoder is encoder and not track.paused]
+                if bitrates:
+                    encoder.set_bitrate(min(bitrates))
 
     async def main(self):
         """ Starts the WebRTC server and mode watching concurrently """
+        self.loop = asyncio.get_event_loop()
+        self.start_relays()
+        if self.overlays is not None:
+            self.overlays.add_listener(self.forward_overlay)
         await asyncio.gather(
             self.start_peer_server(),  # Start the signaling server
-            self.watch_mode_and_update_streams() # Watch and update streams based on mode
+            self.watch_mode_and_update_streams(), # Watch and update streams based on mode
+            self.adapt_streams()  # Fit the streams to the tether
         )
 
     async def shutdown(self):
         """ Shutdown the WebRTC server and clean up resources """
         print("[WebRTC] Shutting down...")
+        self.stopping = True
+
+        if self.overlays is not None:
+            self.overlays.remove_listener(self.forward_overlay)
+        self.overlay_channels.clear()
 
         # Close active WebRTC connections gracefully
         tasks = [pc.close() for pc in self.pcs]
         self.pcs.clear()  # Clear the set of peer connections
         await asyncio.gather(*tasks)  # Ensure all peer connections are closed
 
+        for relay in self.relays + self.passthrough_relays + [self.mosaic_relay]:
+            if relay is not None:
+                relay.stop()
+
         # Stop the HTTP server on port 9001
         if self.server_site:
             print("[WebRTC] Stopping HTTP server on port 9001...")
@@ -190,6 +667,8 @@ class WebRTCServer:
             print("[WebRTC] Cleaning up the HTTP server runner...")
             await self.server_runner.cleanup()  # Cleanup the server runner
 
+        self.snapshots.close()  # After the server, MJPEG clients may still be encoding until then
+
         print("[WebRTC] Shutdown complete.")
 
     def run(self):
@@ -0,0 +1,71 @@
+"""
+Cost of one autonomy packet on the ZMQ PUSH channel, JSON vs. the rov_wire binary format.
+
+Times encode and decode of a packet in each format (decode stands in for what the
+receiver does), then sends packets through a PUSH/PULL pair on localhost.
+
+    python benchmarks/rov_wire_encoding.py --packets 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import zmq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from rov_wire import decode, encode_autonomy, encode_autonomy_json  # noqa: E402
+
+DRIVE = [10.0, -3.4, 1.6, 9.0, 0, 0, 0, 0]
+
+
+def encoders():
+    return {
+        "json": lambda seq: encode_autonomy_json(DRIVE),
+        "binary": lambda seq: encode_autonomy(DRIVE, seq, time.time()),
+    }
+
+
+def time_per_packet(function, packets):
+    start = time.perf_counter()
+    for seq in range(packets):
+        function(seq)
+    return (time.perf_counter() - start) / packets * 1e6
+
+
+def round_trip(encode, packets, port):
+    """Packets per second through a PUSH/PULL pair, including encode and decode."""
+    context = zmq.Context()
+    pull = context.socket(zmq.PULL)
+    pull.bind(f"tcp://127.0.0.1:{port}")
+    push = context.socket(zmq.PUSH)
+    push.connect(f"tcp://127.0.0.1:{port}")
+    time.sleep(0.2)  # Let the connection come up
+    start = time.perf_counter()
+    for seq in range(packets):
+        push.send(encode(seq))
+        decode(pull.recv())
+    elapsed = time.perf_counter() - start
+    push.close()
+    pull.close()
+    context.term()
+    return packets / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=15006)
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'bytes':>6} {'encode us':>10} {'decode us':>10} {'round trip/s':>13}")
+    for name, encode in encoders().items():
+        message = encode(1)
+        encode_us = time_per_packet(encode, args.packets)
+        decode_us = time_per_packet(lambda seq: decode(message), args.packets)
+        rate = round_trip(encode, args.packets // 10, args.port)
+        print(f"{name:>8} {len(message):>6} {encode_us:>10.2f} {decode_us:>10.2f} {rate:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
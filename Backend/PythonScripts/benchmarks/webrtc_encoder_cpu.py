@@ -0,0 +1,81 @@
+"""
+CPU cost of extra WebRTC viewers, per-peer encoding vs. SharedH264Encoder.
+
+Runs the encode/packetize work aiortc does for each viewer, without a network:
+per-peer mode gives every viewer its own aiortc H264Encoder, shared mode encodes
+once and only packetizes (H264Encoder.pack) per viewer. The shared encoder runs
+x264 with the veryfast preset, so compare how each column grows with viewers
+rather than the one-viewer row.
+
+    python benchmarks/webrtc_encoder_cpu.py --viewers 1 2 3 4 --frames 150
+"""
+import argparse
+import fractions
+import os
+import sys
+import time
+
+import numpy as np
+from aiortc.codecs.h264 import H264Encoder
+from av import VideoFrame
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from shared_encoder import SharedH264Encoder  # noqa: E402
+
+TIME_BASE = fractions.Fraction(1, 90000)
+
+
+def make_frames(count, width, height):
+    """Moving noise pattern, hard enough to encode that the numbers mean something."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width * 2, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        shift = (i * 8) % width
+        frame = VideoFrame.from_ndarray(np.ascontiguousarray(base[:, shift:shift + width]), format="bgr24")
+        frame.pts = i * 3000
+        frame.time_base = TIME_BASE
+        frames.append(frame)
+    return frames
+
+
+def per_peer(frames, viewers):
+    encoders = [H264Encoder() for _ in range(viewers)]
+    for frame in frames:
+        for encoder in encoders:
+            encoder.encode(frame)
+
+
+def shared(frames, viewers):
+    encoder = SharedH264Encoder("Bench", bitrate=H264Encoder().target_bitrate)
+    packers = [H264Encoder() for _ in range(viewers)]
+    for frame in frames:
+        for packet in encoder.encode(frame):
+            for packer in packers:
+                packer.pack(packet)
+
+
+def cpu_ms_per_frame(run, frames, viewers):
+    start = time.process_time()
+    run(frames, viewers)
+    return (time.process_time() - start) * 1000.0 / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--size", default="1280x720")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    frames = make_frames(args.frames, width, height)
+    print(f"{args.frames} frames at {width}x{height}, CPU ms per frame (all viewers together)")
+    print(f"{'viewers':>8} {'per-peer':>10} {'shared':>10}")
+    for viewers in args.viewers:
+        print(f"{viewers:>8} {cpu_ms_per_frame(per_peer, frames, viewers):>10.2f} "
+              f"{cpu_ms_per_frame(shared, frames, viewers):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,19 @@ import time
 from camerafeed.Main_Classes.autonomous_transect_main import AutonomousTransect
 from camerafeed.Main_Classes.grass_monitor_main import SeagrassMonitor
 from camerafeed.Main_Classes.autonomous_docking_main import AutonomousDocking
+from camerafeed.frame_sources import open_source, CAMERA_SOURCES
+from camerafeed.gst_pipeline import build_camera_feed, capture_profile, record_location, CAMERA_PORTS
+from camerafeed.camera_supervisor import CameraSupervisor
+from camerafeed.recorder import VideoRecorder
+from camerafeed.snapshot import SnapshotService
+from camerafeed.buffer_pool import FRAME_POOLS
+from frame_ring import FrameRingBuffer
+from control_scheduler import ControlScheduler, DEFAULT_RATE
+from mode_registry import (
+    MODE_ALL_CAMERAS, MODE_DOCKING, MODE_MANUAL, MODE_MOSAIC, MODE_NONE, MODE_PIPELINE, MODE_TEST,
+    CAMERA_ORDER, cameras_for_mode, capture_profile_for_mode, is_passthrough)
 import cv2
-import multiprocessing
-import datetime
+import os
 import random
 
 
@@ -15,49 +25,469 @@ Y_AKSE = 0
 Z_AKSE = 6
 R_AKSE = 2
 
-GST_FEED_STEREO_L = "-v udpsrc multicast-group=224.1.1.1 auto-multicast=true port=5000 buffer-size=2097152 ! application/x-rtp, media=video, clock-rate=90000, encoding-name=H264, payload=96 ! queue max-size-buffers=10 leaky=downstream ! rtph264depay ! h264parse ! decodebin ! videoconvert ! appsink sync=false"
-GST_FEED_STEREO_R = "-v udpsrc multicast-group=224.1.1.1 auto-multicast=true port=5001 buffer-size=2097152 ! application/x-rtp, media=video, clock-rate=90000, encoding-name=H264, payload=96 ! queue max-size-buffers=10 leaky=downstream ! rtph264depay ! h264parse ! decodebin ! videoconvert ! appsink sync=false"
-GST_FEED_DOWN = "-v udpsrc multicast-group=224.1.1.1 auto-multicast=true port=5002 buffer-size=2097152 ! application/x-rtp, media=video, clock-rate=90000, encoding-name=H264, payload=96 ! queue max-size-buffers=15 leaky=downstream ! rtph264depay ! h264parse ! decodebin ! videoconvert ! appsink sync=false"
-GST_FEED_MANIPULATOR = "-v udpsrc multicast-group=224.1.1.1 auto-multicast=true port=5003 buffer-size=2097152 ! application/x-rtp, media=video, clock-rate=90000, encoding-name=H264, payload=96 ! queue max-size-buffers=15 leaky=downstream ! rtph264depay ! h264parse ! decodebin ! videoconvert ! appsink sync=false"
+GST_FEED_STEREO_L = build_camera_feed("StereoL")
+GST_FEED_STEREO_R = build_camera_feed("StereoR")
+GST_FEED_DOWN = build_camera_feed("Down")
+GST_FEED_MANIPULATOR = build_camera_feed("Manipulator")
 
 
 class Camera:
-    def __init__(self, name, gst_feed=None):
+    RECONNECT_MIN_DELAY = 0.5  # Seconds before the first reconnect attempt
+    RECONNECT_MAX_DELAY = 8.0
+
+    def __init__(self, name, gst_feed=None, profile=None):
         self.name = name  # Name of camera
         self.gst = gst_feed  # Gstreamer feed
-
-    def get_frame(self):
-        ret, frame = self.cam.read()
-        if not ret:
-            print("Error reading frame")
-            return
+        self.profile = profile  # CaptureProfile the feed was built with
+        self.recording = None  # (output_dir, segment_seconds) while the feed tees H.264 into files
+        self.cam = None
+
+        # Latest-frame slot, written by the capture thread
+        self.frame = None
+        self.pooled = None  # PooledFrame holding self.frame
+        self.pool = None  # FramePool for the current resolution
+        self.frame_seq = 0  # Increases by one for every captured frame
+        self.frame_time = 0.0  # Capture timestamp of self.frame
+        self.frame_ready = threading.Condition()
+        self.capturing = False
+        self.capture_thread = None
+        self.reader = threading.local()  # Last sequence number and frame lease of each consumer thread
+        self.listeners = []  # Called with (frame, seq, timestamp) from the capture thread
+
+        # Health, see health()
+        self.state = "closed"  # closed, streaming, stalled, reconnecting
+        self.connected_since = 0.0
+        self.reconnects = 0
+        self.stalls = 0
+        self.reconnect_delay = self.RECONNECT_MIN_DELAY
+        self.stop_event = threading.Event()
+        self.stall_event = threading.Event()  # Set by the supervisor, handled by the capture thread
+
+    def get_frame(self, wait_for_new=True, timeout=1.0):
+        """
+        Returns the freshest frame, optionally waiting for one the caller has not seen yet.
+
+        The frame is a pooled buffer shared with every other consumer (streams, snapshots,
+        recorder), so it is read-only; draw on a copy. It stays valid until the same thread
+        calls get_frame again.
+        """
+        frame, _, _ = self.get_frame_info(wait_for_new, timeout)
         return frame
 
-    def open_cam(self):
-        if self.gst is None:
-            self.cam = cv2.VideoCapture(0)
-            if not self.isOpened:
-                print(f"Error opening camera {self.name}")
-                return False
-            print(f"{self.name} Camera opened")
-            return True
-        else:
-            self.cam = cv2.VideoCapture(self.gst, cv2.CAP_GSTREAMER)
-            if not self.isOpened:
-                print("Error opening camera")
-                return False
-            print(f"{self.name} Camera opened")
-            return True
+    def get_frame_info(self, wait_for_new=True, timeout=1.0):
+        """Returns (frame, sequence number, capture timestamp)."""
+        last_seq = getattr(self.reader, "seq", 0)
+        previous_lease = getattr(self.reader, "lease", None)
+        self.reader.lease = None
+        with self.frame_ready:
+            if wait_for_new:
+                # Blocks while the camera is down instead of letting the caller spin. Only a
+                # capture stopping during the wait ends it early, a camera that is not
+                # capturing (yet) is waited for like any other.
+                was_capturing = self.capturing
+                self.frame_ready.wait_for(
+                    lambda: self.frame_seq > last_seq or (was_capturing and not self.capturing), timeout)
+                if self.frame_seq <= last_seq:
+                    if self.state == "streaming":
+                        print(f"{self.name}: Error reading frame")
+                    result = None, last_seq, self.frame_time
+            if not wait_for_new or self.frame_seq > last_seq:
+                self.reader.seq = self.frame_seq
+                if self.pooled is not None:
+                    self.reader.lease = self.pooled.acquire()
+                result = self.frame, self.frame_seq, self.frame_time
+        if previous_lease is not None:
+            previous_lease.release()  # The caller is done with the frame it got last time
+        return result
+
+    def borrow_frame(self):
+        """
+        Returns (PooledFrame, seq, timestamp) for the current frame without waiting.
+        The caller must release() the PooledFrame when done with it.
+        """
+        with self.frame_ready:
+            pooled = self.pooled.acquire() if self.pooled is not None else None
+            return pooled, self.frame_seq, self.frame_time
+
+    def read_pooled(self, read):
+        """Calls read(image) with a buffer from the frame pool. Returns a PooledFrame or None."""
+        pooled = self.pool.acquire() if self.pool is not None else None
+        ok, frame = read(pooled.array if pooled is not None else None)
+        if not ok or frame is None:
+            if pooled is not None:
+                pooled.release()
+            return None
+        if pooled is not None and frame is pooled.array:
+            return pooled
+        # First frame, or the resolution changed: OpenCV allocated the frame itself
+        if pooled is not None:
+            pooled.release()
+        self.pool = FRAME_POOLS.get(frame.shape, frame.dtype)
+        return self.pool.adopt(frame)
+
+    def capture_loop(self):
+        """Grabs frames continuously so get_frame never waits on decode."""
+        while self.capturing:
+            pooled = self.read_pooled(self.cam.read) if self.cam is not None else None
+            timestamp = time.time()
+            if self.stall_event.is_set():
+                self.stall_event.clear()
+                if pooled is not None:
+                    self.state = "streaming"  # Frames came back on their own
+            if pooled is None:
+                if self.capturing:
+                    self.recover()
+                continue
+            self.publish_frame(pooled, timestamp)
+
+    def publish_frame(self, pooled, timestamp):
+        """
+        Stores a new PooledFrame in the latest-frame slot (taking over its reference)
+        and wakes up waiting consumers.
+        """
+        # Listeners copy the frame before any consumer can draw on it
+        for listener in self.listeners:
+            listener(pooled.array, self.frame_seq + 1, timestamp)
+        with self.frame_ready:
+            previous = self.pooled
+            self.pooled = pooled
+            self.frame = pooled.array
+            self.frame_seq += 1
+            self.frame_time = timestamp
+            self.reconnect_delay = self.RECONNECT_MIN_DELAY
+            self.frame_ready.notify_all()
+        if previous is not None:
+            previous.release()
+
+    def add_listener(self, callback):
+        """Registers a callback for every new frame. It runs on the capture thread and must not block."""
+        self.listeners = self.listeners + [callback]
+
+    def remove_listener(self, callback):
+        self.listeners = [listener for listener in self.listeners if listener != callback]
+
+    def recover(self):
+        """Waits with exponential back-off, then reopens the capture."""
+        self.state = "reconnecting"
+        print(f"{self.name}: Error reading frame, reconnecting in {self.reconnect_delay:.1f}s")
+        if self.stop_event.wait(self.reconnect_delay):
+            return False
+        self.reconnect_delay = min(self.reconnect_delay * 2, self.RECONNECT_MAX_DELAY)
+
+        old_cam, self.cam = self.cam, None
+        if old_cam is not None:
+            old_cam.release()
+        cam = open_source(self.name, self.current_feed(), self.profile)
+        if not cam.isOpened():
+            return False
+        self.cam = cam
+        self.reconnects += 1
+        self.connected_since = time.time()
+        self.state = "streaming"
+        print(f"{self.name}: Reconnected ({self.reconnects} reconnects)")
+        return True
+
+    def mark_stalled(self):
+        """
+        Called by the supervisor. The capture is not released here, that is unsafe while
+        the capture thread may be inside read(): the read times out (see open_gstreamer)
+        and the capture thread reconnects itself.
+        """
+        self.state = "stalled"
+        self.stalls += 1
+        self.stall_event.set()
+
+    def frame_age(self):
+        """Seconds since the last frame (or since (re)connecting if none arrived yet)."""
+        return time.time() - max(self.frame_time, self.connected_since)
+
+    def health(self):
+        now = time.time()
+        return {
+            "state": self.state,
+            "uptime": now - self.connected_since if self.state == "streaming" else 0.0,
+            "reconnects": self.reconnects,
+            "stalls": self.stalls,
+            "last_frame_age": self.frame_age() if self.frame_seq else None,
+            "frames": self.frame_seq,
+        }
+
+    def start_capture(self):
+        self.stop_event.clear()
+        self.capturing = True
+        self.capture_thread = threading.Thread(
+            target=self.capture_loop, name=f"Capture-{self.name}", daemon=True)
+        self.capture_thread.start()
+
+    def stop_capture(self):
+        self.stop_event.set()
+        with self.frame_ready:
+            self.capturing = False
+            self.frame_ready.notify_all()  # Wake up consumers waiting for a frame
+        if self.capture_thread is not None and self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout=1.0)
+        self.capture_thread = None
+
+    def current_feed(self):
+        """
+        The pipeline to open. While recording, it is rebuilt with a new file pattern
+        on every (re)open so the restarted splitmuxsink does not overwrite the
+        segments recorded before.
+        """
+        if self.recording is not None:
+            output_dir, segment_seconds = self.recording
+            self.gst = build_camera_feed(
+                self.name,
+                self.profile,
+                record_location=record_location(self.name, output_dir),
+                segment_seconds=segment_seconds)
+        return self.gst
+
+    def open_cam(self, start_capture=True):
+        # Live GStreamer feed unless another source is configured for this camera name
+        self.cam = open_source(self.name, self.current_feed(), self.profile)
+        if not self.isOpened:
+            print(f"Error opening camera {self.name}")
+            self.cam = None
+            if start_capture:
+                # The capture thread keeps retrying with back-off, see recover()
+                self.state = "reconnecting"
+                self.stop_event.clear()
+                self.start_capture()
+            return False
+        print(f"{self.name} Camera opened")
+        self.state = "streaming"
+        self.connected_since = time.time()
+        self.stop_event.clear()
+        if start_capture:
+            self.start_capture()
+        return True
+
+    def reopen(self, gst_feed):
+        """Restarts the capture on a new pipeline. Frames pause until the new pipeline delivers."""
+        restart_thread = self.capture_thread is not None
+        self.stop_capture()
+        if self.cam is not None:
+            self.cam.release()
+        self.gst = gst_feed
+        return self.open_cam(start_capture=restart_thread)
 
     def release_cam(self):
-        self.cam.release()
+        self.stop_capture()
+        self.state = "closed"
+        with self.frame_ready:
+            previous, self.pooled = self.pooled, None  # Leases held by consumers stay valid
+        if previous is not None:
+            previous.release()
+        if self.cam is not None:
+            self.cam.release()
 
     @property
     def isOpened(self):
-        return self.cam.isOpened()
+        return self.cam is not None and self.cam.isOpened()
+
+
+class StereoCamera:
+    """
+    Captures StereoL and StereoR as time-paired frames.
+
+    Both streams are grab()'ed before either is retrieve()'d, so the decode of
+    one side does not delay the other. Frames are paired by their buffer PTS,
+    mapped to wall-clock time per stream, so the skew is the capture skew and
+    not the time between two grab calls. The side that is behind is grabbed
+    again while its lag exceeds `tolerance` (default: half the measured frame
+    period), which pairs every frame with its nearest neighbour on the other
+    side. A pair still outside the tolerance after `max_resync` grabs is
+    published anyway and counted as unpaired; its skew is in the stats.
+    """
+
+    DEFAULT_PERIOD = 1.0 / 30  # Frame period assumed until it has been measured
+
+    def __init__(self, left: Camera, right: Camera, tolerance=None, use_pts=True, max_resync=10):
+        self.left = left
+        self.right = right
+        self.fixed_tolerance = tolerance  # Seconds, None = half the frame period
+        self.use_pts = use_pts  # False pairs on grab time, for sources without timestamps
+        self.max_resync = max_resync
+        self.period = self.DEFAULT_PERIOD
+        self.pts_base = {}  # Camera name -> wall-clock time of its PTS 0
+        self.last_time = {}  # Camera name -> time of the last grabbed frame
+
+        self.pair = None
+        self.pair_seq = 0
+        self.pair_time = 0.0
+        self.skew = 0.0
+        self.dropped_left = 0
+        self.dropped_right = 0
+        self.dropped_pairs = 0
+        self.unpaired = 0
+        self.pair_ready = threading.Condition()
+        self.capturing = False
+        self.capture_thread = None
+        self.reader = threading.local()
+
+    @property
+    def tolerance(self):
+        if self.fixed_tolerance is not None:
+            return self.fixed_tolerance
+        return self.period / 2.0
+
+    def grab_time(self, cam: Camera):
+        """
+        Capture time of the frame just grabbed. The PTS of each stream counts from its
+        own pipeline start; the smallest (grab time - PTS) seen so far, the grab with
+        the least delay, maps it onto wall-clock time.
+        """
+        now = time.time()
+        pts = cam.cam.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if self.use_pts else 0.0
+        if pts > 0:
+            base = min(self.pts_base.get(cam.name, now - pts), now - pts)
+            self.pts_base[cam.name] = base
+            captured = base + pts
+        else:
+            captured = now  # No stream timestamps from this source
+        last = self.last_time.get(cam.name)
+        if last is not None and 0 < captured - last < 1.0:
+            self.period = 0.9 * self.period + 0.1 * (captured - last)
+        self.last_time[cam.name] = captured
+        return captured
+
+    def reset_timing(self):
+        """After a reconnect the PTS start over."""
+        self.pts_base = {}
+        self.last_time = {}
+
+    def grab(self, cam: Camera):
+        if cam.cam is None or not cam.cam.grab():
+            return None
+        return self.grab_time(cam)
+
+    def capture_loop(self):
+        while self.capturing:
+            time_l = self.grab(self.left)
+            time_r = self.grab(self.right)
+            if time_l is None or time_r is None:
+                if self.capturing:
+                    for cam, grab_time in ((self.left, time_l), (self.right, time_r)):
+                        if grab_time is None:
+                            cam.recover()
+                    self.reset_timing()
+                continue
+
+            # Re-grab the side that is behind while its next frame is the nearer one
+            resyncs = 0
+            while abs(time_l - time_r) > self.tolerance and resyncs < self.max_resync:
+                resyncs += 1
+                if time_l < time_r:
+                    self.dropped_left += 1
+                    time_l = self.grab(self.left)
+                else:
+                    self.dropped_right += 1
+                    time_r = self.grab(self.right)
+                if time_l is None or time_r is None:
+                    break
+            if time_l is None or time_r is None:
+                continue  # Reconnected at the top of the loop
+
+            if abs(time_l - time_r) > self.tolerance:
+                self.unpaired += 1  # Still the nearest frames there are, the skew is reported
+
+            pooled_l = self.left.read_pooled(self.left.cam.retrieve)
+            pooled_r = self.right.read_pooled(self.right.cam.retrieve)
+            if pooled_l is None or pooled_r is None:
+                for pooled in (pooled_l, pooled_r):
+                    if pooled is not None:
+                        pooled.release()
+                self.dropped_pairs += 1
+                continue
+
+            timestamp = time.time()
+            with self.pair_ready:
+                previous = self.pair
+                # The pair keeps its own reference, the cameras take over the ones from read_pooled
+                self.pair = (pooled_l.acquire(), pooled_r.acquire())
+                self.pair_seq += 1
+                self.pair_time = timestamp
+                self.skew = time_l - time_r
+                self.pair_ready.notify_all()
+            if previous is not None:
+                previous[0].release()
+                previous[1].release()
+            self.left.publish_frame(pooled_l, timestamp)
+            self.right.publish_frame(pooled_r, timestamp)
+
+    def get_stereo_pair(self, wait_for_new=True, timeout=1.0):
+        """
+        Returns (left, right, info). info holds the pair sequence number,
+        capture timestamp, left-right skew in ms and the drop counters.
+        """
+        last_seq = getattr(self.reader, "seq", 0)
+        previous_lease = getattr(self.reader, "lease", ())
+        self.reader.lease = ()
+        with self.pair_ready:
+            if wait_for_new:
+                self.pair_ready.wait_for(
+                    lambda: self.pair_seq > last_seq or not self.capturing, timeout)
+            if self.pair is None or (wait_for_new and self.pair_seq <= last_seq):
+                result = None, None, self.stats()
+            else:
+                self.reader.seq = self.pair_seq
+                # Valid until this thread asks for the next pair, like Camera.get_frame
+                self.reader.lease = (self.pair[0].acquire(), self.pair[1].acquire())
+                result = self.pair[0].array, self.pair[1].array, self.stats()
+        for pooled in previous_lease:
+            pooled.release()
+        return result
+
+    def stats(self):
+        return {
+            "seq": self.pair_seq,
+            "timestamp": self.pair_time,
+            "skew_ms": self.skew * 1000.0,
+            "dropped_left": self.dropped_left,
+            "dropped_right": self.dropped_right,
+            "dropped_pairs": self.dropped_pairs,
+            "unpaired": self.unpaired,
+            "tolerance_ms": self.tolerance * 1000.0,
+        }
+
+    def start_capture(self):
+        self.left.stop_event.clear()
+        self.right.stop_event.clear()
+        self.capturing = True
+        # The cameras have no capture thread of their own, but consumers may still wait on them
+        self.left.capturing = True
+        self.right.capturing = True
+        self.capture_thread = threading.Thread(target=self.capture_loop, name="Capture-Stereo", daemon=True)
+        self.capture_thread.start()
+
+    def stop_capture(self):
+        self.left.stop_event.set()  # Interrupts a reconnect back-off
+        self.right.stop_event.set()
+        with self.pair_ready:
+            self.capturing = False
+            self.pair_ready.notify_all()
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout=1.0)
+        self.capture_thread = None
+        with self.pair_ready:
+            previous, self.pair = self.pair, None
+        if previous is not None:
+            previous[0].release()
+            previous[1].release()
 
 
 class CameraManager:
+    # Attribute holding each named camera
+    CAMERA_ATTRS = {
+        "StereoL": "cam_stereoL",
+        "StereoR": "cam_stereoR",
+        "Down": "cam_down",
+        "Manipulator": "cam_manipulator",
+        "Manual": "cam_manual",
+        "Test": "cam_test",
+    }
+
     def __init__(self) -> None:
         self.frame_manipulator = None
         self.frame_stereoR = None
@@ -72,11 +502,24 @@ class CameraManager:
         self.cam_manipulator = None
         self.cam_manual = None
         self.cam_test = None
-
-        self.recording = False
+        self.stereo = None
+        self.supervisor = CameraSupervisor()
+        self.recorder = VideoRecorder()
+        self.passthrough_recording = []  # Cameras whose pipeline tees H.264 into a file
+        self.snapshots = SnapshotService()
 
         self.active_cameras = []
 
+    def add_camera(self, cam):
+        """
+        Opens the camera and supervises it. A camera that fails to open is kept as well:
+        its capture thread retries with back-off until the feed comes up.
+        """
+        success = cam.open_cam()
+        self.active_cameras.append(cam)
+        self.supervisor.watch(cam)
+        return success
+
     def get_frame_stereo_L(self):
         self.frame_stereoL = self.cam_stereoL.get_frame()
         return self.frame_stereoL
@@ -105,47 +548,60 @@ class CameraManager:
         frame = cam.get_frame()
         return frame
 
-    def start_stereo_cam_L(self):
-        self.cam_stereoL = Camera("StereoL", GST_FEED_STEREO_L)
+    def start_stereo_cam_L(self, profile=None):
+        self.cam_stereoL = Camera("StereoL", build_camera_feed("StereoL", profile), profile)
         print("Starting camera: StereoL")
-        success = self.cam_stereoL.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_stereoL)
+        self.add_camera(self.cam_stereoL)
 
-    def start_stereo_cam_R(self):
-        self.cam_stereoR = Camera("StereoR", GST_FEED_STEREO_R)
+    def start_stereo_cam_R(self, profile=None):
+        self.cam_stereoR = Camera("StereoR", build_camera_feed("StereoR", profile), profile)
         print("Starting camera: StereoR")
-        success = self.cam_stereoR.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_stereoR)
-
-    def start_down_cam(self):
-        self.cam_down = Camera("Down", GST_FEED_DOWN)
+        self.add_camera(self.cam_stereoR)
+
+    def start_stereo(self, tolerance=None, use_pts=True, profile="stereo"):
+        """Opens StereoL and StereoR in paired mode, see get_stereo_pair()."""
+        self.cam_stereoL = Camera("StereoL", build_camera_feed("StereoL", profile), profile)
+        self.cam_stereoR = Camera("StereoR", build_camera_feed("StereoR", profile), profile)
+        print("Starting cameras: StereoL + StereoR (paired)")
+        if not self.cam_stereoL.open_cam(start_capture=False):
+            return False
+        if not self.cam_stereoR.open_cam(start_capture=False):
+            self.cam_stereoL.release_cam()
+            return False
+        self.stereo = StereoCamera(self.cam_stereoL, self.cam_stereoR, tolerance, use_pts)
+        self.stereo.start_capture()
+        self.active_cameras.append(self.cam_stereoL)
+        self.supervisor.watch(self.cam_stereoL)
+        self.active_cameras.append(self.cam_stereoR)
+        self.supervisor.watch(self.cam_stereoR)
+        return True
+
+    def get_stereo_pair(self, wait_for_new=True, timeout=1.0):
+        return self.stereo.get_stereo_pair(wait_for_new, timeout)
+
+    def camera_health(self):
+        """Uptime, reconnect count and last-frame age per open camera."""
+        return self.supervisor.health()
+
+    def start_down_cam(self, profile=None):
+        self.cam_down = Camera("Down", build_camera_feed("Down", profile), profile)
         print("Starting camera: Down")
-        success = self.cam_down.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_down)
+        self.add_camera(self.cam_down)
 
-    def start_manipulator_cam(self):
-        self.cam_manipulator = Camera("Manipulator", GST_FEED_MANIPULATOR)
+    def start_manipulator_cam(self, profile=None):
+        self.cam_manipulator = Camera("Manipulator", build_camera_feed("Manipulator", profile), profile)
         print("Starting camera: Manipulator")
-        success = self.cam_manipulator.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_manipulator)
+        self.add_camera(self.cam_manipulator)
 
     def start_manual_cam(self):
         self.cam_manual = Camera("Manual")
         print("Starting camera: Manual")
-        success = self.cam_manual.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_manual)
+        self.add_camera(self.cam_manual)
 
     def start_test_cam(self):
         self.cam_test = Camera("Test")
         print("Starting camera: Test")
-        success = self.cam_test.open_cam()
-        if success:
-            self.active_cameras.append(self.cam_test)
+        self.add_camera(self.cam_test)
 
     def start(self):
         # self.start_down_cam()
@@ -155,87 +611,190 @@ class CameraManager:
         # self.start_manual_cam()
         pass
 
+    def camera(self, name):
+        return getattr(self, self.CAMERA_ATTRS[name])
+
+    def start_camera(self, name, profile=None):
+        starters = {
+            "StereoL": self.start_stereo_cam_L,
+            "StereoR": self.start_stereo_cam_R,
+            "Down": self.start_down_cam,
+            "Manipulator": self.start_manipulator_cam,
+        }
+        starters[name](profile)
+
+    def close_camera(self, name):
+        cam = self.camera(name)
+        if cam is None:
+            return
+        if self.stereo is not None and cam in (self.cam_stereoL, self.cam_stereoR):
+            self.stereo.stop_capture()
+            self.stereo = None
+        if cam in self.passthrough_recording:
+            self.passthrough_recording.remove(cam)
+            cam.recording = None
+        self.supervisor.unwatch(cam)
+        cam.release_cam()
+        if cam in self.active_cameras:
+            self.active_cameras.remove(cam)
+        setattr(self, self.CAMERA_ATTRS[name], None)
+        print(f"Closed camera: {name}")
+
+    def apply_mode(self, mode, idle="close"):
+        """
+        Opens the cameras the mode needs (with its capture profile) and idles the rest:
+        idle="close" releases them so their pipeline stops decoding, idle="pause" only stops
+        their capture thread so they come back without renegotiating the stream.
+        """
+        needed = cameras_for_mode(mode)
+        profile = capture_profile_for_mode(mode)
+
+        for name in CAMERA_ORDER:
+            cam = self.camera(name)
+            if name not in needed:
+                if cam is None or cam.capture_thread is None:
+                    continue
+                if idle == "pause":
+                    self.supervisor.unwatch(cam)  # A paused camera is not stalled
+                    cam.stop_capture()
+                    print(f"Paused camera: {name}")
+                else:
+                    self.close_camera(name)
+            elif cam is None or not cam.isOpened:
+                self.close_camera(name)
+                self.start_camera(name, profile)
+            elif capture_profile(cam.profile) != capture_profile(profile):
+                # Profiles with the same settings share a pipeline, only a real change reopens it.
+                # The profile is set first: a recording camera rebuilds its tee with it on open.
+                cam.profile = profile
+                self.reopen_cameras({cam: build_camera_feed(name, profile)})
+            elif cam.capture_thread is None and self.stereo is None:
+                cam.connected_since = time.time()  # Restart the stall clock
+                cam.start_capture()
+                self.supervisor.watch(cam)
+                print(f"Resumed camera: {name}")
+
+    @property
+    def recording(self):
+        return self.recorder.recording or bool(self.passthrough_recording)
+
     def close_all(self):
-        if self.cam_down is not None and self.cam_down.isOpened:
+        if self.recorder.recording:
+            self.recorder.stop()
+        for cam in self.passthrough_recording:
+            cam.recording = None
+        self.passthrough_recording = []  # Ends with the pipelines below
+
+        if self.stereo is not None:
+            self.stereo.stop_capture()
+            self.stereo = None
+
+        for cam in self.active_cameras:
+            self.supervisor.unwatch(cam)
+
+        if self.cam_down is not None:
             self.cam_down.release_cam()
 
-        if self.cam_stereoL is not None and self.cam_stereoL.isOpened:
+        if self.cam_stereoL is not None:
             self.cam_stereoL.release_cam()
 
-        if self.cam_stereoR is not None and self.cam_stereoR.isOpened:
+        if self.cam_stereoR is not None:
             self.cam_stereoR.release_cam()
 
-        if self.cam_manipulator is not None and self.cam_manipulator.isOpened:
+        if self.cam_manipulator is not None:
             self.cam_manipulator.release_cam()
 
-        if self.cam_manual is not None and self.cam_manual.isOpened:
+        if self.cam_manual is not None:
             self.cam_manual.release_cam()
 
-        if self.cam_test is not None and self.cam_test.isOpened:
+        if self.cam_test is not None:
             self.cam_test.release_cam()
 
-    def setup_video(self, name):
-        self.videoresult = cv2.VideoWriter(
-            f"camerafeed/output/{name}.avi",
-            cv2.VideoWriter_fourcc(*"MJPG"),
-            10,
-            (
-                int(self.active_cameras[0].cam.get(3)),
-                int(self.active_cameras[0].cam.get(4)),
-            ),
-        )
-
-    # Run this to start recording, and do a keyboard interrupt (ctrl + c) to stop recording
-
-    # TODO make it so that it can record from multiple cameras at the same time
-    # TODO MAKE IT WORK (Only record if there is a camera selected) <<<<<<<<<<
-    def record_video(self):
-        # if self.recording == False:
-        #     if len(self.active_cameras) == 0:
-        #         print("No camera selected")
-
-        # else:
-        #     # Makes a new video file if it is not already recording (Default)
-        if self.recording == False:
-            self.setup_video(
-                f"Video{self.active_cameras[0].name}{datetime.datetime.now()}"
-            )
-            self.recording = True
-
-        # While recording, it will write the frames to the video file
-        if self.recording == True:
-            cur_cam = self.active_cameras[0]
-
-            frame = self.get_frame_from_cam(cur_cam)
-            self.videoresult.write(frame)
-            return frame
-        else:
-            self.videoresult.release()
-
-    def save_image(self):
+        self.supervisor.stop()  # Started again by the next watch()
+
+    def is_live_feed(self, cam: Camera):
+        """True if the camera reads an ROV RTP/H.264 stream (and not a replay source)."""
+        return cam.gst is not None and cam.name in CAMERA_PORTS and CAMERA_SOURCES.get(cam.name, "gst") == "gst"
+
+    def reopen_cameras(self, feeds):
+        """Reopens cameras on new pipelines, {camera: gst_feed}. Paired stereo is restarted as a pair."""
+        paired = self.stereo is not None and any(cam in (self.cam_stereoL, self.cam_stereoR) for cam in feeds)
+        if paired:
+            self.stereo.stop_capture()
+        for cam, feed in feeds.items():
+            cam.reopen(feed)
+        if paired:
+            self.stereo.start_capture()
+
+    def start_recording(self, cameras=None, passthrough=True):
+        """
+        Records the given cameras (default: all active ones).
+
+        Live ROV feeds are recorded as H.264 passthrough: the pipeline is reopened with a
+        tee that muxes the received stream into segmented files without decoding it.
+        Other sources are recorded by VideoRecorder, one writer process per camera.
+        """
+        cameras = self.active_cameras if cameras is None else cameras
+        if len(cameras) == 0:
+            print("No camera selected")
+            return False
+
+        direct = [cam for cam in cameras if passthrough and self.is_live_feed(cam)
+                  and cam not in self.passthrough_recording]
+        decoded = [cam for cam in cameras if cam not in direct and cam not in self.passthrough_recording]
+
+        if direct:
+            os.makedirs(self.recorder.output_dir, exist_ok=True)
+            for cam in direct:
+                cam.recording = (self.recorder.output_dir, self.recorder.segment_seconds)
+            # open_cam adds the recording tee, see Camera.current_feed()
+            self.reopen_cameras({cam: build_camera_feed(cam.name, cam.profile) for cam in direct})
+            self.passthrough_recording += direct
+            print(f"[RECORDER] H.264 passthrough recording: {[cam.name for cam in direct]}")
+        if decoded:
+            self.recorder.start(decoded)
+        return True
+
+    def stop_recording(self):
+        if self.passthrough_recording:
+            for cam in self.passthrough_recording:
+                cam.recording = None
+            self.reopen_cameras({cam: build_camera_feed(cam.name, cam.profile) for cam in self.passthrough_recording})
+            print(f"[RECORDER] H.264 passthrough stopped: {[cam.name for cam in self.passthrough_recording]}")
+            self.passthrough_recording = []
+        return self.recorder.stop()
+
+    def save_image(self, image_format=None, quality=None):
         if len(self.active_cameras) == 0:
             print("No camera selected")
-        else:
-            print("Cameras detected, amount: ", len(self.active_cameras))
-            for i in range(len(self.active_cameras)):
-                cur_cam = self.active_cameras[i]
-                frame_to_save = self.get_frame_from_cam(cur_cam)
-                cv2.imwrite(
-                    f"camerafeed/output/Img_Cam_{cur_cam.name}{datetime.datetime.now()}.jpg",
-                    frame_to_save,
-                )
-            print("Image(s) saved")
+            return []
+        print("Cameras detected, amount: ", len(self.active_cameras))
+        results = self.snapshots.snapshot(self.active_cameras, image_format, quality)
+        for result in results:
+            print(f"Image saved: {result['path']} ({result['encode_ms']:.1f} ms)")
+        return results
+
+    def save_burst(self, count, rate_hz, image_format=None, quality=None):
+        """Saves `count` images per active camera at `rate_hz`."""
+        if len(self.active_cameras) == 0:
+            print("No camera selected")
+            return []
+        return self.snapshots.burst(self.active_cameras, count, rate_hz, image_format, quality)
 
 
 class ExecutionClass:
     def __init__(
             self,
             rov_data_queue,
-            stereo_left_queue: multiprocessing.Queue,
-            stereo_right_queue: multiprocessing.Queue,
-            down_queue: multiprocessing.Queue,
-            manipulator_queue: multiprocessing.Queue,
-            manual_flag):
+            stereo_left_queue: FrameRingBuffer,
+            stereo_right_queue: FrameRingBuffer,
+            down_queue: FrameRingBuffer,
+            manipulator_queue: FrameRingBuffer,
+            manual_flag,
+            passthrough=False,
+            overlays=None,
+            control_rate=DEFAULT_RATE,
+            telemetry=None):
         
         self.AutonomousTransect = AutonomousTransect()
         self.Docking = AutonomousDocking()
@@ -249,6 +808,13 @@ class ExecutionClass:
         self.stereo_right_queue = stereo_right_queue
         self.down_queue = down_queue
         self.manipulator_queue = manipulator_queue
+        self.passthrough = passthrough  # WebRTC forwards the ROV's H.264 in PASSTHROUGH_MODES
+        self.overlays = overlays  # OverlayBus for detection results, drawn by the viewers if client-side
+        # Latest depth, heading and attitude of the ROV (TelemetryStore), read by the autonomous modes
+        self.AutonomousTransect.telemetry = telemetry
+        self.Docking.telemetry = telemetry
+        # Sends the newest drive command to the ROV at control_rate, whatever the frame rate
+        self.control = ControlScheduler(self.send_data_to_rov, rate_hz=control_rate)
 
     def update_down(self):
         self.frame_down = self.Camera.get_frame_down()
@@ -262,54 +828,73 @@ class ExecutionClass:
     def update_manipulator(self):
         self.frame_manipulator = self.Camera.get_frame_manipulator()
 
+    def read_camera(self, name):
+        """Returns (frame, capture timestamp) of the named camera, like the update_* methods."""
+        cam = self.Camera.camera(name)
+        if cam is None:
+            return None, None
+        frame, _, timestamp = cam.get_frame_info()
+        return frame, timestamp
+
     def update_manual(self):
         self.frame_manual = self.Camera.get_frame_manual()
 
     def update_test_cam(self):
         self.frame_test = self.Camera.get_frame_test()
 
-    def show(self, frame, name="frame"):
-    # Maps the name to the corresponding queue
-        current_time = time.time()
-    
+    def show(self, frame, name="frame", timestamp=None):
+    # Maps the name to the corresponding frame ring (drops the oldest frame when full)
+    # Returns the frame's sequence number in the ring, None if it was not added
+        seq = None
         if name == "StereoL":
-            # Check if the queue is full and remove the oldest item if necessary
-            if self.stereo_left_queue.full():
-                self.stereo_left_queue.get()  # Remove the oldest item to make space
-            self.stereo_left_queue.put(frame)
+            seq = self.stereo_left_queue.put(frame, timestamp=timestamp)
 
         elif name == "StereoR":
-            if self.stereo_right_queue.full():
-                self.stereo_right_queue.get()
-            self.stereo_right_queue.put(frame)
+            seq = self.stereo_right_queue.put(frame, timestamp=timestamp)
 
         elif name == "Down":
-            if self.down_queue.full():
-                self.down_queue.get()
-            self.down_queue.put(frame)
+            seq = self.down_queue.put(frame, timestamp=timestamp)
 
         elif name == "Manipulator":
-            if self.manipulator_queue.full():
-                self.manipulator_queue.get()
-            self.manipulator_queue.put(frame)
+            seq = self.manipulator_queue.put(frame, timestamp=timestamp)
 
         else:
             print(f"Unknown name '{name}', frame not added to any queue.")
 
         if cv2.waitKey(1) == ord("q"):
             self.stop_everything()
+        return seq
+
+    def annotate_frames(self):
+        """Draws the detections into the frames unless every viewer draws the overlays itself."""
+        annotate = self.overlays is None or not self.overlays.clean_video
+        self.AutonomousTransect.annotate = annotate
+        self.Docking.annotate = annotate
+
+    def show_with_overlay(self, frame, name, timestamp, overlay):
+        """Streams the frame and publishes its overlay with the same sequence number and timestamp."""
+        seq = self.show(frame, name, timestamp)
+        if self.overlays is not None:
+            self.overlays.publish(name, seq, timestamp, overlay)
 
 
+    def update_stereo(self):
+        self.frame_stereoL, self.frame_stereoR, self.stereo_info = self.Camera.get_stereo_pair()
+
     def testing_for_torr(self):
         self.done = False
+        self.Camera.start_stereo()
         while not self.done:
-            self.update_stereo_L()
-            self.update_stereo_R()
+            self.update_stereo()
+            if self.frame_stereoL is None:
+                continue
             self.show(self.frame_stereoL, "StereoL")
             self.show(self.frame_stereoR, "StereoR")
 
     def camera_test(self):
-        while self.done:
+        self.done = False
+        self.Camera.apply_mode(MODE_TEST)
+        while not self.done:
             # self.update_manual()
             self.update_down()
             self.update_stereo_L()
@@ -338,9 +923,19 @@ class ExecutionClass:
 
     def pipeline(self):
         self.done = False
-        self.Camera.start_manipulator_cam()
+        self.Camera.apply_mode(MODE_PIPELINE)
+        self.control.start()
+        try:
+            self.run_pipeline()
+        finally:
+            self.control.stop()
+
+    def run_pipeline(self):
         while not self.done and self.manual_flag.value == 0:
-            self.update_manipulator()
+            self.frame_manipulator, captured = self.read_camera("Manipulator")
+            if self.frame_manipulator is None:
+                continue  # Camera is down, get_frame already waited for it
+            self.annotate_frames()
             pipeline_frame, driving_data_packet, _, _, _ = self.AutonomousTransect.run(
                 self.frame_manipulator
             )
@@ -350,10 +945,8 @@ class ExecutionClass:
                 print("Error: Invalid frame or data received. Skipping this loop iteration.")
                 continue  # Skip this loop iteration and continue with the next
 
-            self.show(pipeline_frame, "Manipulator")
-            self.send_data_to_rov([int(round(x)) for x in driving_data_packet])
-        else:
-            self.stop_everything()
+            self.show_with_overlay(pipeline_frame, "Manipulator", captured, self.AutonomousTransect.overlay)
+            self.control.update([int(round(x)) for x in driving_data_packet], captured)
 
     def seagrass(self):
         growth = self.Seagrass.run(self.frame.copy())
@@ -361,12 +954,22 @@ class ExecutionClass:
 
     def docking(self):
         self.done = False
-        self.Camera.start_down_cam()
-        self.Camera.start_manipulator_cam()
+        self.Camera.apply_mode(MODE_DOCKING)
+        self.Docking.target_heading = None  # Hold the heading the ROV has when docking starts
+        self.control.start()
+        try:
+            self.run_docking()
+        finally:
+            self.control.stop()
+
+    def run_docking(self):
         while not self.done and self.manual_flag.value == 0:
             # Needs manipulator L, and Down Cameras
-            self.update_manipulator()
+            self.frame_manipulator, captured = self.read_camera("Manipulator")
             self.update_down()
+            if self.frame_manipulator is None:
+                continue  # Camera is down, get_frame already waited for it
+            self.annotate_frames()
             manipulator_frame, down_under, driving_data_packet = self.Docking.run(
                 self.frame_manipulator, self.frame_down
             )
@@ -376,14 +979,14 @@ class ExecutionClass:
                 print("Error: Invalid frames received. Skipping this loop iteration.")
                 continue
 
-            self.show(manipulator_frame, "Manipulator")
+            self.show_with_overlay(manipulator_frame, "Manipulator", captured, self.Docking.overlay)
             self.show(down_under, "Down")
-            self.send_data_to_rov(driving_data_packet)
-        else:
-            self.stop_everything()
+            self.control.update(driving_data_packet, captured)
 
-    def send_data_to_rov(self, datapacket):
-        data_to_send = {"autonomdata": datapacket}
+    def send_data_to_rov(self, datapacket, captured=None):
+        # The timestamp lets the CommunicationHandler measure how long packets wait,
+        # `captured` is the capture time of the frame the packet was computed from
+        data_to_send = {"autonomdata": datapacket, "timestamp": time.time(), "captured": captured}
         self.rov_data_queue.put(data_to_send)
 
     def normal_camera(self):
@@ -393,28 +996,31 @@ class ExecutionClass:
             self.update_manual()
             self.show(self.frame_manual, "Manual")
 
-    def show_all_cameras(self):
+    def show_all_cameras(self, mode=MODE_ALL_CAMERAS):
         self.done = False
-        self.Camera.start_stereo_cam_L()
-        self.Camera.start_stereo_cam_R()
-        self.Camera.start_down_cam()
-        self.Camera.start_manipulator_cam()
-        while not self.done:
-            self.update_stereo_L()
-            self.update_stereo_R()
-            self.update_down()
-            self.update_manipulator()
-            self.show(self.frame_stereoL, "StereoL")
-            self.show(self.frame_stereoR, "StereoR")
-            self.show(self.frame_down, "Down")
-            self.show(self.frame_manipulator, "Manipulator")
+        self.Camera.apply_mode(mode)
+        cameras = [cam for cam in map(self.Camera.camera, cameras_for_mode(mode)) if cam is not None]
+
+        # One thread per camera like show_manual_cameras, a stalled camera only holds up its own stream
+        threads = [
+            threading.Thread(target=self.camera_thread, args=(cam,), name=f"Show-{cam.name}", daemon=True)
+            for cam in cameras]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def show_mosaic(self):
+        # Same feeds as all cameras, the WebRTC server composites them into one track
+        self.show_all_cameras(MODE_MOSAIC)
 
     def show_manual_cameras(self): # The streams when in manual mode.
         self.done = False
-        #self.Camera.start_stereo_cam_L()
-        #self.Camera.start_stereo_cam_R()
-        self.Camera.start_down_cam()
-        self.Camera.start_manipulator_cam()
+        if self.passthrough and is_passthrough(MODE_MANUAL):
+            # The WebRTC server streams the ROV's H.264 directly, nothing to decode here
+            self.Camera.apply_mode(MODE_NONE)
+            return
+        self.Camera.apply_mode(MODE_MANUAL)
 
         # Create threads for each camera
         down_thread = threading.Thread(target=self.camera_thread_down, daemon=True)
@@ -427,6 +1033,12 @@ class ExecutionClass:
         down_thread.join()
         manipulator_thread.join()
 
+    def camera_thread(self, cam):
+        while not self.done:
+            frame = cam.get_frame()
+            if frame is not None:
+                self.show(frame, cam.name)
+
     def camera_thread_down(self):
         while not self.done:  # Check if stop event is set
             self.update_down()  # Update the frame
@@ -451,10 +1063,16 @@ class ExecutionClass:
             self.show(self.frame_stereoR, "StereoR")
             time.sleep(0.01)
 
+    def stop_task(self):
+        """Ends the running task loop but leaves the cameras to the next mode."""
+        self.done = True
+        self.control.stop()  # No drive commands once the task is over, even while its loop finishes
+
     def stop_everything(self):
         print("Stopping other processes, returning to manual control")
         try:
             self.done = True
+            self.control.stop()
             self.Camera.close_all()
             self.Camera.active_cameras = []
         except:
@@ -464,27 +1082,18 @@ class ExecutionClass:
         print("Running Transect!")
 
     def record(self):
-        self.done = False
-
         # If the Camera is already recording, then this stops it
         if self.Camera.recording:
-            self.Camera.recording = False
+            self.Camera.stop_recording()
             print("Recording stopped")
-            self.done = True
+            return
 
         active_cams = self.Camera.active_cameras
         if len(active_cams) >= 1:
             print("Cameras detected, amount: ", len(active_cams))
+            self.Camera.start_recording()
         else:
             print("No active cameras")
-            self.done = True
-
-        while not self.done and len(self.Camera.active_cameras) >= 1:
-            frame = self.Camera.record_video()
-            self.show(frame, "Recording")
-        else:
-            self.Camera.recording = False
-            print("Recording stopped or no active cameras")
 
     def save_image(self):
         self.Camera.save_image()
@@ -3,6 +3,10 @@ import cv2 as cv
 import sys
 import time 
 
+TELEMETRY_MAX_AGE = 0.5  # Seconds, older ROV telemetry is not used for control
+HEADING_GAIN = 0.1  # Rotation power per degree of heading error
+MAX_HEADING_POWER = 5.0
+
 
 class AutonomousDocking:
     """Autonomous docking system using computer vision and ArUco markers."""
@@ -26,6 +30,24 @@ class AutonomousDocking:
         self.pallet_found = False
         self.debug = True
 
+        # Detection results of the last run() for client-side drawing; annotate=False keeps the frame clean
+        self.annotate = True
+        self.overlay = {}
+
+        # Latest ROV sensor values (telemetry.TelemetryStore), None to steer on the image alone
+        self.telemetry = None
+        self.target_heading = None  # Heading held while docking, reset by the caller per attempt
+
+        self.buffers = {}  # Scratch images reused between frames, see work_buffer()
+
+    def work_buffer(self, name, shape, dtype=np.uint8):
+        """Returns a reusable array, only reallocated when the frame size changes."""
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype)
+            self.buffers[name] = buffer
+        return buffer
+
     def undistort_image(self, image):
         """Removes distortion from the image."""
         if self.camera_matrix is None or self.dist_coeffs is None:
@@ -41,10 +63,10 @@ class AutonomousDocking:
     def enhance_image(self, image):
         """Enhances image for marker detection."""
         if len(image.shape) == 3:
-            image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-        image = cv.equalizeHist(image)
-        gaussian_blur = cv.GaussianBlur(image, (9, 9), 2.0)
-        new_image = cv.addWeighted(image, 1.5, gaussian_blur, -0.5, 0)
+            image = cv.cvtColor(image, cv.COLOR_BGR2GRAY, dst=self.work_buffer("gray", image.shape[:2]))
+        image = cv.equalizeHist(image, dst=self.work_buffer("equalized", image.shape))
+        gaussian_blur = cv.GaussianBlur(image, (9, 9), 2.0, dst=self.work_buffer("blur", image.shape))
+        new_image = cv.addWeighted(image, 1.5, gaussian_blur, -0.5, 0, dst=self.work_buffer("enhanced", image.shape))
         return new_image
     
     def detect_markers(self, image):
@@ -59,13 +81,16 @@ class AutonomousDocking:
             filtered_corners = [corners[i] for i in range(len(corners)) if indexes[i]]
             filtered_ids = ids[indexes]
             
-            cv.aruco.drawDetectedMarkers(self.frame, corners, ids)
+            if self.annotate:
+                cv.aruco.drawDetectedMarkers(self.frame, corners, ids)
             
             return filtered_corners, np.array(filtered_ids), rejected
         return [], np.array([]), rejected
     
     def display_markers(self, corners, ids, image, pallet_center=None):
         """Displays detected markers on image."""
+        if not self.annotate:
+            return image
         if corners and len(corners) > 0:
             cv.aruco.drawDetectedMarkers(image, corners, ids)
             
@@ -179,10 +204,38 @@ class AutonomousDocking:
                 self.search_strategy()
             elif command == "STOP":
                 print("Stopping movement")
-        
+        self.hold_heading()
         return True
+
+    def hold_heading(self):
+        """
+        Counters yaw with the rotation axis so that translating towards the pallet does not turn the ROV.
+        Positive rotation turns clockwise, towards a higher heading.
+        """
+        sample = self.telemetry.latest(TELEMETRY_MAX_AGE) if self.telemetry is not None else None
+        if sample is None:
+            return
+        if self.target_heading is None:
+            self.target_heading = sample.heading
+        error = (self.target_heading - sample.heading + 180.0) % 360.0 - 180.0  # Shortest turn, -180 to 180
+        if self.driving_data[3] == 0:
+            self.driving_data[3] = max(-MAX_HEADING_POWER, min(MAX_HEADING_POWER, error * HEADING_GAIN))
     
                 
+    def collect_overlay(self, frame, corners, ids, pallet_center, data):
+        """Markers, pallet center and drive vector of this run, points flattened to [x0, y0, x1, y1, ...]."""
+        self.overlay = {
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            "markers": [
+                {"id": int(marker_id), "corners": corner[0].astype(int).reshape(-1).tolist()}
+                for corner, marker_id in zip(corners, np.asarray(ids).reshape(-1))
+            ],
+            "pallet_center": pallet_center,
+            "drive": [round(float(value), 1) for value in data[:4]],
+        }
+        return self.overlay
+
     def get_driving_data(self):
         """Returns and resets driving data."""
         data = self.driving_data.copy()
@@ -192,16 +245,27 @@ class AutonomousDocking:
     def run(self, front_frame, down_frame=None):
         """Runs one cycle of the docking system."""
         self.frame = front_frame
-        self.down_frame = down_frame if down_frame is not None else np.zeros_like(front_frame)
+        if down_frame is None:
+            # Blank stand-in, allocated once per frame size
+            blank = self.buffers.get("blank")
+            if blank is None or blank.shape != front_frame.shape:
+                blank = self.buffers["blank"] = np.zeros_like(front_frame)
+            down_frame = blank
+        self.down_frame = down_frame
         image_center = (self.frame.shape[1] // 2, self.frame.shape[0] // 2)
-        enhanced_frame = self.enhance_image(self.frame.copy())
+        enhanced_frame = self.enhance_image(self.frame)  # Works on its own buffers, the frame is not modified
         corners, ids, rejected = self.detect_markers(enhanced_frame)
         pallet_center = self.calculate_pallet_center(corners, ids)
         commands = self.get_navigation_command(pallet_center, image_center)
         self.navigate(commands)
-        processed_frame = self.frame.copy()
+        if self.annotate:
+            processed_frame = self.work_buffer("processed", self.frame.shape)
+            np.copyto(processed_frame, self.frame)
+        else:
+            processed_frame = self.frame  # Nothing is drawn, no copy needed
         processed_frame = self.display_markers(corners, ids, processed_frame, pallet_center)
         data = self.get_driving_data()
+        self.collect_overlay(processed_frame, corners, ids, pallet_center, data)
         return processed_frame, self.down_frame, data
 
 ''' testing with webcam and iphone 
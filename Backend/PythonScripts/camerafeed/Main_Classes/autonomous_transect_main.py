@@ -3,6 +3,16 @@ import numpy as np
 import time
 import math
 
+TELEMETRY_MAX_AGE = 0.5  # Seconds, older ROV telemetry is not used for control
+DEPTH_GAIN = 20.0  # Z power per meter of depth error
+MAX_DEPTH_POWER = 10.0
+
+# Pixel sizes tuned on 1280x720 frames, scaled to the width of the analysed frame
+REFERENCE_WIDTH = 1280
+NOISE_AREA = 100  # Yellow blobs smaller than this (px²) are noise
+PIPELINE_AREA = 500  # The merged contour must be larger than this (px²) to be the pipeline
+OPENING_KERNEL = 7  # Opening kernel size (px), removes specks thinner than this
+
 class AutonomousTransect:
     def __init__(self):
         self.frame = None
@@ -39,6 +49,25 @@ class AutonomousTransect:
         self.pinger_location = None 
         self.launch_coordinates = None
 
+        # Overlays: detection results of the last run() for client-side drawing.
+        # annotate=False leaves the frame clean instead of drawing them into it.
+        self.annotate = True
+        self.overlay = {}
+
+        # Latest ROV sensor values (telemetry.TelemetryStore), None to steer on the image alone
+        self.telemetry = None
+        self.target_depth = None  # Depth held while following the pipeline
+
+        self.buffers = {}  # Scratch images reused between frames, see work_buffer()
+
+    def work_buffer(self, name, shape, dtype=np.uint8):
+        """Returns a reusable array, only reallocated when the frame size changes."""
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype)
+            self.buffers[name] = buffer
+        return buffer
+
     def detect_markers(self):
         """Detect ArUco markers in the current frame and update the markers list"""
         gray = cv.cvtColor(self.frame, cv.COLOR_BGR2GRAY)
@@ -49,7 +78,8 @@ class AutonomousTransect:
         )
         
         if ids is not None and len(ids) > 0:
-            cv.aruco.drawDetectedMarkers(self.frame, corners, ids)
+            if self.annotate:
+                cv.aruco.drawDetectedMarkers(self.frame, corners, ids)
             for i, marker_id in enumerate(ids):
                 id_int = int(marker_id[0])
                 # Calculate marker center
@@ -61,7 +91,14 @@ class AutonomousTransect:
                     self.marker_positions[id_int] = center
                     self.last_marker_time = time.time()
                     print(f"New marker detected! ID: {id_int}")
-                
+
+                self.overlay["markers"].append({
+                    "id": id_int,
+                    "corners": corners[i][0].astype(int).reshape(-1).tolist(),
+                    "center": center.tolist(),
+                })
+                if not self.annotate:
+                    continue
                 # Display ID and center on frame
                 cv.putText(self.frame, f"ID: {id_int}", 
                           (center[0] + 10, center[1]), 
@@ -75,7 +112,19 @@ class AutonomousTransect:
    
     
     def run(self, frame):
-        self.frame = frame
+        # The camera frame is shared with the stream, snapshots and recorder: draw on a copy
+        if self.annotate:
+            self.frame = self.work_buffer("processed", frame.shape)
+            np.copyto(self.frame, frame)
+        else:
+            self.frame = frame  # Nothing is drawn, no copy needed
+        self.overlay = {
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            "state": self.tracking_state,
+            "pipeline": None,
+            "markers": [],
+        }
         self.update()
         data = self.get_driving_data()
         return self.frame, data, self.detected_markers_ids, self.navigation_angle, self.navigation_vector
@@ -128,7 +177,8 @@ class AutonomousTransect:
     def get_driving_data(self):
         """Return the current driving data"""
         data = self.driving_data.copy()
-        if self.frame is not None: # driving commands on frame
+        self.overlay["drive"] = [round(float(value), 1) for value in data[:4]]
+        if self.frame is not None and self.annotate: # driving commands on frame
             cmd_text = f"Drive: [{data[0]:.1f}, {data[1]:.1f}, {data[2]:.1f}, {data[3]:.1f}]"
             cv.putText(self.frame, cmd_text, (10, self.frame.shape[0] - 10), 
                       cv.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
@@ -139,17 +189,21 @@ class AutonomousTransect:
         """Detect yellow pipeline with special handling for elbows and bends"""
         hsv = cv.cvtColor(self.frame, cv.COLOR_BGR2HSV)  # Convert to HSV color space
         pipeline_mask = cv.inRange(hsv, self.yellow_lower, self.yellow_upper)  # Threshold for yellow color
-        kernel = np.ones((7, 7), np.uint8) #opening operation to clean up the mask
+        scale = self.frame.shape[1] / REFERENCE_WIDTH  # Capture profiles may scale the frame down
+        size = max(1, int(OPENING_KERNEL * scale)) | 1  # Odd, so the opening stays centred
+        kernel = np.ones((size, size), np.uint8) #opening operation to clean up the mask
         pipeline_mask = cv.morphologyEx(pipeline_mask, cv.MORPH_OPEN, kernel) #closing operation 
         pipe_contours, _ = cv.findContours(pipeline_mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)  # extract contours from the binary mask 
-        valid_contours = [cnt for cnt in pipe_contours if cv.contourArea(cnt) > 100]    # filters out the npises and merge contours
+        area_scale = scale * scale
+        valid_contours = [cnt for cnt in pipe_contours if cv.contourArea(cnt) > NOISE_AREA * area_scale]    # filters out the npises and merge contours
         
         if valid_contours:
             full_pipeline_contour = np.vstack(valid_contours)
-            cv.drawContours(self.frame, valid_contours, -1, (0, 255, 0), 2)
+            if self.annotate:
+                cv.drawContours(self.frame, valid_contours, -1, (0, 255, 0), 2)
             
             # Check if contour is large enough to be a pipeline
-            if cv.contourArea(full_pipeline_contour) > 500:  
+            if cv.contourArea(full_pipeline_contour) > PIPELINE_AREA * area_scale:
                 self.pipeline_detected = True
                 self.pipeline_contour = full_pipeline_contour
                 # Calculate center of pipeline (overall)
@@ -158,17 +212,19 @@ class AutonomousTransect:
                     cx = int(M["m10"] / M["m00"])
                     cy = int(M["m01"] / M["m00"])
                     self.pipeline_center = (cx, cy)
-                    # Draw center of pipeline
-                    cv.circle(self.frame, self.pipeline_center, 7, (255, 0, 0), -1)
+                    if self.annotate:
+                        # Draw center of pipeline
+                        cv.circle(self.frame, self.pipeline_center, 7, (255, 0, 0), -1)
                     
                     # ------ BEND/ELBOW DETECTION-----
                     epsilon = 0.02 * cv.arcLength(full_pipeline_contour, True)
                     approx = cv.approxPolyDP(full_pipeline_contour, epsilon, True)
-                    cv.drawContours(self.frame, [approx], -1, (255, 0, 255), 2) #the approximated shape
                     rect = cv.minAreaRect(full_pipeline_contour)
                     box = cv.boxPoints(rect)
                     box = np.int0(box)
-                    cv.drawContours(self.frame, [box], 0, (0, 0, 255), 2) # the bounding rectangle
+                    if self.annotate:
+                        cv.drawContours(self.frame, [approx], -1, (255, 0, 255), 2) #the approximated shape
+                        cv.drawContours(self.frame, [box], 0, (0, 0, 255), 2) # the bounding rectangle
                     is_bent = False #  Analyze the contour shape to detect bends
                     is_elbow = False
                     bend_direction = None
@@ -188,11 +244,12 @@ class AutonomousTransect:
                         topmost = tuple(full_pipeline_contour[full_pipeline_contour[:, :, 1].argmin()][0])
                         bottommost = tuple(full_pipeline_contour[full_pipeline_contour[:, :, 1].argmax()][0])
                         
-                        # visualise extreme points
-                        cv.circle(self.frame, leftmost, 5, (255, 0, 0), -1)
-                        cv.circle(self.frame, rightmost, 5, (0, 255, 0), -1)
-                        cv.circle(self.frame, topmost, 5, (0, 0, 255), -1)
-                        cv.circle(self.frame, bottommost, 5, (255, 255, 0), -1)
+                        if self.annotate:
+                            # visualise extreme points
+                            cv.circle(self.frame, leftmost, 5, (255, 0, 0), -1)
+                            cv.circle(self.frame, rightmost, 5, (0, 255, 0), -1)
+                            cv.circle(self.frame, topmost, 5, (0, 0, 255), -1)
+                            cv.circle(self.frame, bottommost, 5, (255, 255, 0), -1)
                         
                     
                         #distances to extremes from center
@@ -288,10 +345,25 @@ class AutonomousTransect:
                     angle_rad = math.radians(angle+180)
                     end_x = int(cx + length * math.cos(angle_rad))
                     end_y = int(cy + length * math.sin(angle_rad))
+                    elbow_text = "ELBOW" if is_elbow else ("BEND" if is_bent else "STRAIGHT")
+
+                    # Contours simplified to polylines, points flattened to [x0, y0, x1, y1, ...]
+                    self.overlay["pipeline"] = {
+                        "contours": [
+                            cv.approxPolyDP(cnt, 2.0, True).reshape(-1).tolist() for cnt in valid_contours],
+                        "outline": approx.reshape(-1).tolist(),
+                        "box": box.reshape(-1).tolist(),
+                        "center": [cx, cy],
+                        "direction": round(float(angle), 1),
+                        "arrow": [end_x, end_y],
+                        "shape": elbow_text,
+                        "bend": bend_direction,
+                    }
+                    if not self.annotate:
+                        return
                     cv.arrowedLine(self.frame, self.pipeline_center, (end_x, end_y), (255, 0, 255), 2)
                     
                     # debug visuali
-                    elbow_text = "ELBOW" if is_elbow else ("BEND" if is_bent else "STRAIGHT")
                     cv.putText(self.frame, f"Dir: {angle:.1f} ({elbow_text})", 
                       (cx + 15, cy - 15), cv.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 2)
                     
@@ -306,9 +378,29 @@ class AutonomousTransect:
         self.pipeline_contour = None
         self.pipeline_center = None
        
+    def hold_depth(self, z_power):
+        """
+        Keeps the depth the pipeline was found at while the image gives no vertical correction.
+        Positive Z is up, like the image correction, so being too deep gives positive power.
+        """
+        sample = self.telemetry.latest(TELEMETRY_MAX_AGE) if self.telemetry is not None else None
+        if sample is None:
+            return z_power
+        if self.target_depth is None:
+            self.target_depth = sample.depth
+        self.overlay["telemetry"] = {
+            "depth": round(sample.depth, 2), "heading": round(sample.heading, 1),
+            "roll": round(sample.roll, 1), "pitch": round(sample.pitch, 1),
+        }
+        if z_power != 0:
+            return z_power
+        depth_error = sample.depth - self.target_depth
+        return max(-MAX_DEPTH_POWER, min(MAX_DEPTH_POWER, depth_error * DEPTH_GAIN))
+
     def regulate_position(self):
         """Control ROV position relative to pipeline and return navigation vector"""
         if not self.pipeline_detected or self.pipeline_center is None:
+            self.target_depth = None
             return [0, 0], 0  #no pipeline is detected
             
         frame_height, frame_width = self.frame.shape[:2]
@@ -340,10 +432,13 @@ class AutonomousTransect:
             rot_power = heading_error * 0.1  # Proportional control
         else:
             rot_power = 0
+        z_power = self.hold_depth(z_power)
         self.driving_data = [forward_speed, y_power, z_power, rot_power, 0, 0, 0, 0]   # combinign  movements
 
-        cv.putText(self.frame, f"Drive: Fwd={forward_speed:.1f}, Y={y_power:.1f}, Z={z_power:.1f}, Rot={rot_power:.1f}",
-                (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)     
+        self.overlay["offset"] = [int(dx), int(dy)]  # Pipeline center relative to the frame center
+        if self.annotate:
+            cv.putText(self.frame, f"Drive: Fwd={forward_speed:.1f}, Y={y_power:.1f}, Z={z_power:.1f}, Rot={rot_power:.1f}",
+                    (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)     
         self.canstabilize = True
         return [dx, dy], angle #for regulation 
     
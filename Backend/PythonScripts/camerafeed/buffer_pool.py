@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+
+class PooledFrame:
+    """A frame buffer borrowed from a FramePool. It goes back to the pool when its last reference is released."""
+
+    __slots__ = ("array", "pool", "refs")
+
+    def __init__(self, array, pool):
+        self.array = array
+        self.pool = pool
+        self.refs = 1
+
+    def acquire(self):
+        with self.pool.lock:
+            self.refs += 1
+        return self
+
+    def release(self):
+        with self.pool.lock:
+            self.refs -= 1
+            if self.refs > 0:
+                return
+            if self.refs < 0:
+                raise RuntimeError("PooledFrame released more often than acquired")
+            self.pool.give_back(self)
+
+
+class FramePool:
+    """Free list of equally sized frame buffers, so steady-state capture allocates nothing."""
+
+    def __init__(self, shape, dtype=np.uint8, max_free=8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.max_free = max_free
+        self.free = []
+        self.lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self):
+        """Returns a PooledFrame with one reference. Its contents are undefined."""
+        with self.lock:
+            if self.free:
+                self.reused += 1
+                pooled = self.free.pop()
+                pooled.refs = 1
+                return pooled
+            self.allocated += 1
+        return PooledFrame(np.empty(self.shape, self.dtype), self)
+
+    def adopt(self, array):
+        """Wraps an array allocated elsewhere (e.g. the first frame of a capture) as a pool member."""
+        with self.lock:
+            self.allocated += 1
+        return PooledFrame(array, self)
+
+    def give_back(self, pooled):
+        # Called with self.lock held
+        if len(self.free) < self.max_free:
+            self.free.append(pooled)
+
+    def matches(self, array):
+        return array.shape == self.shape and array.dtype == self.dtype
+
+    def stats(self):
+        with self.lock:
+            return {"shape": self.shape, "allocated": self.allocated, "reused": self.reused, "free": len(self.free)}
+
+
+class FramePools:
+    """One FramePool per frame shape and dtype."""
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def get(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = FramePool(shape, dtype, self.max_free)
+                self.pools[key] = pool
+            return pool
+
+    def stats(self):
+        with self.lock:
+            pools = list(self.pools.values())
+        return [pool.stats() for pool in pools]
+
+
+# Shared by all cameras of the process
+FRAME_POOLS = FramePools()
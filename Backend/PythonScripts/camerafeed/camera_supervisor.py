@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class CameraSupervisor:
+    """
+    Watches open cameras and recovers the ones that stop delivering frames.
+
+    A camera whose newest frame is older than `stall_timeout` seconds is marked
+    as stalled. Its capture thread, whose read gives up after the GStreamer read
+    timeout, then releases and reopens the capture itself with back-off. Cameras
+    that failed to open are watched too; they retry the same way.
+    """
+
+    def __init__(self, stall_timeout=3.0, interval=0.5):
+        self.stall_timeout = stall_timeout
+        self.interval = interval
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def watch(self, camera):
+        with self.lock:
+            self.cameras[camera.name] = camera
+            if self.thread is None or not self.thread.is_alive():
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self.run, name="CameraSupervisor", daemon=True)
+                self.thread.start()
+
+    def unwatch(self, camera):
+        with self.lock:
+            if self.cameras.get(camera.name) is camera:
+                del self.cameras[camera.name]
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                cameras = list(self.cameras.values())
+            for camera in cameras:
+                if camera.state == "streaming" and camera.frame_age() > self.stall_timeout:
+                    print(f"[SUPERVISOR] {camera.name} stalled, no frame for {camera.frame_age():.1f}s")
+                    camera.mark_stalled()
+
+    def health(self):
+        """Returns the health report of every watched camera, keyed by name."""
+        with self.lock:
+            return {name: camera.health() for name, camera in self.cameras.items()}
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval * 2)
+        self.thread = None
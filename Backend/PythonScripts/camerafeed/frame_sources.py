@@ -0,0 +1,362 @@
+import glob
+import os
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import parse_qsl
+
+import cv2
+import numpy as np
+
+from camerafeed.gst_pipeline import capture_profile
+
+# Frame sources used by Camera in place of the live GStreamer feeds.
+#
+# A source is chosen per camera name with a spec string "kind:target?option=value&...":
+#   gst                                   Live feed (default, the camera's GST_FEED_* string or device 0)
+#   file:videos/video3.mp4?rate=max       Video file, rate=native (default) or max, loop=1 (default) or 0
+#   images:camerafeed/images?fps=10       Image directory in name order, fps=0 for max rate
+#   synthetic:pipe?fps=30&size=1280x720   Generated frames, pattern "pipe" (yellow pipeline) or "pallet" (ArUco pallet)
+#
+# Overrides are read from the CAMERA_SOURCES environment variable, e.g.
+#   CAMERA_SOURCES="Manipulator=synthetic:pipe;Down=file:videos/video3.mp4?rate=max"
+#
+# Replayed sources are scaled and converted to the camera's CaptureProfile here, as the
+# GStreamer pipeline does for a live feed, so a mode sees the same frames either way.
+
+CAMERA_SOURCES = {}
+
+
+def load_camera_sources(value=None):
+    """Parses "Name=spec;Name=spec" (default: $CAMERA_SOURCES) into CAMERA_SOURCES."""
+    if value is None:
+        value = os.environ.get("CAMERA_SOURCES", "")
+    for entry in value.split(";"):
+        if "=" in entry.split("?")[0]:
+            name, spec = entry.split("=", 1)
+            CAMERA_SOURCES[name.strip()] = spec.strip()
+
+
+def set_camera_source(name, spec):
+    CAMERA_SOURCES[name] = spec
+
+
+def parse_spec(spec):
+    """Splits "kind:target?a=1&b=2" into (kind, target, options)."""
+    kind, _, rest = spec.partition(":")
+    target, _, query = rest.partition("?")
+    return kind, target, dict(parse_qsl(query))
+
+
+def parse_size(size):
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+
+def source_size(name):
+    """(width, height) of the replayed source configured for camera `name`, None for a live feed."""
+    kind, target, options = parse_spec(CAMERA_SOURCES.get(name, "gst"))
+    if kind == "synthetic":
+        return parse_size(options.get("size", "1280x720"))
+    if kind in ("file", "images"):
+        source = open_source(name)
+        size = (source.width, source.height) if source.isOpened() else None
+        source.release()
+        return size
+    return None
+
+
+def largest_frame_size(names, default=(1280, 720)):
+    """(width, height) covering `default` and the replayed sources of the cameras `names`."""
+    sizes = [default] + [size for size in map(source_size, names) if size is not None]
+    return max(width for width, _ in sizes), max(height for _, height in sizes)
+
+
+def open_source(name, gst_feed=None, profile=None):
+    """Opens the frame source configured for the camera `name`, delivering frames in `profile`."""
+    kind, target, options = parse_spec(CAMERA_SOURCES.get(name, "gst"))
+    if kind == "gst":
+        if gst_feed is None:
+            return cv2.VideoCapture(0)
+        return open_gstreamer(gst_feed)  # The pipeline already applies the profile
+    if kind == "file":
+        source = VideoFileSource(
+            target,
+            max_rate=options.get("rate", "native") == "max",
+            loop=options.get("loop", "1") != "0")
+    elif kind == "images":
+        source = ImageDirectorySource(
+            target,
+            fps=float(options.get("fps", 10)),
+            loop=options.get("loop", "1") != "0")
+    elif kind == "synthetic":
+        source = SyntheticSource(
+            target or "pipe",
+            size=parse_size(options.get("size", "1280x720")),
+            fps=float(options.get("fps", 30)))
+    else:
+        raise ValueError(f"Unknown frame source '{kind}' for camera {name}")
+    return apply_profile(source, profile)
+
+
+def apply_profile(source, profile=None):
+    """Wraps `source` so its frames have the size and format of the CaptureProfile `profile`."""
+    profile = capture_profile(profile)
+    if profile.width is None and profile.height is None and profile.format == "BGR":
+        return source
+    return ProfiledSource(source, profile)
+
+
+def open_gstreamer(gst_feed, read_timeout_ms=3000):
+    """Opens a GStreamer feed, with a read timeout where this OpenCV build supports one."""
+    timeout_prop = getattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC", None)
+    if timeout_prop is not None:
+        try:
+            return cv2.VideoCapture(gst_feed, cv2.CAP_GSTREAMER, [timeout_prop, read_timeout_ms])
+        except (TypeError, cv2.error):
+            pass
+    return cv2.VideoCapture(gst_feed, cv2.CAP_GSTREAMER)
+
+
+class Pacer:
+    """Sleeps until the next frame is due. fps <= 0 means no pacing."""
+
+    def __init__(self, fps):
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self.next_time = None
+
+    def wait(self):
+        if not self.period:
+            return
+        now = time.monotonic()
+        if self.next_time is None or now - self.next_time > self.period:
+            self.next_time = now  # First frame, or we fell behind: restart the schedule
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.period
+
+
+class FrameSource(ABC):
+    """The subset of the cv2.VideoCapture interface that Camera relies on."""
+
+    def __init__(self, size=(0, 0), fps=0.0):
+        self.width, self.height = size
+        self.fps = fps
+        self.opened = True
+        self.frame_index = 0
+        self.start_time = time.monotonic()
+        self.last_grab = 0.0
+
+    def isOpened(self):
+        return self.opened
+
+    @abstractmethod
+    def grab(self):
+        """Advances to the next frame. Returns False when there is none."""
+
+    @abstractmethod
+    def retrieve(self, image=None):
+        """Returns (ok, frame) for the grabbed frame, written into `image` when it matches."""
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return (self.last_grab - self.start_time) * 1000.0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_index)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def mark_grab(self):
+        self.frame_index += 1
+        self.last_grab = time.monotonic()
+
+    def release(self):
+        self.opened = False
+
+
+def copy_into(frame, image):
+    """Returns frame, copied into `image` when a matching buffer is given."""
+    if image is not None and image.shape == frame.shape:
+        np.copyto(image, frame)
+        return image
+    return frame
+
+
+class ProfiledSource(FrameSource):
+    """Scales and converts the frames of another source to a CaptureProfile."""
+
+    CONVERSIONS = {"BGR": None, "GRAY8": cv2.COLOR_BGR2GRAY, "I420": cv2.COLOR_BGR2YUV_I420}
+
+    def __init__(self, source, profile):
+        super().__init__((profile.width or source.width, profile.height or source.height), source.fps)
+        self.source = source
+        self.profile = profile
+        self.conversion = self.CONVERSIONS[profile.format]
+        self.opened = source.isOpened()
+        self.raw = None  # Reused buffers for the source frame and the scaled frame
+        self.scaled = None
+
+    def grab(self):
+        if not self.opened or not self.source.grab():
+            return False
+        self.mark_grab()
+        return True
+
+    def retrieve(self, image=None):
+        ok, frame = self.source.retrieve(self.raw)
+        if not ok or frame is None:
+            return False, None
+        self.raw = frame
+        size = (self.width, self.height)
+        if self.conversion is None:
+            return True, cv2.resize(frame, size, dst=image, interpolation=cv2.INTER_AREA)
+        if frame.shape[1::-1] != size:
+            frame = self.scaled = cv2.resize(frame, size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+        return True, cv2.cvtColor(frame, self.conversion, dst=image)
+
+    def release(self):
+        super().release()
+        self.source.release()
+
+
+class VideoFileSource(FrameSource):
+    """Replays a video file at its native frame rate (or as fast as it decodes), looping at the end."""
+
+    def __init__(self, path, max_rate=False, loop=True):
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        super().__init__(size, fps)
+        self.opened = self.cap.isOpened()
+        self.loop = loop
+        self.pacer = Pacer(0 if max_rate else fps)
+        if not self.opened:
+            print(f"[SOURCE] Could not open video file {path}")
+
+    def grab(self):
+        if not self.opened:
+            return False
+        self.pacer.wait()
+        if not self.cap.grab():
+            if not self.loop:
+                return False
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            if not self.cap.grab():
+                return False
+        self.mark_grab()
+        return True
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def release(self):
+        super().release()
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Cycles through the images in a directory. Images are decoded once and kept in memory."""
+
+    EXTENSIONS = ("*.png", "*.jpg", "*.jpeg", "*.bmp")
+
+    def __init__(self, path, fps=10.0, loop=True):
+        files = sorted(f for ext in self.EXTENSIONS for f in glob.glob(os.path.join(path, ext)))
+        self.images = [img for img in (cv2.imread(f) for f in files) if img is not None]
+        size = self.images[0].shape[1::-1] if self.images else (0, 0)
+        super().__init__(size, fps)
+        self.opened = bool(self.images)
+        self.loop = loop
+        self.pacer = Pacer(fps)
+        if not self.opened:
+            print(f"[SOURCE] No images found in {path}")
+
+    def grab(self):
+        if not self.opened:
+            return False
+        if self.frame_index >= len(self.images) and not self.loop:
+            return False
+        self.pacer.wait()
+        self.mark_grab()
+        return True
+
+    def retrieve(self, image=None):
+        frame = self.images[(self.frame_index - 1) % len(self.images)]
+        if image is None or image.shape != frame.shape:
+            return True, frame.copy()  # Consumers draw on frames, keep the cached image clean
+        return True, copy_into(frame, image)
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generates test frames without any camera.
+
+    "pipe" draws a yellow pipeline that sweeps slowly across a blue-green seabed,
+    "pallet" draws the four docking ArUco markers (28, 7, 19, 96) circling the image centre.
+    """
+
+    PALLET_IDS = (28, 7, 19, 96)
+
+    def __init__(self, pattern="pipe", size=(1280, 720), fps=30.0):
+        super().__init__(size, fps)
+        if pattern not in ("pipe", "pallet"):
+            raise ValueError(f"Unknown synthetic pattern '{pattern}'")
+        self.pattern = pattern
+        self.pacer = Pacer(fps)
+        self.background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.background[:] = (90, 70, 20)  # Seabed colour (BGR)
+        if pattern == "pallet":
+            self.pallet = self.make_pallet()
+
+    def make_pallet(self):
+        """Builds the pallet image: four markers on a white board."""
+        side = min(self.width, self.height) // 6
+        board = np.full((side * 3, side * 3), 255, dtype=np.uint8)
+        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_ARUCO_ORIGINAL)
+        generate = getattr(cv2.aruco, "generateImageMarker", None) or cv2.aruco.drawMarker
+        corners = [(0, 0), (0, 2), (2, 0), (2, 2)]
+        for marker_id, (row, col) in zip(self.PALLET_IDS, corners):
+            board[row * side:(row + 1) * side, col * side:(col + 1) * side] = generate(dictionary, marker_id, side)
+        return cv2.cvtColor(board, cv2.COLOR_GRAY2BGR)
+
+    def grab(self):
+        if not self.opened:
+            return False
+        self.pacer.wait()
+        self.mark_grab()
+        return True
+
+    def retrieve(self, image=None):
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        t = self.frame_index / (self.fps or 30.0)
+
+        if self.pattern == "pipe":
+            # Pipe enters at the bottom and tilts back and forth over time
+            x = int(self.width * (0.5 + 0.25 * np.sin(t * 0.5)))
+            angle = 0.4 * np.sin(t * 0.3)
+            top = (int(x + np.tan(angle) * self.height), 0)
+            cv2.line(image, (x, self.height), top, (0, 220, 240), max(self.width // 20, 4))
+        else:
+            h, w = self.pallet.shape[:2]
+            x = int(self.width / 2 - w / 2 + self.width * 0.15 * np.cos(t * 0.4))
+            y = int(self.height / 2 - h / 2 + self.height * 0.15 * np.sin(t * 0.4))
+            x = min(max(x, 0), self.width - w)
+            y = min(max(y, 0), self.height - h)
+            image[y:y + h, x:x + w] = self.pallet
+        return True, image
+
+
+load_camera_sources()
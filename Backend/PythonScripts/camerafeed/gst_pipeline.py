@@ -0,0 +1,153 @@
+import datetime
+import os
+from collections import namedtuple
+
+# Builds the GStreamer strings for the ROV camera feeds (H.264 over RTP multicast).
+# Scaling and pixel format conversion are done inside the pipeline, so frames reach
+# OpenCV at the size and format the active mode needs.
+
+MULTICAST_GROUP = "224.1.1.1"
+
+CAMERA_PORTS = {
+    "StereoL": 5000,
+    "StereoR": 5001,
+    "Down": 5002,
+    "Manipulator": 5003,
+}
+
+# Size of the leaky RTP queue in front of the depayloader
+CAMERA_QUEUE_SIZES = {
+    "StereoL": 10,
+    "StereoR": 10,
+    "Down": 15,
+    "Manipulator": 15,
+}
+
+# "decodebin" picks a decoder automatically, "avdec" forces the software decoder
+# and "nvv4l2" uses the Jetson hardware decoder (converted and scaled by nvvidconv).
+DECODERS = {
+    "decodebin": "decodebin",
+    "avdec": "avdec_h264",
+    "nvv4l2": "nvv4l2decoder",
+}
+
+PIXEL_FORMATS = ("BGR", "GRAY8", "I420")
+
+# Muxer settings for H.264 passthrough recording. Matroska stays playable if the
+# pipeline is torn down without EOS, an MP4 segment is only finalized when it is closed.
+RECORD_CONTAINERS = {
+    "mkv": " muxer-factory=matroskamux",
+    "mp4": "",  # splitmuxsink default muxer
+}
+
+# width/height None keeps the stream resolution.
+# format: BGR (3 channels), GRAY8 (1 channel) or I420 (planar YUV, height * 3/2 rows).
+CaptureProfile = namedtuple("CaptureProfile", ["width", "height", "format", "decoder"])
+CaptureProfile.__new__.__defaults__ = (None, None, "BGR", "decodebin")
+
+# Docking has no profile of its own: ArUco detection needs the full resolution
+# (the standalone docking script even scales frames up to 1000 rows).
+CAPTURE_PROFILES = {
+    "display": CaptureProfile(),  # Shown to the pilot as is
+    # Yellow pipe is found by HSV threshold (needs colour) on a large blob, a quarter of the 720p pixels is plenty
+    "pipeline": CaptureProfile(width=640, height=360, format="BGR"),
+    "stereo": CaptureProfile(format="GRAY8"),  # Depth matching only uses intensity
+}
+
+
+def build_gst_feed(
+        port,
+        width=None,
+        height=None,
+        pixel_format="BGR",
+        decoder="decodebin",
+        drop=True,
+        max_buffers=1,
+        queue_size=10,
+        multicast_group=MULTICAST_GROUP,
+        record_location=None,
+        segment_seconds=300):
+    """
+    Returns the pipeline string for one RTP/H.264 camera feed ending in an appsink.
+
+    With record_location (a splitmuxsink pattern such as "out/Down_%03d.mkv") the
+    parsed H.264 stream is also teed into a muxer, without decoding, starting a new
+    file every segment_seconds.
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise ValueError(f"Unsupported pixel format '{pixel_format}', use one of {PIXEL_FORMATS}")
+    if decoder not in DECODERS:
+        raise ValueError(f"Unknown decoder '{decoder}', use one of {tuple(DECODERS)}")
+
+    size_caps = ""
+    if width and height:
+        size_caps = f",width={width},height={height}"
+
+    elements = [
+        f"-v udpsrc multicast-group={multicast_group} auto-multicast=true port={port} buffer-size=2097152",
+        "application/x-rtp, media=video, clock-rate=90000, encoding-name=H264, payload=96",
+        f"queue max-size-buffers={queue_size} leaky=downstream",
+        "rtph264depay",
+        "h264parse",
+    ]
+    if record_location is not None:
+        elements += ["tee name=rec", "queue"]
+    elements.append(DECODERS[decoder])
+
+    if decoder == "nvv4l2":
+        # nvvidconv scales and converts in hardware, but cannot output packed BGR
+        if pixel_format == "BGR":
+            elements += ["nvvidconv", f"video/x-raw,format=BGRx{size_caps}", "videoconvert", "video/x-raw,format=BGR"]
+        else:
+            elements += ["nvvidconv", f"video/x-raw,format={pixel_format}{size_caps}"]
+    else:
+        # Scale first so the colour conversion runs on the smaller image
+        if size_caps:
+            elements += ["videoscale", f"video/x-raw{size_caps}"]
+        elements += ["videoconvert", f"video/x-raw,format={pixel_format}"]
+
+    elements.append(f"appsink sync=false drop={'true' if drop else 'false'} max-buffers={max_buffers}")
+    pipeline = " ! ".join(elements)
+
+    if record_location is not None:
+        container = os.path.splitext(record_location)[1].lstrip(".")
+        if container not in RECORD_CONTAINERS:
+            raise ValueError(f"Unsupported recording container '{container}', use one of {tuple(RECORD_CONTAINERS)}")
+        # The recording branch must never stall the decode branch, so its queue leaks
+        pipeline += (
+            f" rec. ! queue max-size-time=2000000000 leaky=downstream"
+            f" ! splitmuxsink location={record_location}"
+            f" max-size-time={int(segment_seconds * 1e9)}{RECORD_CONTAINERS[container]}")
+    return pipeline
+
+
+def record_location(name, output_dir="camerafeed/output", container="mkv"):
+    """
+    splitmuxsink location pattern for a passthrough recording of camera `name`.
+    splitmuxsink numbers segments from 0 again whenever its pipeline restarts, so every
+    (re)open needs a new pattern; the millisecond stamp keeps them apart.
+    """
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    return os.path.join(output_dir, f"H264{name}_{stamp}_%03d.{container}")
+
+
+def capture_profile(profile=None):
+    """The CaptureProfile for a profile name, a CaptureProfile or None (display)."""
+    if profile is None:
+        return CAPTURE_PROFILES["display"]
+    if isinstance(profile, str):
+        return CAPTURE_PROFILES[profile]
+    return profile
+
+
+def build_camera_feed(name, profile=None, **options):
+    """Pipeline string for a named ROV camera using a CaptureProfile (default: display)."""
+    profile = capture_profile(profile)
+    return build_gst_feed(
+        CAMERA_PORTS[name],
+        width=profile.width,
+        height=profile.height,
+        pixel_format=profile.format,
+        decoder=profile.decoder,
+        queue_size=CAMERA_QUEUE_SIZES.get(name, 10),
+        **options)
@@ -0,0 +1,197 @@
+import datetime
+import multiprocessing
+import os
+import queue
+from collections import deque
+
+import cv2
+import numpy as np
+
+from camerafeed.frame_sources import largest_frame_size
+from frame_ring import FrameRingBuffer
+
+# Indexes into the shared stats array of a CameraRecorder
+WRITTEN = 0
+DROPPED = 1
+SEGMENTS = 2
+
+FPS_WINDOW = 30  # Frames used to estimate the real frame rate
+FPS_PROBE_FRAMES = 15  # Frames buffered before the first segment is opened
+
+# Writer processes are started from a process already running capture, WebRTC and task
+# threads; a forked child could inherit a lock one of them held. Spawn starts clean.
+SPAWN = multiprocessing.get_context("spawn")
+
+
+def estimate_fps(timestamps, default=10.0):
+    """Frame rate from a window of capture timestamps."""
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        return default
+    return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+
+def recorder_max_shape(name, frame=None):
+    """
+    Slot shape for a camera's recording ring.
+
+    A profile switch reopens the camera at another size or format, so the slots
+    are sized for the largest frame the camera can produce, not the current one.
+    """
+    width, height = largest_frame_size([name])
+    if frame is not None:
+        height, width = max(height, frame.shape[0]), max(width, frame.shape[1])
+    return height, width, 3
+
+
+def record_camera(ring, name, output_dir, segment_seconds, fourcc, stop_event, stats):
+    """Writer process: encodes frames from the ring into time-segmented video files."""
+    writer = None
+    segment_start = 0.0
+    timestamps = deque(maxlen=FPS_WINDOW)
+    pending = []  # Frames held back until the first frame rate estimate exists
+    last_seq = 0
+    buffer = None
+    writer_shape = None  # Frame shape the open segment was created for
+
+    def open_segment(frame, start):
+        fps = estimate_fps(timestamps)
+        stamp = datetime.datetime.fromtimestamp(start).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(output_dir, f"Video{name}_{stamp}_{stats[SEGMENTS]:03d}.avi")
+        h, w = frame.shape[:2]
+        stats[SEGMENTS] += 1
+        print(f"[RECORDER] {name}: new segment {path} at {fps:.1f} fps")
+        return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (w, h), frame.ndim == 3)
+
+    while True:
+        try:
+            frame, seq, timestamp = ring.get_with_info(timeout=0.5)
+        except queue.Empty:
+            if stop_event.is_set():
+                break
+            continue
+
+        # Copy out of the ring, then make sure the producer did not overwrite the slot meanwhile
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        if last_seq and seq > last_seq + 1:
+            stats[DROPPED] += seq - last_seq - 1  # Overwritten before we got to them
+        last_seq = seq
+        if not ring.is_current(seq):
+            stats[DROPPED] += 1
+            continue
+        timestamps.append(timestamp)
+
+        if writer is None and len(pending) < FPS_PROBE_FRAMES and not stop_event.is_set():
+            pending.append((buffer.copy(), timestamp))
+            continue
+
+        # A new segment also starts when the camera was reopened with another size or format
+        if writer is None or timestamp - segment_start >= segment_seconds or buffer.shape != writer_shape:
+            if writer is not None:
+                writer.release()
+            first = pending[0] if pending else (buffer, timestamp)
+            segment_start = first[1]
+            writer = open_segment(first[0], segment_start)
+            writer_shape = first[0].shape
+
+        for held, _ in pending:
+            writer.write(held)
+            stats[WRITTEN] += 1
+        pending = []
+        writer.write(buffer)
+        stats[WRITTEN] += 1
+
+    if pending:
+        writer = open_segment(pending[0][0], pending[0][1])
+        for held, _ in pending:
+            writer.write(held)
+            stats[WRITTEN] += 1
+    if writer is not None:
+        writer.release()
+
+
+class CameraRecorder:
+    """
+    Records one camera in its own writer process.
+
+    Frames are handed over through a FrameRingBuffer, so a slow encoder only
+    makes the recorder drop frames (counted) and never slows down capture.
+    """
+
+    def __init__(self, camera, output_dir, segment_seconds=300, fourcc="MJPG", slots=30):
+        self.camera = camera
+        self.name = camera.name
+        self.submitted = 0
+        self.ring = FrameRingBuffer(f"Rec{self.name}", slots, recorder_max_shape(self.name, camera.frame), ctx=SPAWN)
+        self.stop_event = SPAWN.Event()
+        self.stats = SPAWN.Array("q", 3)
+        self.process = SPAWN.Process(
+            target=record_camera,
+            args=(self.ring, self.name, output_dir, segment_seconds, fourcc, self.stop_event, self.stats),
+            name=f"Recorder-{self.name}",
+            daemon=True)
+
+    def start(self):
+        self.process.start()
+        self.camera.add_listener(self.on_frame)
+
+    def on_frame(self, frame, seq, timestamp):
+        """Called from the camera's capture thread."""
+        self.ring.put(frame, timestamp=timestamp)
+        self.submitted += 1
+
+    def stop(self, timeout=5.0):
+        self.camera.remove_listener(self.on_frame)
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print(f"[RECORDER] {self.name}: writer did not finish in time, terminating")
+            self.process.terminate()
+        self.ring.close()
+        self.ring.unlink()
+
+    def report(self):
+        return {
+            "submitted": self.submitted,
+            "written": self.stats[WRITTEN],
+            "dropped": self.stats[DROPPED] + self.ring.rejected,  # Rejected: larger than a slot
+            "segments": self.stats[SEGMENTS],
+        }
+
+
+class VideoRecorder:
+    """Records any set of cameras at the same time, one writer process per camera."""
+
+    def __init__(self, output_dir="camerafeed/output", segment_seconds=300, fourcc="MJPG"):
+        self.output_dir = output_dir
+        self.segment_seconds = segment_seconds
+        self.fourcc = fourcc
+        self.recorders = {}
+
+    @property
+    def recording(self):
+        return bool(self.recorders)
+
+    def start(self, cameras):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for camera in cameras:
+            if camera.name in self.recorders:
+                continue
+            recorder = CameraRecorder(camera, self.output_dir, self.segment_seconds, self.fourcc)
+            recorder.start()
+            self.recorders[camera.name] = recorder
+            print(f"[RECORDER] Recording {camera.name}")
+
+    def stop(self):
+        """Stops all recordings and returns the final report per camera."""
+        reports = {}
+        for name, recorder in self.recorders.items():
+            recorder.stop()
+            reports[name] = recorder.report()
+            print(f"[RECORDER] {name} stopped: {reports[name]}")
+        self.recorders = {}
+        return reports
+
+    def report(self):
+        return {name: recorder.report() for name, recorder in self.recorders.items()}
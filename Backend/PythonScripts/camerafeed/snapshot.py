@@ -0,0 +1,88 @@
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# cv2.imwrite parameters per format, built from a 0-100 quality value
+ENCODE_PARAMS = {
+    "jpg": lambda quality: [cv2.IMWRITE_JPEG_QUALITY, quality],
+    "png": lambda quality: [cv2.IMWRITE_PNG_COMPRESSION, min(9, max(0, (100 - quality) // 10))],
+    "webp": lambda quality: [cv2.IMWRITE_WEBP_QUALITY, quality],
+}
+
+
+class SnapshotService:
+    """
+    Saves still images from running cameras without touching their captures.
+
+    The latest decoded frame of every camera is taken in one pass (so all images
+    are from the same instant), and encoding/writing happens on a thread pool.
+    """
+
+    def __init__(self, output_dir="camerafeed/output", image_format="jpg", quality=90, workers=4):
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.quality = quality
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Snapshot")
+
+    def grab(self, cameras):
+        """Copies the newest frame of each camera. Returns [(name, frame, seq, capture_time)]."""
+        grabbed = []
+        borrowed = [(cam.name,) + cam.borrow_frame() for cam in cameras]
+        for name, pooled, seq, timestamp in borrowed:
+            if pooled is None:
+                print(f"[SNAPSHOT] {name} has no frame yet")
+                continue
+            # Vision code draws on the frames it gets, keep an untouched copy
+            grabbed.append((name, pooled.array.copy(), seq, timestamp))
+            pooled.release()
+        return grabbed
+
+    def encode(self, name, frame, seq, capture_time, image_format, quality):
+        start = time.perf_counter()
+        stamp = datetime.datetime.fromtimestamp(capture_time).strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.output_dir, f"Img_Cam_{name}_{stamp}_{seq}.{image_format}")
+        ok = cv2.imwrite(path, frame, ENCODE_PARAMS[image_format](quality))
+        return {
+            "camera": name,
+            "path": path if ok else None,
+            "seq": seq,
+            "capture_time": capture_time,
+            "encode_ms": (time.perf_counter() - start) * 1000.0,
+        }
+
+    def submit(self, cameras, image_format=None, quality=None):
+        """Grabs one frame per camera now and returns futures for the encoded files."""
+        image_format = image_format or self.image_format
+        quality = self.quality if quality is None else quality
+        if image_format not in ENCODE_PARAMS:
+            raise ValueError(f"Unsupported image format '{image_format}', use one of {tuple(ENCODE_PARAMS)}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        return [self.pool.submit(self.encode, *grabbed, image_format, quality)
+                for grabbed in self.grab(cameras)]
+
+    def snapshot(self, cameras, image_format=None, quality=None):
+        """Saves one image per camera and returns the result dict of each (path, seq, timings)."""
+        start = time.perf_counter()
+        results = [future.result() for future in self.submit(cameras, image_format, quality)]
+        for result in results:
+            result["total_ms"] = (time.perf_counter() - start) * 1000.0
+        return results
+
+    def burst(self, cameras, count, rate_hz, image_format=None, quality=None):
+        """Takes `count` snapshots of every camera at `rate_hz`. Encoding overlaps with the next grab."""
+        period = 1.0 / rate_hz
+        next_time = time.monotonic()
+        futures = []
+        for _ in range(count):
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            futures += self.submit(cameras, image_format, quality)
+            next_time += period
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
@@ -1,6 +1,12 @@
+import queue
+import time
+
 import zmq
-import json
 from Thread_info import ThreadWatcher
+from rov_wire import WIRE_FORMATS, encode_autonomy, encode_autonomy_json
+
+POLL_TIMEOUT = 0.5  # Seconds the sender blocks for data before checking whether it should stop
+
 
 class CommunicationHandler:
     def __init__(self,
@@ -8,45 +14,105 @@ class CommunicationHandler:
                  thread_watcher: ThreadWatcher,
                  id: int,
                  host="127.0.0.1",
-                 data_port=5006):
-        
+                 data_port=5006,
+                 wire_format="json"):
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f"Unsupported wire format '{wire_format}', use one of {WIRE_FORMATS}")
+
         self.context = zmq.Context()
 
         # PUSH socket to send ROV data to C# (PULL)
         self.push_socket = self.context.socket(zmq.PUSH)
+        # Only the newest packet waits for a slow or absent receiver, stale drive vectors are dropped
+        self.push_socket.setsockopt(zmq.CONFLATE, 1)
+        self.push_socket.setsockopt(zmq.LINGER, 0)
         self.push_socket.connect(f"tcp://{host}:{data_port}")
 
+        self.wire_format = wire_format  # "binary" needs a receiver that decodes rov_wire packets
+        self.seq = 0
+
         self.rov_data_queue = rov_data_queue
         self.thread_watcher = thread_watcher
         self.id = id
 
+        # Stats, see stats()
+        self.sent = 0
+        self.coalesced = 0  # Packets replaced by a newer one before they were sent
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_count = 0
+
+    def next_packet(self):
+        """
+        Blocks until data arrives, then drains the queue and returns only the newest item.
+        Raises queue.Empty if nothing arrived within POLL_TIMEOUT.
+        """
+        data = self.rov_data_queue.get(timeout=POLL_TIMEOUT)
+        while True:
+            try:
+                newer = self.rov_data_queue.get_nowait()
+            except queue.Empty:
+                return data
+            self.coalesced += 1
+            data = newer
+
+    def format_message(self, data):
+        """Returns the message for the ROV in the wire format, or None if the data is invalid."""
+        if isinstance(data, dict) and "autonomdata" in data:
+            payload = data["autonomdata"]
+            if isinstance(payload, list) and len(payload) >= 4:
+                if self.wire_format == "json":
+                    return encode_autonomy_json(payload)
+                self.seq += 1
+                # Capture time of the frame the packet was computed from, if the task knows it
+                timestamp = data.get("captured") or data.get("timestamp", 0.0)
+                return encode_autonomy(payload, self.seq, timestamp)
+            else:
+                print(f"[ERROR] Invalid payload format: {payload}")
+        else:
+            print(f"[ERROR] Unexpected data structure: {data}")
+        return None
+
     def send_rov_data(self):
         """Sending ROV data to .NET."""
         while self.thread_watcher.should_run(self.id):
-            if not self.rov_data_queue.empty():
-                data = self.rov_data_queue.get()
-
-                if isinstance(data, dict) and "autonomdata" in data:
-                    payload = data["autonomdata"]
-                    if isinstance(payload, list) and len(payload) >= 4:
-                        # Convert each element to an integer after rounding
-                        formatted_data = {
-                            "autonom_data": [int(round(value)) for value in payload[:4]]
-                        }
-                        message = json.dumps(formatted_data)
-                        try:
-                            self.push_socket.send_string(message)
-                            #print(f"[NETWORK] Sent ROV data: {message}")  for test
-                        except zmq.ZMQError as e:
-                            print(f"[NETWORK] Failed to send ROV data: {e}")
-                    else:
-                        print(f"[ERROR] Invalid payload format: {payload}")
-                else:
-                    print(f"[ERROR] Unexpected data structure: {data}")
+            try:
+                data = self.next_packet()
+            except queue.Empty:
+                continue
+
+            message = self.format_message(data)
+            if message is None:
+                continue
+            try:
+                self.push_socket.send(message, zmq.NOBLOCK)
+                #print(f"[NETWORK] Sent ROV data: {message}")  for test
+            except zmq.ZMQError as e:
+                self.failed += 1
+                print(f"[NETWORK] Failed to send ROV data: {e}")
+                continue
+            self.sent += 1
+            if "timestamp" in data:
+                self.record_latency(time.time() - data["timestamp"])
 
+    def record_latency(self, latency):
+        """Time from send_data_to_rov to the packet leaving for the ROV."""
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_count += 1
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "latency_avg_ms": self.latency_total / self.latency_count * 1000.0 if self.latency_count else None,
+            "latency_max_ms": self.latency_max * 1000.0,
+        }
 
     def stop(self):
         """Stops network operations and closes sockets."""
+        print(f"[NETWORK] ROV data: {self.stats()}")
         self.push_socket.close()
         self.context.term()
-
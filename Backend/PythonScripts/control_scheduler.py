@@ -0,0 +1,111 @@
+import threading
+import time
+
+DEFAULT_RATE = 50  # Commands per second to the ROV
+HOLD_TIME = 0.2  # Seconds the last vision command is repeated unchanged...
+DECAY_TIME = 0.5  # ...then ramped down to zero over this many seconds
+
+
+class ControlScheduler:
+    """
+    Sends drive commands to the ROV at a fixed rate, whatever the vision frame rate.
+
+    The vision loop only hands in its newest command with update(); a scheduler thread
+    sends the latest one every tick. Ticks are computed from the start time, so timing
+    errors do not add up; a slightly late tick still runs, ticks missed entirely because
+    the thread ran late are skipped (counted as overruns) instead of being sent in a
+    burst. A command older than `hold` seconds is scaled down linearly to zero over
+    `decay` seconds, so the ROV stops rather than keep following a picture it no longer sees.
+    """
+
+    def __init__(self, send, rate_hz=DEFAULT_RATE, hold=HOLD_TIME, decay=DECAY_TIME):
+        self.send = send  # send(command, captured), e.g. ExecutionClass.send_data_to_rov
+        self.period = 1.0 / rate_hz
+        self.hold = hold
+        self.decay = decay
+        self.latest = None  # (command, capture time, monotonic time of update), replaced as a whole
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.overruns = 0  # Ticks skipped because the previous one ran late
+        self.stale = 0  # Ticks that sent a decayed command because vision fell behind
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def update(self, command, captured=None):
+        """Called by the vision loop with its newest command."""
+        self.latest = (list(command), captured, time.monotonic())
+
+    def command_at(self, now):
+        """The command to send at `now`, with hold/decay applied. None before the first update."""
+        latest = self.latest
+        if latest is None:
+            return None, None
+        command, captured, updated = latest
+        age = now - updated
+        if age <= self.hold:
+            return command, captured
+        self.stale += 1
+        factor = max(0.0, 1.0 - (age - self.hold) / self.decay)
+        return [value * factor for value in command], captured
+
+    def next_tick(self, tick, elapsed):
+        """
+        The tick to run after `tick`, `elapsed` seconds after the start. A late tick is still
+        run; ticks are only skipped (and counted as overruns) once the slot after them has
+        begun as well, i.e. when running them would mean sending in a burst.
+        """
+        tick += 1
+        missed = int(elapsed / self.period) - tick
+        if missed > 0:
+            self.overruns += missed
+            tick += missed
+        return tick
+
+    def run(self):
+        start = time.monotonic()
+        tick = 0
+        while not self.stop_event.is_set():
+            scheduled = start + tick * self.period
+            delay = scheduled - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            now = time.monotonic()
+            jitter = now - scheduled
+            self.jitter_total += jitter
+            self.jitter_max = max(self.jitter_max, jitter)
+            self.ticks += 1
+
+            command, captured = self.command_at(now)
+            if command is not None:
+                self.send(command, captured)
+
+            tick = self.next_tick(tick, time.monotonic() - start)
+
+    def start(self):
+        self.stop()
+        self.latest = None  # Never send a command left over from the previous task
+        self.reset_stats()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="ControlScheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        thread, self.thread = self.thread, None  # The task and stop_task may both stop it
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+            print(f"[CONTROL] {self.stats()}")
+
+    def stats(self):
+        return {
+            "rate_hz": 1.0 / self.period,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "stale": self.stale,
+            "jitter_avg_ms": self.jitter_total / self.ticks * 1000.0 if self.ticks else None,
+            "jitter_max_ms": self.jitter_max * 1000.0,
+        }
@@ -0,0 +1,154 @@
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class Subscription:
+    """
+    One consumer of one or more relays. Holds the newest `depth` items; when the
+    consumer is slower than the camera the oldest are dropped (and counted), never
+    the relay. Only used from the event loop.
+    """
+
+    def __init__(self, loop, depth=1):
+        self.loop = loop
+        self.items = deque(maxlen=depth)
+        self.relays = []
+        self.waiter = None
+        self.delivered = 0
+        self.dropped = 0
+        self.scale = 1.0  # Frame scale the consumer wants, see Relay.requested_views()
+        self.crop = None  # Region (x, y, width, height) as fractions of the frame, None = whole frame
+
+    @property
+    def view(self):
+        return self.crop, self.scale
+
+    def push(self, item, replace=False):
+        if replace:
+            self.dropped += len(self.items)  # Only the newest item is worth having
+            self.items.clear()
+        elif len(self.items) == self.items.maxlen:
+            self.dropped += 1
+        self.items.append(item)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self):
+        while not self.items:
+            self.waiter = self.loop.create_future()
+            await self.waiter
+        self.delivered += 1
+        return self.items.popleft()
+
+    def close(self):
+        for relay in list(self.relays):
+            relay.unsubscribe(self)
+
+
+class Relay(ABC):
+    """
+    Broadcasts items produced on a worker thread to all subscribers on the event loop.
+    Subclasses implement run(), producing only while wanted().
+    """
+
+    # True if a new item makes older undelivered ones worthless (decoded frames),
+    # False if consumers need every item (encoded packets)
+    replace_pending = True
+
+    def __init__(self, name, active, loop):
+        self.name = name
+        self.active = active  # threading.Event, set while the mode streams this camera
+        self.loop = loop
+        self.subscribers = []
+        self.has_subscribers = threading.Event()
+        self.stopped = threading.Event()
+        self.published = 0
+        self.thread = threading.Thread(target=self.run, name=f"{type(self).__name__}-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def subscribe(self, depth=1):
+        subscription = Subscription(self.loop, depth)
+        self.attach(subscription)
+        return subscription
+
+    def attach(self, subscription):
+        """Also feeds an existing subscription, e.g. a track fed by whichever source the mode uses."""
+        subscription.relays.append(self)
+        self.subscribers.append(subscription)
+        self.has_subscribers.set()
+
+    def unsubscribe(self, subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+            subscription.relays.remove(self)
+        if not self.subscribers:
+            self.has_subscribers.clear()
+
+    def requested_views(self):
+        """Distinct (crop, scale) views of the frame the subscribers currently want."""
+        return {subscription.view for subscription in list(self.subscribers)} or {(None, 1.0)}
+
+    def wanted(self, timeout=0.5):
+        """Blocks up to `timeout` until the stream is active and someone is subscribed."""
+        return self.has_subscribers.wait(timeout) and self.active.wait(timeout)
+
+    @abstractmethod
+    def run(self):
+        """Worker thread: produces items with publish() until stopped is set."""
+
+    def publish(self, item):
+        self.published += 1
+        for subscription in list(self.subscribers):
+            subscription.push(item, self.replace_pending)
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "subscribers": [
+                {"delivered": sub.delivered, "dropped": sub.dropped} for sub in self.subscribers
+            ],
+        }
+
+    def stop(self, timeout=1.0):
+        """Stops the worker; it is joined so the source (e.g. a frame ring) can be closed afterwards."""
+        self.stopped.set()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+
+class FrameRelay(Relay):
+    """
+    Reads one FrameRingBuffer and broadcasts every frame to all subscribers.
+
+    A single thread drains the ring, runs `convert(frame, seq, timestamp, views)` once
+    per frame (for all requested views together) and hands the result to the event loop with call_soon_threadsafe. Extra
+    viewers cost a deque append each, they no longer take frames from one another.
+    """
+
+    def __init__(self, name, ring, active, loop, convert, replace_pending=True):
+        super().__init__(name, active, loop)
+        self.ring = ring
+        self.reader = ring.reader()  # Own position in the ring, other consumers keep theirs
+        self.convert = convert
+        self.replace_pending = replace_pending
+        self.frame_shape = None  # (height, width) of the latest frame
+        self.start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            if not self.wanted():
+                continue
+            try:
+                frame, seq, timestamp = self.reader.get_latest(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.frame_shape = frame.shape[:2]
+            item = self.convert(frame, seq, timestamp, self.requested_views())
+            if not self.ring.is_current(seq):
+                continue  # Overwritten by the producer while converting
+            self.loop.call_soon_threadsafe(self.publish, item)
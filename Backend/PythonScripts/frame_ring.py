@@ -0,0 +1,248 @@
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.7 (Jetson) has no shared_memory module.
+    shared_memory = None
+
+
+# Header layout (int64): [write_seq, then per slot: seq, height, width, channels]
+_HEADER_FIELDS = 4
+
+DEFAULT_MAX_SHAPE = (720, 1280, 3)  # Largest frame a slot holds unless the ring is given another
+
+
+class RingReader:
+    """
+    One consumer's position in a FrameRingBuffer. Every consumer in a process needs its
+    own reader (FrameRingBuffer.reader()), otherwise they take frames from one another.
+    A process that unpickles a ring gets a fresh default reader with it.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.read_seq = 0
+
+    def _next_readable(self):
+        """
+        Returns the sequence number to read next, skipping overwritten frames. A reader
+        that fell behind skips to the second oldest frame: the oldest slot is the one the
+        next put() overwrites.
+        """
+        write_seq = self.ring.write_seq
+        if self.read_seq >= write_seq:
+            return None
+        oldest = max(write_seq - self.ring.slots + 2, 1)
+        return max(self.read_seq + 1, oldest)
+
+    def get(self, block=True, timeout=None):
+        """Returns a zero-copy view of the next unread frame (oldest first), see FrameRingBuffer."""
+        frame, _, _ = self.get_with_info(block, timeout)
+        return frame
+
+    def get_with_info(self, block=True, timeout=None):
+        """Like get(), but returns (frame, seq, timestamp)."""
+        ring = self.ring
+        with ring._lock:
+            seq = self._next_readable()
+            if seq is None:
+                if not block:
+                    raise queue.Empty
+                if not ring._not_empty.wait_for(lambda: self._next_readable() is not None, timeout):
+                    raise queue.Empty
+                seq = self._next_readable()
+            self.read_seq = seq
+            return ring._read_slot(seq)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_latest(self, block=True, timeout=None):
+        """Skips straight to the newest frame. Returns (frame, seq, timestamp)."""
+        ring = self.ring
+        with ring._lock:
+            if self.read_seq >= ring.write_seq:
+                if not block:
+                    raise queue.Empty
+                if not ring._not_empty.wait_for(lambda: self.read_seq < ring.write_seq, timeout):
+                    raise queue.Empty
+            seq = ring.write_seq
+            self.read_seq = seq
+            return ring._read_slot(seq)
+
+    def empty(self):
+        return self._next_readable() is None
+
+    def qsize(self):
+        return min(self.ring.write_seq - self.read_seq, self.ring.slots)
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring of frame slots in shared memory.
+
+    Replaces the multiprocessing.Queue frame path: put() copies the frame once
+    into the next slot, get() hands out a zero-copy ndarray view of it.
+    When the reader falls behind the oldest frames are overwritten (drop-oldest).
+
+    The writer never waits for readers, so a view stays valid only until its slot
+    comes round again. Unlike a Queue item it is not the caller's to keep: callers must
+    check is_current(seq) after using (or copying) a frame and discard their result if
+    it returns False.
+
+    The get methods of the ring itself use one default reader per process, for a single
+    consumer. Additional consumers in the same process take their own reader().
+    """
+
+    def __init__(self, name, slots=4, max_shape=DEFAULT_MAX_SHAPE, ctx=multiprocessing):
+        """`ctx` is the multiprocessing context of the processes sharing the ring."""
+        self.name = name
+        self.slots = slots
+        self.max_shape = tuple(max_shape)
+        self.slot_bytes = int(np.prod(self.max_shape))
+
+        header_bytes = 8 * (1 + slots * _HEADER_FIELDS)
+        time_bytes = 8 * slots
+        self._data_offset = header_bytes + time_bytes
+        size = self._data_offset + slots * self.slot_bytes
+
+        if shared_memory is not None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._raw = None
+        else:
+            self._shm = None
+            self._raw = ctx.RawArray("B", size)
+
+        self._lock = ctx.Lock()
+        self._not_empty = ctx.Condition(self._lock)
+        self.rejected = 0  # Frames larger than a slot, not added
+        self._attach()
+        self._header[:] = 0
+
+    def _attach(self):
+        buf = self._shm.buf if self._shm is not None else self._raw
+        self._header = np.ndarray((1 + self.slots * _HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+        self._times = np.ndarray((self.slots,), dtype=np.float64, buffer=buf, offset=self._header.nbytes)
+        self._data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=buf, offset=self._data_offset)
+        self._reader = RingReader(self)  # Default reader of this process
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_header", "_times", "_data", "_reader"):
+            state.pop(key)
+        if self._shm is not None:
+            state["_shm"] = self._shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self._shm, str):
+            self._shm = shared_memory.SharedMemory(name=self._shm)
+        self._attach()
+
+    @property
+    def write_seq(self):
+        """Sequence number of the newest frame (0 = nothing written yet)."""
+        return int(self._header[0])
+
+    def _slot_header(self, slot):
+        start = 1 + slot * _HEADER_FIELDS
+        return self._header[start:start + _HEADER_FIELDS]
+
+    def reader(self):
+        """A new reader starting at the next frame put, for one more consumer in this process."""
+        reader = RingReader(self)
+        reader.read_seq = self.write_seq
+        return reader
+
+    def _read_slot(self, seq):
+        slot = seq % self.slots
+        return self._view(slot), seq, float(self._times[slot])
+
+    def _view(self, slot):
+        _, h, w, c = self._slot_header(slot)
+        shape = (h, w) if c == 1 else (h, w, c)
+        return self._data[slot, :h * w * c].reshape(shape)
+
+    def put(self, frame, block=True, timeout=None, timestamp=None):
+        """Copies the frame into the next slot and returns its sequence number. Never blocks on a slow reader."""
+        if frame is None:
+            return None
+        if frame.dtype != np.uint8:
+            frame = frame.astype(np.uint8)
+        h, w = frame.shape[:2]
+        c = 1 if frame.ndim == 2 else frame.shape[2]
+        if h * w * c > self.slot_bytes:
+            if self.rejected == 0:
+                print(f"[FRAME RING] {self.name}: frame {frame.shape} larger than slot {self.max_shape}, dropping such frames")
+            self.rejected += 1
+            return None
+
+        with self._lock:
+            seq = int(self._header[0]) + 1
+            slot = seq % self.slots
+            header = self._slot_header(slot)
+            header[0] = 0  # Mark slot as being written
+            header[1:] = (h, w, c)
+            np.copyto(self._view(slot), frame)
+            self._times[slot] = time.time() if timestamp is None else timestamp
+            header[0] = seq
+            self._header[0] = seq
+            self._not_empty.notify_all()
+        return seq
+
+    def put_nowait(self, frame):
+        self.put(frame, block=False)
+
+    def get(self, block=True, timeout=None):
+        """Returns a zero-copy view of the next unread frame (oldest first), see is_current()."""
+        return self._reader.get(block, timeout)
+
+    def get_with_info(self, block=True, timeout=None):
+        """Like get(), but returns (frame, seq, timestamp)."""
+        return self._reader.get_with_info(block, timeout)
+
+    def get_nowait(self):
+        return self._reader.get_nowait()
+
+    def get_latest(self, block=True, timeout=None):
+        """Skips straight to the newest frame. Returns (frame, seq, timestamp)."""
+        return self._reader.get_latest(block, timeout)
+
+    def peek_latest(self):
+        """
+        Returns (frame, seq, timestamp) of the newest frame without moving this reader's
+        position, for side readers (e.g. snapshots) sharing the ring with a consumer.
+        """
+        with self._lock:
+            seq = self.write_seq
+            if seq == 0:
+                raise queue.Empty
+            return self._read_slot(seq)
+
+    def is_current(self, seq):
+        """True if the slot holding `seq` has not been overwritten yet."""
+        return int(self._slot_header(seq % self.slots)[0]) == seq
+
+    def empty(self):
+        return self._reader.empty()
+
+    def full(self):
+        return False  # Writers never wait; the oldest frame is dropped instead.
+
+    def qsize(self):
+        return self._reader.qsize()
+
+    def close(self):
+        self._header = self._times = self._data = None
+        if self._shm is not None:
+            self._shm.close()
+
+    def unlink(self):
+        """Frees the shared memory block. Call once, from the creating process."""
+        if self._shm is not None:
+            self._shm.unlink()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+import av
+
+from camerafeed.gst_pipeline import CAMERA_PORTS, MULTICAST_GROUP
+from frame_relay import Relay
+
+# Describes one ROV camera stream (as sent to ports 5000-5003) to FFmpeg's RTP demuxer
+SDP_TEMPLATE = """v=0
+o=- 0 0 IN IP4 127.0.0.1
+s=ROV {name}
+c=IN IP4 {group}
+t=0 0
+m=video {port} RTP/AVP 96
+a=rtpmap:96 H264/90000
+a=fmtp:96 packetization-mode=1
+"""
+
+DEMUX_OPTIONS = {
+    "protocol_whitelist": "file,udp,rtp",
+    "fflags": "nobuffer",
+    "reorder_queue_size": "0",  # Do not hold packets back to reorder them
+}
+
+NAL_IDR = 5
+NAL_SPS = 7
+NAL_PPS = 8
+
+
+def nal_units(data):
+    """Yields (type, start, end) for every NAL unit of an Annex B byte string."""
+    starts = []
+    i = data.find(b"\x00\x00\x01")
+    while i != -1:
+        starts.append(i + 3)
+        i = data.find(b"\x00\x00\x01", i + 3)
+    for n, start in enumerate(starts):
+        end = starts[n + 1] - 3 if n + 1 < len(starts) else len(data)
+        if end > start and data[end - 1] == 0:
+            end -= 1  # Leading zero of a 4 byte start code
+        if start < len(data):
+            yield data[start] & 0x1F, start, end
+
+
+class H264Passthrough(Relay):
+    """
+    Forwards a camera's H.264 access units from the ROV to WebRTC without decoding.
+
+    The RTP stream is depayloaded by FFmpeg (PyAV), the NAL units of one picture are
+    joined into one av.Packet and broadcast; aiortc only repacketizes it per peer.
+    There is no way to ask the ROV encoder for a keyframe, so a new viewer starts at
+    the next IDR the ROV sends. SPS/PPS are cached and put in front of IDRs that lack
+    them, in case the ROV only sends them occasionally.
+    """
+
+    replace_pending = False  # Every access unit is needed to decode the next one
+
+    def __init__(self, name, active, loop, port=None, multicast_group=MULTICAST_GROUP):
+        super().__init__(name, active, loop)
+        self.port = CAMERA_PORTS[name] if port is None else port
+        self.sdp_path = os.path.join(tempfile.gettempdir(), f"rov_{name}_{self.port}.sdp")
+        with open(self.sdp_path, "w") as sdp:
+            sdp.write(SDP_TEMPLATE.format(name=name, group=multicast_group, port=self.port))
+        self.parameter_sets = {}
+        self.access_units = 0
+        self.start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            if not self.wanted():
+                continue
+            try:
+                container = av.open(self.sdp_path, format="sdp", options=DEMUX_OPTIONS, timeout=3.0)
+            except Exception as e:
+                print(f"[PASSTHROUGH] {self.name}: cannot open stream on port {self.port}: {e}")
+                self.stopped.wait(1.0)
+                continue
+            print(f"[PASSTHROUGH] {self.name}: forwarding H.264 from port {self.port}")
+            try:
+                self.forward(container)
+            except Exception as e:
+                print(f"[PASSTHROUGH] {self.name}: stream error: {e}")
+            finally:
+                container.close()
+
+    def forward(self, container):
+        """Publishes access units until the stream is no longer wanted."""
+        stream = container.streams.video[0]
+        if stream.codec_context.extradata:
+            self.cache_parameter_sets(stream.codec_context.extradata)  # From sprop-parameter-sets, if any
+        pending = []
+        pending_pts = None
+        for packet in container.demux(stream):
+            if self.stopped.is_set() or not (self.active.is_set() and self.has_subscribers.is_set()):
+                return
+            if packet.pts is None or packet.size == 0:
+                continue  # No timestamp to send it with (the first packet can lack one)
+            # The demuxer may split a picture into several packets, they share the RTP timestamp.
+            # A picture is complete once the next one starts.
+            if pending and packet.pts != pending_pts:
+                self.emit(b"".join(pending), pending_pts, stream.time_base)
+                pending = []
+            pending.append(bytes(packet))
+            pending_pts = packet.pts
+
+    def cache_parameter_sets(self, data):
+        """Caches the SPS/PPS found in `data` and returns the types of all its NAL units."""
+        types = set()
+        for nal_type, start, end in nal_units(data):
+            types.add(nal_type)
+            if nal_type in (NAL_SPS, NAL_PPS):
+                self.parameter_sets[nal_type] = b"\x00\x00\x00\x01" + data[start:end]
+        return types
+
+    def emit(self, data, pts, time_base):
+        types = self.cache_parameter_sets(data)
+        keyframe = NAL_IDR in types
+        if keyframe and NAL_SPS not in types and len(self.parameter_sets) == 2:
+            data = self.parameter_sets[NAL_SPS] + self.parameter_sets[NAL_PPS] + data
+
+        packet = av.Packet(data)
+        packet.pts = pts
+        packet.time_base = time_base
+        packet.is_keyframe = keyframe
+        self.access_units += 1
+        self.loop.call_soon_threadsafe(self.publish, [packet])
@@ -0,0 +1,71 @@
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+DEFAULT_QUALITY = 80
+
+
+class JpegCache:
+    """
+    The newest frame of each frame ring as JPEG, for HTTP snapshot and MJPEG clients.
+
+    A frame is encoded at most once, however many clients poll: the result is cached
+    under the ring sequence number, and clients asking while an encode is running wait
+    for that one. Rings are only peeked, the WebRTC relays keep getting every frame.
+    """
+
+    def __init__(self, rings, quality=DEFAULT_QUALITY, workers=2):
+        self.rings = rings  # {camera name: FrameRingBuffer}
+        self.quality = quality
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Jpeg")
+        self.cached = {}  # name -> (seq, timestamp, jpeg bytes)
+        self.pending = {}  # name -> future of the running encode
+        self.encodes = 0
+        self.hits = 0
+
+    def encode(self, name):
+        """Encodes the newest frame of the ring. Runs on the pool."""
+        ring = self.rings[name]
+        for _ in range(3):
+            try:
+                frame, seq, timestamp = ring.peek_latest()
+            except queue.Empty:
+                return None
+            ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if ok and ring.is_current(seq):
+                return seq, timestamp, data.tobytes()
+            # Overwritten by the producer while encoding, take the newer frame
+        return None
+
+    async def latest(self, name):
+        """Returns (seq, timestamp, jpeg) of the newest frame, None if the camera has none yet."""
+        cached = self.cached.get(name)
+        if cached is not None and cached[0] == self.rings[name].write_seq:
+            self.hits += 1
+            return cached
+        future = self.pending.get(name)
+        if future is None:
+            future = asyncio.get_event_loop().run_in_executor(self.pool, self.encode, name)
+            future.add_done_callback(lambda done: self.finish(name, done))
+            self.pending[name] = future
+        else:
+            self.hits += 1
+        # Shielded, a client that disconnects does not cancel the encode for the others
+        return await asyncio.shield(future)
+
+    def finish(self, name, future):
+        del self.pending[name]
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if result is not None:
+            self.encodes += 1
+            self.cached[name] = result
+
+    def stats(self):
+        return {"encodes": self.encodes, "hits": self.hits}
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -1,86 +1,140 @@
 import asyncio
 import multiprocessing
+import os
 import threading
 from WebRTC import WebRTCServer
 from communication_handler import CommunicationHandler
 from task_manager import TaskManager
 from websocket_server import WebSocketServer
 from Thread_info import ThreadWatcher
+from frame_ring import FrameRingBuffer
+from camerafeed.frame_sources import largest_frame_size, parse_size
+from mode_registry import CAMERA_ORDER
+from overlay_bus import OverlayBus
+from telemetry import TelemetryStore, TelemetrySubscriber
 
 # Method for graceful shutdown.
 async def cleanup(thread_watcher, 
                   task_manager, 
                   communication, 
                   websocket_server, 
-                  webrtc_server):
+                  webrtc_server,
+                  frame_queue,
+                  telemetry=None):
     
     print("\nShutting down safely...")
     
     thread_watcher.stop_all_threads()
-    task_manager.stop_all_tasks()
+    task_manager.stop()
     communication.stop()
+    if telemetry is not None:
+        telemetry.stop()
     await websocket_server.stop_server()
     await webrtc_server.shutdown()
+
+    for ring in frame_queue:
+        ring.close()
+        ring.unlink()
     print("[Main] Cleanup complete")
 
 
 def main():
     # Queues for communication
-    command_queue = multiprocessing.Queue()  # Commands from frontend
     rov_data_queue = multiprocessing.Queue()  # ROV data to .NET
 
     manual_flag = multiprocessing.Value("i", 1)  # 1 = Manual mode, 0 = Autonomy
 
-    # Video Frames to be sent to .NET
-    stereo_left_queue = multiprocessing.Queue(15)
-    stereo_right_queue = multiprocessing.Queue(15)
-    down_queue = multiprocessing.Queue(15)
-    manipulator_queue = multiprocessing.Queue(15)
+    # Video Frames to be sent to .NET (shared memory rings, oldest frame is dropped when full).
+    # ROV_MAX_FRAME=WIDTHxHEIGHT is the largest frame a ring slot holds (default 1280x720),
+    # raised to fit larger replayed sources (CAMERA_SOURCES)
+    width, height = largest_frame_size(CAMERA_ORDER, parse_size(os.environ.get("ROV_MAX_FRAME", "1280x720")))
+    max_shape = (height, width, 3)
+    stereo_left_queue = FrameRingBuffer("StereoL", max_shape=max_shape)
+    stereo_right_queue = FrameRingBuffer("StereoR", max_shape=max_shape)
+    down_queue = FrameRingBuffer("Down", max_shape=max_shape)
+    manipulator_queue = FrameRingBuffer("Manipulator", max_shape=max_shape)
     frame_queue = [stereo_left_queue, stereo_right_queue, down_queue, manipulator_queue]
 
-    # 0 = No Mode, 1 = Manual, 2 = Docking, 3 = transect, 4 = SeaGrass, 5 = All Cameras, 6 = Test Camera
+    # 0 = No Mode, 1 = Manual, 2 = Docking, 3 = transect, 4 = SeaGrass, 5 = All Cameras, 6 = Test Camera, 7 = Mosaic
     mode_flag = multiprocessing.Value("i", 0)  
 
+    # WEBRTC_PASSTHROUGH=1 streams the ROV's H.264 without decoding in modes that run no vision (manual)
+    passthrough = os.environ.get("WEBRTC_PASSTHROUGH") == "1"
+
+    # Detection results for the viewers' "overlays" data channel.
+    # WEBRTC_CLIENT_OVERLAYS=1: nothing is drawn into the video while every viewer draws them itself.
+    # The GUI-Frontend viewer does not open the channel yet, so it keeps getting annotated video.
+    overlays = OverlayBus(client_side=os.environ.get("WEBRTC_CLIENT_OVERLAYS") == "1")
+
+    # ROV_CONTROL_HZ: rate of the drive commands sent in the autonomous modes, independent of the frame rate
+    control_rate = float(os.environ.get("ROV_CONTROL_HZ", "50"))
+
     # Start thread watcher to manage all threads.
     thread_watcher = ThreadWatcher()
 
     # Start network handler (communication with .NET using ZeroMQ).
     id = thread_watcher.add_thread()
+    # ROV_WIRE_FORMAT=binary sends autonomy packets in the rov_wire struct layout instead of JSON
     communication = CommunicationHandler(
         rov_data_queue,
         thread_watcher,
-        id)
+        id,
+        wire_format=os.environ.get("ROV_WIRE_FORMAT", "json"))
     
     communication_thread = threading.Thread(target=communication.send_rov_data, daemon=True)
     communication_thread.start()
 
+    # ROV_TELEMETRY=1 subscribes to depth, heading and attitude from .NET for closed-loop autonomy.
+    # Without it the store stays empty and the autonomous modes steer on the image alone.
+    # Off by default: the .NET backend does not publish telemetry yet (see TelemetrySubscriber).
+    telemetry_store = TelemetryStore()
+    telemetry = None
+    if os.environ.get("ROV_TELEMETRY") == "1":
+        id = thread_watcher.add_thread()
+        telemetry = TelemetrySubscriber(
+            telemetry_store,
+            thread_watcher,
+            id,
+            telemetry_port=int(os.environ.get("ROV_TELEMETRY_PORT", "5007")))
 
-    # Start task manager (controls execution).
+        telemetry_thread = threading.Thread(target=telemetry.receive_telemetry, daemon=True)
+        telemetry_thread.start()
+
+
+    # Task manager (controls execution), runs the commands it is handed on its own worker thread.
     id = thread_watcher.add_thread()
     task_manager = TaskManager(
-        command_queue,
         rov_data_queue,
         stereo_left_queue,
         stereo_right_queue,
         down_queue,
         manipulator_queue,
         manual_flag,
-        mode_flag, 
-        thread_watcher, id)
+        mode_flag,
+        thread_watcher,
+        id,
+        passthrough=passthrough,
+        overlays=overlays,
+        control_rate=control_rate,
+        telemetry=telemetry_store)
     
-    task_thread = threading.Thread(target=task_manager.run, daemon=True)
-    task_thread.start()
-
 
     # Start WebSocket server in its own thread (To receive Commands from Frontend).
+    # Commands go straight to the task manager, the sender gets an ack with the resulting mode.
     id = thread_watcher.add_thread()
-    websocket_server = WebSocketServer(command_queue, thread_watcher, id)
+    websocket_server = WebSocketServer(task_manager.submit, thread_watcher, id)
     
     websocket_thread = threading.Thread(target=websocket_server.run, daemon=True)
     websocket_thread.start()
 
     # Start WebRTC server for sending Video Feed to fronted (UDP).
-    webrtc_server = WebRTCServer(frame_queue, mode_flag)
+    # WEBRTC_ENCODE_ONCE=1 shares one H.264 encoder per camera between all viewers
+    webrtc_server = WebRTCServer(
+        frame_queue, mode_flag,
+        encode_once=os.environ.get("WEBRTC_ENCODE_ONCE") == "1",
+        passthrough=passthrough,
+        bandwidth_budget=int(os.environ.get("WEBRTC_BUDGET_KBPS", "8000")) * 1000,
+        overlays=overlays)
 
     webrtc_thread = threading.Thread(
         target=webrtc_server.run, daemon=True)
@@ -91,13 +145,13 @@ def main():
         while True:
             text = input("Waiting for input")
             if text == "shutdown":
-                asyncio.run(cleanup(thread_watcher, task_manager, communication, websocket_server, webrtc_server))
+                asyncio.run(cleanup(thread_watcher, task_manager, communication, websocket_server, webrtc_server, frame_queue, telemetry))
                 break
             pass  # Keep running
 
     except KeyboardInterrupt:
         print("\nShutting down safely...")
-        asyncio.run(cleanup(thread_watcher, task_manager, communication, websocket_server, webrtc_server))
+        asyncio.run(cleanup(thread_watcher, task_manager, communication, websocket_server, webrtc_server, frame_queue, telemetry))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+# Which cameras each mode needs. Shared by TaskManager, ExecutionClass and WebRTCServer,
+# so the captures that are open and the streams that are sent always agree.
+
+MODE_NONE = 0
+MODE_MANUAL = 1
+MODE_DOCKING = 2
+MODE_PIPELINE = 3
+MODE_SEAGRASS = 4
+MODE_ALL_CAMERAS = 5
+MODE_TEST = 6
+MODE_MOSAIC = 7
+
+MODE_NAMES = {
+    MODE_NONE: "No Mode",
+    MODE_MANUAL: "Manual",
+    MODE_DOCKING: "Docking",
+    MODE_PIPELINE: "Pipeline",
+    MODE_SEAGRASS: "Seagrass",
+    MODE_ALL_CAMERAS: "All cameras",
+    MODE_TEST: "Test",
+    MODE_MOSAIC: "Mosaic",
+}
+
+# Order of the frame rings in main.py and of the WebRTC tracks
+CAMERA_ORDER = ("StereoL", "StereoR", "Down", "Manipulator")
+
+MODE_CAMERAS = {
+    MODE_NONE: (),
+    MODE_MANUAL: ("Down", "Manipulator"),
+    MODE_DOCKING: ("Down", "Manipulator"),
+    MODE_PIPELINE: ("Manipulator",),
+    MODE_SEAGRASS: ("StereoL", "StereoR", "Down"),
+    MODE_ALL_CAMERAS: ("StereoL", "StereoR", "Down", "Manipulator"),
+    MODE_TEST: ("StereoL", "Down"),
+    MODE_MOSAIC: ("StereoL", "StereoR", "Down", "Manipulator"),
+}
+
+# Modes without vision: WebRTC can forward the ROV's H.264 as is (WEBRTC_PASSTHROUGH=1)
+PASSTHROUGH_MODES = (MODE_MANUAL,)
+
+# Modes streamed as a single composited track instead of one track per camera
+MOSAIC_MODES = (MODE_MOSAIC,)
+
+# CaptureProfile (see camerafeed.gst_pipeline.CAPTURE_PROFILES) used by a mode, default "display"
+MODE_CAPTURE_PROFILES = {
+    MODE_PIPELINE: "pipeline",
+}
+
+
+def cameras_for_mode(mode):
+    """Names of the cameras the mode needs, in CAMERA_ORDER."""
+    return MODE_CAMERAS.get(mode, ())
+
+
+def capture_profile_for_mode(mode):
+    return MODE_CAPTURE_PROFILES.get(mode, "display")
+
+
+def is_passthrough(mode):
+    return mode in PASSTHROUGH_MODES
+
+
+def is_mosaic(mode):
+    return mode in MOSAIC_MODES
+
+
+def stream_flags(mode):
+    """One flag per camera in CAMERA_ORDER, True if the mode streams it on its own track."""
+    if is_mosaic(mode):
+        return [False] * len(CAMERA_ORDER)
+    needed = cameras_for_mode(mode)
+    return [name in needed for name in CAMERA_ORDER]
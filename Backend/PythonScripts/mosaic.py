@@ -0,0 +1,131 @@
+import math
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from frame_relay import Relay
+
+
+class MosaicCompositor:
+    """
+    Composites several cameras into one preallocated canvas.
+
+    Each camera gets a grid cell; its frame is resized (aspect kept) straight into a
+    view of the canvas with cv2.resize(dst=...), so composing allocates nothing.
+    """
+
+    def __init__(self, names, canvas_size=(720, 1280)):
+        self.names = list(names)
+        self.canvas = np.zeros(canvas_size + (3,), dtype=np.uint8)
+        self.columns = math.ceil(math.sqrt(len(self.names)))
+        self.rows = math.ceil(len(self.names) / self.columns)
+        self.shapes = {}  # Source frame shape per camera, the layout follows it
+        self.tiles = {}  # name -> (x, y, width, height) inside the canvas
+        self.gray = {}  # Resize buffers for single channel cameras
+        for name in self.names:
+            self.place(name, None)
+
+    def cell(self, index):
+        height, width = self.canvas.shape[:2]
+        cell_w, cell_h = width // self.columns, height // self.rows
+        return (index % self.columns) * cell_w, (index // self.columns) * cell_h, cell_w, cell_h
+
+    def place(self, name, shape):
+        """Fits a frame of `shape` centered in the camera's cell and clears the cell."""
+        x, y, cell_w, cell_h = self.cell(self.names.index(name))
+        self.canvas[y:y + cell_h, x:x + cell_w] = 0
+        if shape is None:
+            self.tiles[name] = (x, y, cell_w, cell_h)
+        else:
+            scale = min(cell_w / shape[1], cell_h / shape[0])
+            width, height = max(1, int(shape[1] * scale)), max(1, int(shape[0] * scale))
+            self.tiles[name] = (x + (cell_w - width) // 2, y + (cell_h - height) // 2, width, height)
+            if len(shape) == 2:
+                self.gray[name] = np.empty((height, width), dtype=np.uint8)
+        self.shapes[name] = shape
+
+    def draw(self, name, frame):
+        if frame.shape != self.shapes[name]:
+            self.place(name, frame.shape)
+        x, y, width, height = self.tiles[name]
+        tile = self.canvas[y:y + height, x:x + width]
+        if frame.ndim == 2:
+            # GRAY8 capture profiles; resize in one channel, then expand into the tile
+            cv2.resize(frame, (width, height), dst=self.gray[name], interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.gray[name], cv2.COLOR_GRAY2BGR, dst=tile)
+        else:
+            cv2.resize(frame, (width, height), dst=tile, interpolation=cv2.INTER_AREA)
+
+    def clear(self, name):
+        if self.shapes[name] is not None:
+            self.place(name, None)
+
+    def layout(self):
+        """Tile positions for the frontend, in canvas pixels."""
+        height, width = self.canvas.shape[:2]
+        return {
+            "width": width,
+            "height": height,
+            "tiles": [
+                {"camera": name, "x": x, "y": y, "width": w, "height": h, "live": self.shapes[name] is not None}
+                for name, (x, y, w, h) in self.tiles.items()
+            ],
+        }
+
+
+class MosaicRelay(Relay):
+    """
+    Streams the mosaic of several frame rings as one track.
+
+    Composes at a fixed rate from the newest frame of every ring; a camera without a
+    new frame keeps its last picture, one without frames for `stale_after` seconds
+    is blanked. The composed canvas goes through `convert` like a single camera frame.
+    """
+
+    def __init__(self, rings, active, loop, convert, fps=30, canvas_size=(720, 1280), stale_after=2.0):
+        super().__init__("Mosaic", active, loop)
+        self.rings = rings  # {camera name: FrameRingBuffer}
+        self.readers = {name: ring.reader() for name, ring in rings.items()}  # Own positions, the camera relays keep theirs
+        self.convert = convert
+        self.period = 1.0 / fps
+        self.stale_after = stale_after
+        self.compositor = MosaicCompositor(rings, canvas_size)
+        self.frame_shape = canvas_size
+        self.last_frame = {name: 0.0 for name in rings}
+        self.seq = 0
+        self.start()
+
+    def run(self):
+        next_time = time.monotonic()
+        while not self.stopped.is_set():
+            if not self.wanted():
+                next_time = time.monotonic()
+                continue
+            delay = next_time - time.monotonic()
+            if delay > 0 and self.stopped.wait(delay):
+                break
+            next_time = max(next_time + self.period, time.monotonic() - self.period)
+
+            now = time.monotonic()
+            for name, ring in self.rings.items():
+                try:
+                    frame, seq, _ = self.readers[name].get_latest(block=False)
+                except queue.Empty:
+                    if now - self.last_frame[name] > self.stale_after:
+                        self.compositor.clear(name)
+                    continue
+                self.compositor.draw(name, frame)
+                if not ring.is_current(seq):
+                    # Overwritten while drawing, the tile may be torn: draw the newer frame
+                    frame, seq, _ = ring.peek_latest()
+                    self.compositor.draw(name, frame)
+                self.last_frame[name] = now
+
+            self.seq += 1
+            item = self.convert(self.compositor.canvas, self.seq, time.time(), self.requested_views())
+            self.loop.call_soon_threadsafe(self.publish, item)
+
+    def layout(self):
+        return self.compositor.layout()
@@ -0,0 +1,46 @@
+class OverlayBus:
+    """
+    Carries detection results from the vision tasks to the WebRTC viewers.
+
+    A task publishes what it found in a frame (pipeline polylines, marker corners,
+    drive vector, ...) together with the camera name, frame ring sequence number and
+    capture timestamp of that frame; the WebRTC server sends it over the peers'
+    "overlays" data channel and the frontend draws it over the matching video frame.
+
+    client_side=True lets viewers draw the overlays themselves, so the tasks stop
+    drawing into the frames and the video stays clean (and cheaper to encode). The
+    frontend in GUI-Frontend does not open the channel, so the frames are only left
+    clean while every connected viewer has it open (see clean_video).
+    """
+
+    def __init__(self, client_side=False):
+        self.client_side = client_side
+        self.listeners = []
+        self.published = 0
+        self.viewers = 0  # Connected viewers, and how many of them opened the "overlays" channel
+        self.drawing_viewers = 0
+
+    def set_viewers(self, viewers, drawing_viewers):
+        """Called by the WebRTC server when a viewer or its "overlays" channel comes or goes."""
+        self.viewers = viewers
+        self.drawing_viewers = drawing_viewers
+
+    @property
+    def clean_video(self):
+        """True if the tasks should not draw into the frames: every viewer draws the overlays."""
+        return self.client_side and 0 < self.viewers <= self.drawing_viewers
+
+    def add_listener(self, callback):
+        """Registers callback(message). It runs on the publishing task's thread and must not block."""
+        self.listeners = self.listeners + [callback]
+
+    def remove_listener(self, callback):
+        self.listeners = [listener for listener in self.listeners if listener != callback]
+
+    def publish(self, camera, seq, timestamp, overlay):
+        if seq is None or not overlay:
+            return  # The frame itself was not streamed
+        message = dict(overlay, camera=camera, seq=seq, timestamp=timestamp)
+        self.published += 1
+        for listener in self.listeners:
+            listener(message)
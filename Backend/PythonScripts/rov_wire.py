@@ -0,0 +1,114 @@
+import json
+import struct
+from collections import namedtuple
+
+# Autonomy packets on the ZMQ PUSH channel to .NET (ZmqCommunicationService).
+#
+# Binary layout, little endian, 24 bytes:
+#   uint8   version      WIRE_VERSION
+#   uint8   type         MSG_AUTONOMY
+#   uint16  flags        0, reserved
+#   uint32  seq          increases by one per packet sent, wraps around
+#   float64 timestamp    capture time of the frame the packet was computed from (Unix seconds)
+#   int16[4] axes        drive vector, same four values as "autonom_data"
+#
+# The JSON fallback is the original {"autonom_data": [a, b, c, d]} message. A JSON message
+# starts with "{", which is never a valid version byte, so a receiver can accept both.
+#
+# Telemetry from .NET to Python (telemetry.TelemetrySubscriber), little endian, 32 bytes:
+#   uint8   version      WIRE_VERSION
+#   uint8   type         MSG_TELEMETRY
+#   uint16  flags        0, reserved
+#   uint32  seq          increases by one per packet sent, wraps around
+#   float64 timestamp    time the ROV sampled the sensors (Unix seconds)
+#   float32[4] values    TELEMETRY_FIELDS: depth (m), heading (deg, 0-360), roll (deg), pitch (deg)
+WIRE_VERSION = 1
+MSG_AUTONOMY = 1
+MSG_TELEMETRY = 2
+AUTONOMY_STRUCT = struct.Struct("<BBHId4h")
+TELEMETRY_STRUCT = struct.Struct("<BBHId4f")
+TELEMETRY_FIELDS = ("depth", "heading", "roll", "pitch")
+
+WIRE_FORMATS = ("json", "binary")
+INT16_MIN, INT16_MAX = -32768, 32767
+
+AutonomyPacket = namedtuple("AutonomyPacket", ["seq", "timestamp", "axes"])
+TelemetryPacket = namedtuple("TelemetryPacket", ["seq", "timestamp", "values"])
+
+
+def to_axes(values):
+    """The first four values rounded and clamped to int16."""
+    return [min(INT16_MAX, max(INT16_MIN, int(round(value)))) for value in values[:4]]
+
+
+def encode_autonomy(values, seq=0, timestamp=0.0):
+    return AUTONOMY_STRUCT.pack(WIRE_VERSION, MSG_AUTONOMY, 0, seq & 0xFFFFFFFF, timestamp, *to_axes(values))
+
+
+def encode_autonomy_json(values):
+    return json.dumps({"autonom_data": to_axes(values)}).encode()
+
+
+def decode(data):
+    """Decodes a binary or JSON autonomy message. Raises ValueError for anything else."""
+    if data[:1] == b"{":
+        axes = json.loads(data)["autonom_data"]
+        if len(axes) < 4:
+            raise ValueError(f"autonom_data has {len(axes)} values, expected 4")
+        return AutonomyPacket(None, None, [int(value) for value in axes[:4]])
+    if len(data) != AUTONOMY_STRUCT.size:
+        raise ValueError(f"{len(data)} byte message, expected {AUTONOMY_STRUCT.size}")
+    version, msg_type, _, seq, timestamp, *axes = AUTONOMY_STRUCT.unpack(data)
+    if version != WIRE_VERSION or msg_type != MSG_AUTONOMY:
+        raise ValueError(f"unsupported message version {version} type {msg_type}")
+    return AutonomyPacket(seq, timestamp, axes)
+
+
+def encode_telemetry(values, seq=0, timestamp=0.0):
+    return TELEMETRY_STRUCT.pack(WIRE_VERSION, MSG_TELEMETRY, 0, seq & 0xFFFFFFFF, timestamp, *values)
+
+
+def decode_telemetry(data):
+    """Decodes a binary telemetry message. Raises ValueError for anything else."""
+    if len(data) != TELEMETRY_STRUCT.size:
+        raise ValueError(f"{len(data)} byte message, expected {TELEMETRY_STRUCT.size}")
+    version, msg_type, _, seq, timestamp, *values = TELEMETRY_STRUCT.unpack(data)
+    if version != WIRE_VERSION or msg_type != MSG_TELEMETRY:
+        raise ValueError(f"unsupported message version {version} type {msg_type}")
+    return TelemetryPacket(seq, timestamp, values)
+
+
+if __name__ == "__main__":
+    # Stand-in for the .NET PULL side: prints what the Python process sends
+    #   python rov_wire.py [port]
+    import sys
+    import time
+
+    import zmq
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5006
+    context = zmq.Context()
+    pull = context.socket(zmq.PULL)
+    pull.bind(f"tcp://127.0.0.1:{port}")
+    print(f"[WIRE] Listening for autonomy packets on port {port}")
+    last_seq = None
+    try:
+        while True:
+            message = pull.recv()
+            try:
+                packet = decode(message)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[WIRE] Invalid message ({len(message)} bytes): {e}")
+                continue
+            if packet.seq is None:
+                print(f"[WIRE] JSON {packet.axes}")
+                continue
+            gap = "" if last_seq is None or packet.seq == (last_seq + 1) & 0xFFFFFFFF else f" ({packet.seq - last_seq - 1} skipped)"
+            last_seq = packet.seq
+            age_ms = (time.time() - packet.timestamp) * 1000.0
+            print(f"[WIRE] #{packet.seq} {packet.axes} captured {age_ms:.1f} ms ago{gap}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pull.close()
+        context.term()
@@ -0,0 +1,100 @@
+import fractions
+import threading
+
+import av
+import numpy as np
+
+# Same stream aiortc's own H264Encoder produces (Constrained Baseline, level 3.1),
+# so it matches the H.264 profiles aiortc offers in the SDP
+H264_OPTIONS = {
+    "level": "31",
+    "tune": "zerolatency",
+    "preset": "veryfast",
+    "forced-idr": "1",  # A requested keyframe must be an IDR, new viewers cannot start on a plain I frame
+}
+
+DEFAULT_BITRATE = 2000000  # bits/s per camera
+DEFAULT_FRAMERATE = 30
+KEYFRAME_INTERVAL = 2.0  # Seconds; also how long a viewer that lost packets waits for a clean picture
+
+
+class SharedH264Encoder:
+    """
+    Encodes one camera once for every WebRTC viewer.
+
+    Used as the `convert` of a FrameRelay: each VideoFrame is encoded on the relay
+    thread and the resulting av.Packets are handed to the tracks, which aiortc only
+    packetizes (RTCRtpSender.pack) per peer. A new viewer calls request_keyframe()
+    so it can start decoding right away instead of at the next periodic keyframe.
+    """
+
+    def __init__(self, name, bitrate=DEFAULT_BITRATE, framerate=DEFAULT_FRAMERATE, time_base=fractions.Fraction(1, 90000)):
+        self.name = name
+        self.bitrate = bitrate
+        self.framerate = framerate
+        self.time_base = time_base
+        self.codec = None
+        self.force_keyframe = threading.Event()
+        self.frames = 0
+        self.keyframes = 0
+
+    def open(self, width, height):
+        codec = av.CodecContext.create("libx264", "w")
+        codec.width = width
+        codec.height = height
+        codec.bit_rate = self.bitrate
+        codec.pix_fmt = "yuv420p"
+        codec.framerate = fractions.Fraction(self.framerate, 1)
+        codec.time_base = self.time_base
+        codec.gop_size = int(KEYFRAME_INTERVAL * self.framerate)
+        codec.options = H264_OPTIONS
+        codec.profile = "Baseline"
+        self.codec = codec
+        print(f"[ENCODER] {self.name}: libx264 {width}x{height} at {self.bitrate // 1000} kbit/s")
+
+    def set_bitrate(self, bitrate):
+        """Changes the target bitrate; the encoder restarts (with a keyframe) if it changed by over 10%."""
+        if abs(bitrate - self.bitrate) > 0.1 * self.bitrate:
+            print(f"[ENCODER] {self.name}: bitrate {self.bitrate // 1000} -> {bitrate // 1000} kbit/s")
+            self.bitrate = bitrate
+            self.codec = None
+
+    def request_keyframe(self):
+        self.force_keyframe.set()
+
+    def encode(self, video_frame):
+        """Returns the av.Packets for one VideoFrame (usually one, none while the encoder fills up)."""
+        if self.codec is None or (video_frame.width, video_frame.height) != (self.codec.width, self.codec.height):
+            self.open(video_frame.width, video_frame.height)  # New capture profile, start over with a keyframe
+            self.force_keyframe.clear()
+        elif self.force_keyframe.is_set():
+            self.force_keyframe.clear()
+            video_frame.pict_type = av.video.frame.PictureType.I
+            self.keyframes += 1
+
+        if video_frame.format.name != "yuv420p":
+            video_frame = video_frame.reformat(format="yuv420p")
+        packets = self.codec.encode(video_frame)
+        for packet in packets:
+            packet.time_base = self.time_base
+        self.frames += 1
+        return packets
+
+    def stats(self):
+        return {"frames": self.frames, "forced_keyframes": self.keyframes, "bitrate": self.bitrate}
+
+
+_black_packets = {}
+
+
+def black_keyframe(width=1280, height=720, time_base=fractions.Fraction(1, 90000)):
+    """A single black H.264 keyframe (pts 0), sent to mute a packet track until its camera streams."""
+    key = (width, height)
+    if key not in _black_packets:
+        encoder = SharedH264Encoder("Black", bitrate=100000, time_base=time_base)
+        frame = av.VideoFrame.from_ndarray(np.zeros((height, width, 3), dtype=np.uint8), format="bgr24")
+        frame.pts = 0
+        frame.time_base = time_base
+        packets = encoder.encode(frame) + encoder.codec.encode(None)  # Flush, zerolatency has no delay
+        _black_packets[key] = packets[0]
+    return _black_packets[key]
@@ -0,0 +1,115 @@
+import time
+
+# Steps a WebRTC track walks down when its link gets worse: (scale, frames per second)
+QUALITY_LEVELS = [
+    (1.0, 30),
+    (0.75, 30),
+    (0.5, 30),
+    (0.5, 15),
+    (0.25, 15),
+    (0.25, 5),
+]
+
+BITS_PER_PIXEL = 0.08  # H.264 bitrate a level needs per pixel per frame for a usable picture
+MIN_BITRATE = 150000
+
+# aiortc clamps the target bitrate of its own encoders to (MIN_BITRATE, MAX_BITRATE) of
+# aiortc.codecs.h264 / aiortc.codecs.vpx (same values from the pinned 1.5.0 to 1.15),
+# keyed by encoder class name
+ENCODER_BITRATE_LIMITS = {
+    "H264Encoder": (500000, 3000000),
+    "Vp8Encoder": (250000, 1500000),
+}
+
+LOSS_DOWN = 0.10  # Fraction of packets lost that makes a track step down right away
+LOSS_UP = 0.02  # Only step up again while loss stays below this...
+UPGRADE_HOLD = 4.0  # ...for this many seconds
+RTT_DOWN = 0.5  # Seconds; queues on the tether are building up
+
+
+def split_budget(budget, floors):
+    """
+    Splits `budget` bits/s equally between tracks that cannot go below `floors` bits/s.
+    A share under a track's floor would be raised to the floor, taking the sum over the
+    budget, so tracks are paused from the end of the list until every share covers the
+    floors. Returns the allowance of each track, None for a paused one.
+    """
+    active = len(floors)
+    while active and max(floors[:active]) > budget / active:
+        active -= 1
+    return [budget / active if index < active else None for index in range(len(floors))]
+
+
+def level_bitrate(level, frame_size):
+    """Bitrate level `level` needs for frames of frame_size (height, width) at full scale."""
+    scale, fps = QUALITY_LEVELS[level]
+    height, width = frame_size
+    return int(BITS_PER_PIXEL * width * height * scale * scale * fps)
+
+
+class TrackAdapter:
+    """
+    Picks the scale, frame rate and encoder bitrate of one track from RTCP feedback.
+
+    Receiver reports give loss and round trip time (through RTCRtpSender.getStats()),
+    REMB gives the receiver's bandwidth estimate (aiortc writes it into the encoder's
+    target bitrate). aiortc does not implement transport-wide congestion control, so
+    TWCC feedback is not available.
+    """
+
+    def __init__(self):
+        self.level = 0
+        self.bitrate = None  # Target bitrate chosen last
+        self.estimate = None  # Latest REMB estimate, bits/s
+        self.loss = 0.0
+        self.rtt = None
+        self.good_since = time.monotonic()
+        self.packets_sent = 0
+        self.packets_lost = 0
+
+    def update(self, report, remb=None, now=None):
+        """Reads the sender's RTCStatsReport (and REMB estimate, if one arrived)."""
+        now = time.monotonic() if now is None else now
+        sent = lost = None
+        for stats in report.values():
+            if stats.type == "outbound-rtp":
+                sent = stats.packetsSent - self.packets_sent
+                self.packets_sent = stats.packetsSent
+            elif stats.type == "remote-inbound-rtp":
+                lost = stats.packetsLost - self.packets_lost
+                self.packets_lost = stats.packetsLost
+                self.rtt = stats.roundTripTime
+        if sent and lost is not None:
+            self.loss = max(0.0, min(1.0, lost / sent))
+        if remb is not None:
+            self.estimate = remb
+        if self.loss >= LOSS_UP or (self.rtt is not None and self.rtt > RTT_DOWN):
+            self.good_since = now
+
+    def choose(self, allowance, frame_size, now=None):
+        """Returns (scale, fps, bitrate) within `allowance` bits/s."""
+        now = time.monotonic() if now is None else now
+        limit = allowance if self.estimate is None else min(allowance, self.estimate)
+
+        # Best level the bandwidth allows
+        fits = len(QUALITY_LEVELS) - 1
+        for level in range(len(QUALITY_LEVELS)):
+            if level_bitrate(level, frame_size) <= limit:
+                fits = level
+                break
+
+        if self.loss > LOSS_DOWN or (self.rtt is not None and self.rtt > RTT_DOWN):
+            level = max(fits, min(self.level + 1, len(QUALITY_LEVELS) - 1))
+        elif fits < self.level and now - self.good_since >= UPGRADE_HOLD:
+            level = self.level - 1  # One step at a time, then hold again
+            self.good_since = now
+        else:
+            level = max(fits, self.level)
+
+        if level != self.level:
+            print(f"[ADAPT] Level {self.level} -> {level} (loss {self.loss:.0%}, rtt {self.rtt}, limit {int(limit) // 1000} kbit/s)")
+        self.level = level
+        # Headroom over what the level needs, but never above the budget share
+        self.bitrate = int(min(limit, max(MIN_BITRATE, level_bitrate(level, frame_size) * 2)))
+        scale, fps = QUALITY_LEVELS[level]
+        return scale, fps, self.bitrate
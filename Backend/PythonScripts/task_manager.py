@@ -1,26 +1,37 @@
 import multiprocessing
 import threading
-import queue
-import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from Thread_info import ThreadWatcher
-from camerafeed.GUI_Camerafeed_Main import CameraManager, ExecutionClass
+from frame_ring import FrameRingBuffer
+from camerafeed.GUI_Camerafeed_Main import ExecutionClass
+from control_scheduler import DEFAULT_RATE
+from mode_registry import (
+    MODE_NONE, MODE_MANUAL, MODE_DOCKING, MODE_PIPELINE, MODE_ALL_CAMERAS, MODE_TEST, MODE_MOSAIC, MODE_NAMES)
 
 class TaskManager:
+    """
+    Runs the frontend's commands. submit() hands a command to a single worker thread,
+    so commands start immediately but still run one at a time and in order.
+    Commands are refused once the thread watcher stops the task manager.
+    """
+
     def __init__(
             self,
-            command_queue: multiprocessing.Queue,
             rov_data_queue: multiprocessing.Queue,
-            stereo_left_queue: multiprocessing.Queue,
-            stereo_right_queue: multiprocessing.Queue,
-            down_queue: multiprocessing.Queue,
-            manipulator_queue: multiprocessing.Queue,
+            stereo_left_queue: FrameRingBuffer,
+            stereo_right_queue: FrameRingBuffer,
+            down_queue: FrameRingBuffer,
+            manipulator_queue: FrameRingBuffer,
             manual_flag,
             mode_flag,
             thread_watcher: ThreadWatcher,
-            id: int):
+            id: int,
+            passthrough=False,
+            overlays=None,
+            control_rate=DEFAULT_RATE,
+            telemetry=None):
         
-        self.command_queue = command_queue
         self.stereo_left_queue = stereo_left_queue
         self.stereo_right_queue = stereo_right_queue
         self.down_queue = down_queue
@@ -32,9 +43,12 @@ class TaskManager:
             stereo_right_queue,
             down_queue,
             manipulator_queue,
-            manual_flag)
+            manual_flag,
+            passthrough,
+            overlays,
+            control_rate,
+            telemetry)
         
-        self.camera = CameraManager()
         self.current_task = None
         self.running = True
         self.manual_flag = manual_flag
@@ -43,86 +57,105 @@ class TaskManager:
         self.image_save_thread = None
         self.thread_watcher = thread_watcher
         self.id = id
-
-    def run(self):
-        while self.thread_watcher.should_run(self.id): 
+        self.dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TaskManager")
+
+    def submit(self, command):
+        """
+        Queues a command, returns a concurrent.futures.Future of (mode name, error).
+        The future never raises: errors are logged and returned, error is None on success.
+        """
+        if self.thread_watcher.should_run(self.id):
             try:
-                command = self.command_queue.get(timeout=1)
-                self.execute_command(command)
-            except queue.Empty:
-                time.sleep(0.5)
-                pass
+                return self.dispatcher.submit(self.execute_command, command)
+            except RuntimeError:
+                pass  # Shut down between the check and the submit
+        print(f"[TASK MANAGER] Shutting down, refused command: {command}")
+        refused = Future()
+        refused.set_result((MODE_NAMES[self.mode_flag.value], "Shutting down"))
+        return refused
+
+    def stop(self):
+        """Refuses further commands, ends the running task and closes cameras and recordings."""
+        self.thread_watcher.stop_thread(self.id)
+        self.dispatcher.shutdown(wait=True)
+        self.stop_all_tasks()
+        self.execution.stop_everything()
+        self.execution.Camera.snapshots.shutdown()
 
     def execute_command(self, command):
+        """Runs a command and returns (name of the mode it leaves the system in, error or None)."""
         print(f"[TASK MANAGER] Received command: {command}")
 
         valid_commands = {
             "START_CAMERA": self.start_camera,
+            "START_MOSAIC": self.start_mosaic,
             "START_PIPELINE": self.start_pipeline,
             "START_DOCKING": self.start_docking,
             "START_TEST": self.start_test_camera, # Not in use.
             "START_MANUAL": self.start_manual,
             "SAVE_IMAGE": self.save_image,
+            "RECORD": self.record,
         }
 
+        error = None
         if command in valid_commands:
-            valid_commands[command]()  # Call the corresponding function
+            try:
+                valid_commands[command]()  # Call the corresponding function
+            except Exception as e:
+                error = f"{command} failed: {e}"
+                print(f"[TASK MANAGER] {error}")
         else:
-            print(f"[TASK MANAGER] Unknown command: {command}")
+            error = f"Unknown command: {command}"
+            print(f"[TASK MANAGER] {error}")
+        return MODE_NAMES[self.mode_flag.value], error
 
     def stop_all_tasks(self):
+        """Ends the running task. Its cameras stay open until the next mode says otherwise."""
         if self.current_task:
             print("[TASK MANAGER] Stopping current task")
-            self.execution.stop_everything()
+            self.execution.stop_task()
+            if self.active_task_thread and self.active_task_thread.is_alive():
+                self.active_task_thread.join()
             self.current_task = None
-            self.mode_flag.value = 0
+            self.mode_flag.value = MODE_NONE
             self.manual_flag.value = 1  # Switch to manual mode
 
-    def start_camera(self): # This is not in use right now.
+    def switch_mode(self, task, mode, manual, task_function):
+        """Stops the current task and starts `task_function`, which opens the cameras of `mode`."""
         self.stop_all_tasks()
-        print("[TASK MANAGER] Starting camera feed")
-        self.current_task = "CAMERA"
-        self.mode_flag.value = 5
-        self.manual_flag.value = 1
-        self.start_task_in_thread(self.execution.show_all_cameras)
+        print(f"[TASK MANAGER] Starting {MODE_NAMES[mode]} mode")
+        self.current_task = task
+        self.mode_flag.value = mode
+        self.manual_flag.value = manual
+        self.start_task_in_thread(task_function)
+
+    def start_camera(self): # This is not in use right now.
+        self.switch_mode("CAMERA", MODE_ALL_CAMERAS, 1, self.execution.show_all_cameras)
+
+    def start_mosaic(self):
+        self.switch_mode("MOSAIC", MODE_MOSAIC, 1, self.execution.show_mosaic)
 
     def start_pipeline(self):
-        self.stop_all_tasks()
-        print("[TASK MANAGER] Starting pipeline mode")
-        self.current_task = "PIPELINE"
-        self.mode_flag.value = 3
-        self.manual_flag.value = 0
-        self.start_task_in_thread(self.execution.pipeline)
+        self.switch_mode("PIPELINE", MODE_PIPELINE, 0, self.execution.pipeline)
 
     def start_docking(self):
-        self.stop_all_tasks()
-        print("[TASK MANAGER] Starting docking mode")
-        self.current_task = "DOCKING"
-        self.mode_flag.value = 2
-        self.manual_flag.value = 0
-        self.start_task_in_thread(self.execution.docking)
+        self.switch_mode("DOCKING", MODE_DOCKING, 0, self.execution.docking)
 
     def save_image(self):
         print("[TASK MANAGER] Save Image")
         self.image_save_thread = threading.Thread(target=self.execution.save_image, daemon=True)
         self.image_save_thread.start()
 
+    def record(self):
+        print("[TASK MANAGER] Toggle recording")
+        self.execution.record()
+
     def start_test_camera(self): # This is not in use right now.
-        self.stop_all_tasks()
-        print("[TASK MANAGER] Running camera test")
-        self.current_task = "TEST"
-        self.mode_flag.value = 5
-        self.manual_flag.value = 0
-        self.start_task_in_thread(self.execution.camera_test)
+        self.switch_mode("TEST", MODE_TEST, 0, self.execution.camera_test)
 
-    def start_manual(self): # might need camera open before(all or some)
+    def start_manual(self):
         """Switch to manual mode"""
-        self.stop_all_tasks()
-        print("[TASK MANAGER] Switching to manual mode")
-        self.current_task = "MANUAL"
-        self.mode_flag.value = 1
-        self.manual_flag.value = 1
-        self.start_task_in_thread(self.execution.show_manual_cameras)
+        self.switch_mode("MANUAL", MODE_MANUAL, 1, self.execution.show_manual_cameras)
 
     def start_task_in_thread(self, task_function):
         """Start a task in a separate thread"""
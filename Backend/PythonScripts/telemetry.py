@@ -0,0 +1,160 @@
+import math
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import zmq
+from Thread_info import ThreadWatcher
+from rov_wire import TELEMETRY_FIELDS, decode_telemetry
+
+POLL_TIMEOUT = 500  # Milliseconds the subscriber waits for data before checking whether it should stop
+
+Telemetry = namedtuple("Telemetry", ["seq", "timestamp", "received"] + list(TELEMETRY_FIELDS))
+
+SEQ, TIMESTAMP, RECEIVED = 0, 1, 2  # Columns of a slot before the sensor values
+
+
+class TelemetryStore:
+    """
+    Newest ROV sensor sample, written by one thread and read by any number without locks.
+
+    Two preallocated slots are written in turn; the store's seq says which one is
+    complete. A slot's first column is set to -1 while it is being rewritten and to its
+    seq when done, so a reader that copied a slot checks the column again afterwards and
+    retries if the writer came round to that slot in the meantime.
+    """
+
+    def __init__(self, fields=TELEMETRY_FIELDS):
+        self.fields = fields
+        self.slots = np.zeros((2, RECEIVED + 1 + len(fields)), dtype=np.float64)
+        self.seq = 0  # Number of samples written, 0 = none yet
+
+    def write(self, timestamp, values, received=None):
+        """Only ever called from one thread, the subscriber."""
+        seq = self.seq + 1
+        slot = self.slots[seq & 1]
+        slot[SEQ] = -1
+        slot[TIMESTAMP] = timestamp
+        slot[RECEIVED] = time.monotonic() if received is None else received
+        slot[RECEIVED + 1:] = values
+        slot[SEQ] = seq
+        self.seq = seq
+
+    def read(self, out=None):
+        """Copies the newest sample into `out` (a row like a slot) and returns it, None if there is none."""
+        if out is None:
+            out = np.empty(self.slots.shape[1], dtype=np.float64)
+        while True:
+            seq = self.seq
+            if seq == 0:
+                return None
+            slot = self.slots[seq & 1]
+            out[:] = slot
+            if slot[SEQ] == seq:
+                return out
+            # Overwritten while copying, the next sample is complete in the other slot
+
+    def latest(self, max_age=None):
+        """The newest sample as Telemetry, None if there is none or it is older than max_age seconds."""
+        row = self.read()
+        if row is None:
+            return None
+        if max_age is not None and time.monotonic() - row[RECEIVED] > max_age:
+            return None
+        return Telemetry(int(row[SEQ]), row[TIMESTAMP], row[RECEIVED], *row[RECEIVED + 1:].tolist())
+
+
+class TelemetrySubscriber:
+    """
+    Receives telemetry messages from .NET (PUB) and writes them to a TelemetryStore.
+
+    The .NET backend has no telemetry publisher yet (only ZmqCommunicationService's
+    PULL socket on 5006), so nothing is received unless one is started on the port,
+    e.g. the stand-in at the bottom of this file. main.py only starts the subscriber
+    with ROV_TELEMETRY=1.
+
+    The socket is only used and closed by the thread running receive_telemetry;
+    zmq sockets are not thread safe, so stop() asks that thread to finish instead.
+    """
+
+    def __init__(self,
+                 store: TelemetryStore,
+                 thread_watcher: ThreadWatcher,
+                 id: int,
+                 host="127.0.0.1",
+                 telemetry_port=5007):
+        self.store = store
+        self.context = zmq.Context()
+
+        self.sub_socket = self.context.socket(zmq.SUB)
+        self.sub_socket.setsockopt(zmq.CONFLATE, 1)  # Only the newest sample is of interest
+        self.sub_socket.setsockopt(zmq.LINGER, 0)
+        self.sub_socket.setsockopt(zmq.SUBSCRIBE, b"")
+        self.sub_socket.connect(f"tcp://{host}:{telemetry_port}")
+
+        self.thread_watcher = thread_watcher
+        self.id = id
+
+        self.received = 0
+        self.invalid = 0
+
+        self.stop_event = threading.Event()
+        self.closed = threading.Event()  # Set by the receiving thread once it closed the socket
+
+    def receive_telemetry(self):
+        try:
+            while self.thread_watcher.should_run(self.id) and not self.stop_event.is_set():
+                if not self.sub_socket.poll(POLL_TIMEOUT):
+                    continue
+                message = self.sub_socket.recv()
+                try:
+                    packet = decode_telemetry(message)
+                except ValueError as e:
+                    self.invalid += 1
+                    print(f"[TELEMETRY] Invalid message ({len(message)} bytes): {e}")
+                    continue
+                self.store.write(packet.timestamp, packet.values)
+                self.received += 1
+        finally:
+            self.sub_socket.close()
+            self.closed.set()
+
+    def stop(self, timeout=2 * POLL_TIMEOUT / 1000):
+        self.stop_event.set()
+        print(f"[TELEMETRY] Received {self.received}, invalid {self.invalid}")
+        if not self.closed.wait(timeout):
+            # term() would block on the open socket, it is closed when the process exits
+            print("[TELEMETRY] Receiver did not stop in time")
+            return
+        self.context.term()
+
+
+if __name__ == "__main__":
+    # Stand-in for the .NET telemetry publisher: a slowly turning, bobbing ROV
+    #   python telemetry.py [port] [rate_hz]
+    import sys
+
+    from rov_wire import encode_telemetry
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5007
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    context = zmq.Context()
+    pub = context.socket(zmq.PUB)
+    pub.bind(f"tcp://127.0.0.1:{port}")
+    print(f"[TELEMETRY] Publishing test telemetry on port {port} at {rate} Hz")
+    seq = 0
+    start = time.time()
+    try:
+        while True:
+            now = time.time()
+            t = now - start
+            values = [2.0 + 0.2 * math.sin(t / 4.0), (t * 3.0) % 360.0, 2.0 * math.sin(t), 1.0 * math.cos(t)]
+            seq += 1
+            pub.send(encode_telemetry(values, seq, now))
+            time.sleep(1.0 / rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pub.close()
+        context.term()
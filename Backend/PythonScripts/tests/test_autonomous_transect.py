@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+import pytest
+
+from camerafeed.Main_Classes.autonomous_transect_main import AutonomousTransect
+
+
+def pipe_frame(height=720, width=1280):
+    """Blue-grey floor with a vertical yellow pipe through the middle."""
+    frame = np.full((height, width, 3), (90, 60, 40), np.uint8)
+    cv2.rectangle(frame, (width // 2 - width // 40, 0), (width // 2 + width // 40, height), (0, 220, 240), -1)
+    return frame
+
+
+def test_camera_frame_is_not_drawn_on():
+    transect = AutonomousTransect()
+    frame = pipe_frame()
+    original = frame.copy()
+    for _ in range(3):  # Finds the pipeline, then tracks it
+        annotated, _, _, _, _ = transect.run(frame)
+    assert transect.pipeline_detected
+    assert np.array_equal(frame, original)
+    assert annotated is not frame
+    assert not np.array_equal(annotated, original)  # The copy carries the annotations
+
+
+@pytest.mark.parametrize("width, height", [(1280, 720), (640, 360)])
+@pytest.mark.parametrize("side, found", [(30, True), (20, False)])  # 900 px² and 400 px² at 1280x720
+def test_pipeline_size_thresholds_follow_resolution(width, height, side, found):
+    scale = width / 1280
+    frame = np.full((height, width, 3), (90, 60, 40), np.uint8)
+    x, y = width // 2, height // 2
+    size = int(side * scale)
+    cv2.rectangle(frame, (x, y), (x + size - 1, y + size - 1), (0, 220, 240), -1)
+    transect = AutonomousTransect()
+    transect.run(frame)
+    assert transect.pipeline_detected == found
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from camerafeed.buffer_pool import FramePool, FramePools
+
+
+def test_buffer_returns_after_last_release():
+    pool = FramePool((2, 2))
+    pooled = pool.acquire()
+    pooled.acquire()  # A second holder, e.g. the WebRTC track
+    pooled.release()
+    assert pool.free == []
+    pooled.release()
+    assert pool.free == [pooled]
+
+
+def test_released_buffer_is_reused():
+    pool = FramePool((2, 2))
+    first = pool.acquire()
+    first.release()
+    second = pool.acquire()
+    assert second is first
+    assert second.refs == 1
+    assert pool.stats()["allocated"] == 1
+    assert pool.stats()["reused"] == 1
+
+
+def test_over_release_raises():
+    pool = FramePool((2, 2))
+    pooled = pool.acquire()
+    pooled.release()
+    with pytest.raises(RuntimeError):
+        pooled.release()
+
+
+def test_free_list_is_bounded():
+    pool = FramePool((2, 2), max_free=2)
+    frames = [pool.acquire() for _ in range(3)]
+    for pooled in frames:
+        pooled.release()
+    assert len(pool.free) == 2
+
+
+def test_adopt_wraps_existing_array():
+    pool = FramePool((2, 3), dtype=np.uint8)
+    array = np.zeros((2, 3), np.uint8)
+    assert pool.matches(array)
+    pooled = pool.adopt(array)
+    assert pooled.array is array
+    pooled.release()
+    assert pool.acquire().array is array
+
+
+def test_pools_per_shape_and_dtype():
+    pools = FramePools()
+    assert pools.get((2, 2)) is pools.get([2, 2])
+    assert pools.get((2, 2)) is not pools.get((2, 2), np.float32)
+    assert pools.get((2, 2)) is not pools.get((3, 2))
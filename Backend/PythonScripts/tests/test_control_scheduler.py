@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from control_scheduler import ControlScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = ControlScheduler(lambda command, captured: None, hold=0.2, decay=0.5)
+    scheduler.update([10, -20, 0, 4], captured=1.0)
+    return scheduler
+
+
+def test_nothing_before_first_update():
+    scheduler = ControlScheduler(lambda command, captured: None)
+    assert scheduler.command_at(0.0) == (None, None)
+
+
+def test_command_held_unchanged(scheduler):
+    updated = scheduler.latest[2]
+    assert scheduler.command_at(updated + 0.2) == ([10, -20, 0, 4], 1.0)
+    assert scheduler.stale == 0
+
+
+def test_command_decays_linearly(scheduler):
+    updated = scheduler.latest[2]
+    command, captured = scheduler.command_at(updated + 0.45)  # Halfway through the decay
+    assert command == pytest.approx([5, -10, 0, 2])
+    assert captured == 1.0
+    assert scheduler.stale == 1
+
+
+def test_command_decays_to_zero(scheduler):
+    updated = scheduler.latest[2]
+    command, _ = scheduler.command_at(updated + 5.0)
+    assert command == [0, 0, 0, 0]
+
+
+def test_sends_latest_command_at_rate():
+    sent = []
+    done = threading.Event()
+
+    def send(command, captured):
+        sent.append(command)
+        if len(sent) >= 5:
+            done.set()
+
+    scheduler = ControlScheduler(send, rate_hz=100)
+    scheduler.start()
+    scheduler.update([1, 2, 3, 4])
+    try:
+        assert done.wait(2.0)
+    finally:
+        scheduler.stop()
+    assert sent[0] == [1, 2, 3, 4]
+    assert scheduler.stats()["ticks"] >= 5
+
+
+def test_slightly_late_tick_still_runs():
+    scheduler = ControlScheduler(lambda command, captured: None, rate_hz=50)  # 20 ms period
+    # Tick 0 ran, its send finished 1 ms into tick 1's slot
+    assert scheduler.next_tick(0, 0.021) == 1
+    assert scheduler.overruns == 0
+
+
+def test_missed_ticks_are_skipped():
+    scheduler = ControlScheduler(lambda command, captured: None, rate_hz=50)
+    # Tick 0 took until 1 ms into tick 3's slot: ticks 1 and 2 are skipped, 3 runs (late)
+    assert scheduler.next_tick(0, 0.061) == 3
+    assert scheduler.overruns == 2
@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+import pytest
+
+from frame_relay import Relay
+
+
+class CountingRelay(Relay):
+    def run(self):
+        for item in range(3):
+            self.publish(item)
+
+
+def test_relay_is_abstract():
+    with pytest.raises(TypeError):
+        Relay("Down", threading.Event(), None)
+
+
+def test_newest_item_replaces_undelivered_ones():
+    loop = asyncio.new_event_loop()
+    try:
+        relay = CountingRelay("Down", threading.Event(), loop)
+        subscription = relay.subscribe(depth=2)
+        relay.start().thread.join()
+        assert loop.run_until_complete(subscription.get()) == 2
+        assert (subscription.delivered, subscription.dropped) == (1, 2)
+        subscription.close()
+        assert not relay.has_subscribers.is_set()
+    finally:
+        loop.close()
@@ -0,0 +1,98 @@
+import queue
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRingBuffer
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRingBuffer("Test", slots=4, max_shape=(4, 6, 3))
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_put_get_in_order(ring):
+    for value in (1, 2, 3):
+        ring.put(frame(value), timestamp=float(value))
+    for value in (1, 2, 3):
+        view, seq, timestamp = ring.get_with_info(timeout=0)
+        assert seq == value
+        assert timestamp == float(value)
+        assert (view == value).all()
+    with pytest.raises(queue.Empty):
+        ring.get(block=False)
+
+
+def test_frame_shapes_per_slot(ring):
+    ring.put(frame(7, (2, 3)))
+    ring.put(frame(8, (4, 6, 3)))
+    assert ring.get(block=False).shape == (2, 3)
+    assert ring.get(block=False).shape == (4, 6, 3)
+
+
+def test_oversized_frame_is_dropped(ring):
+    assert ring.put(frame(1, (5, 6, 3))) is None
+    assert ring.put(frame(1, (5, 6, 3))) is None
+    assert ring.write_seq == 0
+    assert ring.rejected == 2
+
+
+def test_readers_keep_their_own_position(ring):
+    relay, mosaic = ring.reader(), ring.reader()
+    for value in (1, 2):
+        ring.put(frame(value))
+    assert relay.get_with_info(block=False)[1] == 1
+    assert relay.get_with_info(block=False)[1] == 2
+    assert mosaic.get_latest(block=False)[1] == 2  # Not taken by the other reader
+    assert ring.get_with_info(block=False)[1] == 1  # Nor from the ring's default reader
+    assert relay.empty() and mosaic.empty()
+    assert ring.qsize() == 1
+
+
+def test_new_reader_starts_at_next_frame(ring):
+    ring.put(frame(1))
+    reader = ring.reader()
+    assert reader.empty()
+    ring.put(frame(2))
+    assert reader.get_with_info(block=False)[1] == 2
+
+
+def test_wrap_around_skips_to_second_oldest(ring):
+    for value in range(1, 11):  # 10 frames into 4 slots
+        ring.put(frame(value))
+    # Slot of seq 7 is the next one put() overwrites, so a lagging reader resumes at 8
+    view, seq, _ = ring.get_with_info(block=False)
+    assert seq == 8
+    assert (view == 8).all()
+    assert [ring.get_with_info(block=False)[1] for _ in range(2)] == [9, 10]
+    assert ring.empty()
+
+
+def test_is_current_detects_overwrite(ring):
+    ring.put(frame(1))
+    view, seq, _ = ring.get_with_info(block=False)
+    assert ring.is_current(seq)
+    for value in range(2, 6):  # Comes round to seq 1's slot again
+        ring.put(frame(value))
+    assert not ring.is_current(seq)
+    assert (view == 5).all()  # The view now shows the newer frame
+
+
+def test_get_latest_and_peek(ring):
+    for value in range(1, 4):
+        ring.put(frame(value))
+    _, seq, _ = ring.peek_latest()
+    assert seq == 3
+    assert ring.qsize() == 3  # peek_latest() does not move the reader
+    _, seq, _ = ring.get_latest(block=False)
+    assert seq == 3
+    assert ring.empty()
+    with pytest.raises(queue.Empty):
+        ring.get_latest(timeout=0.01)
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from camerafeed.frame_sources import CAMERA_SOURCES, FrameSource, open_source, set_camera_source
+
+
+@pytest.fixture
+def source_for():
+    opened = []
+
+    def open_with(spec, profile=None):
+        set_camera_source("Test", spec)
+        source = open_source("Test", profile=profile)
+        opened.append(source)
+        return source
+    yield open_with
+    for source in opened:
+        source.release()
+    CAMERA_SOURCES.pop("Test", None)
+
+
+def test_frame_source_is_abstract():
+    with pytest.raises(TypeError):
+        FrameSource()
+
+
+def test_replayed_source_follows_the_pipeline_profile(source_for):
+    source = source_for("synthetic:pipe?fps=0&size=1280x720", "pipeline")
+    assert (source.get(cv2.CAP_PROP_FRAME_WIDTH), source.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (640, 360)
+    ok, frame = source.read()
+    assert ok and frame.shape == (360, 640, 3)
+
+    buffer = np.empty_like(frame)
+    ok, frame = source.read(buffer)
+    assert frame is buffer  # Pooled buffers are filled in place
+
+
+def test_replayed_source_follows_the_stereo_profile(source_for, tmp_path):
+    for index in range(2):
+        cv2.imwrite(str(tmp_path / f"{index}.png"), np.full((48, 64, 3), 50 * index, np.uint8))
+    source = source_for(f"images:{tmp_path}?fps=0", "stereo")
+    for _ in range(3):
+        ok, frame = source.read()
+        assert ok and frame.shape == (48, 64) and frame.dtype == np.uint8
+
+
+def test_display_profile_keeps_the_source(source_for):
+    source = source_for("synthetic:pallet?fps=0&size=320x240")
+    ok, frame = source.read()
+    assert ok and frame.shape == (240, 320, 3)
@@ -0,0 +1,25 @@
+from overlay_bus import OverlayBus
+
+
+def test_video_is_annotated_unless_every_viewer_draws():
+    bus = OverlayBus(client_side=True)
+    assert not bus.clean_video  # No viewers
+    bus.set_viewers(2, 1)
+    assert not bus.clean_video  # One viewer only sees the video
+    bus.set_viewers(2, 2)
+    assert bus.clean_video
+
+
+def test_server_side_drawing_by_default():
+    bus = OverlayBus()
+    bus.set_viewers(1, 1)
+    assert not bus.clean_video
+
+
+def test_publish_reaches_listeners():
+    bus = OverlayBus()
+    messages = []
+    bus.add_listener(messages.append)
+    bus.publish("Manipulator", None, 1.0, {"drive": [0, 0, 0, 0]})  # Frame not streamed
+    bus.publish("Manipulator", 7, 1.0, {"drive": [0, 0, 0, 0]})
+    assert messages == [{"drive": [0, 0, 0, 0], "camera": "Manipulator", "seq": 7, "timestamp": 1.0}]
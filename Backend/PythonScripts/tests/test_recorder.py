@@ -0,0 +1,27 @@
+import numpy as np
+
+from camerafeed.recorder import CameraRecorder, recorder_max_shape
+
+
+class FakeCamera:
+    def __init__(self, name, frame=None):
+        self.name = name
+        self.frame = frame
+
+
+def test_ring_fits_frames_larger_than_the_current_profile():
+    pipeline = np.zeros((360, 640, 3), np.uint8)  # Started while the camera ran the pipeline profile
+    assert recorder_max_shape("Down", pipeline) == (720, 1280, 3)
+    assert recorder_max_shape("Down", np.zeros((1080, 1920), np.uint8)) == (1080, 1920, 3)
+
+
+def test_oversized_frames_are_counted_as_dropped(tmp_path):
+    recorder = CameraRecorder(FakeCamera("Down", np.zeros((360, 640, 3), np.uint8)), str(tmp_path), slots=2)
+    try:
+        recorder.on_frame(np.zeros((720, 1280, 3), np.uint8), 1, 0.0)  # Back on the display profile
+        assert recorder.ring.write_seq == 1
+        recorder.on_frame(np.zeros((1080, 1920, 3), np.uint8), 2, 0.1)
+        assert recorder.report()["dropped"] == 1
+    finally:
+        recorder.ring.close()
+        recorder.ring.unlink()
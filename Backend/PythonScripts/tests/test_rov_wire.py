@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from rov_wire import AUTONOMY_STRUCT, WIRE_VERSION, MSG_AUTONOMY, decode, encode_autonomy, encode_autonomy_json
+
+
+def test_autonomy_binary_round_trip():
+    data = encode_autonomy([1.4, -2.6, 0, 40000, 99], seq=7, timestamp=1234.5)
+    assert len(data) == AUTONOMY_STRUCT.size == 24
+    packet = decode(data)
+    assert packet.seq == 7
+    assert packet.timestamp == 1234.5
+    assert packet.axes == [1, -3, 0, 32767]  # Rounded, clamped to int16, only four axes
+
+
+def test_seq_wraps_around():
+    assert decode(encode_autonomy([0, 0, 0, 0], seq=2 ** 32 + 5)).seq == 5
+
+
+def test_json_is_sniffed():
+    data = encode_autonomy_json([1, 2, 3, 4])
+    assert json.loads(data) == {"autonom_data": [1, 2, 3, 4]}
+    packet = decode(data)
+    assert packet.seq is None
+    assert packet.axes == [1, 2, 3, 4]
+
+
+def test_json_with_too_few_axes():
+    with pytest.raises(ValueError):
+        decode(b'{"autonom_data": [1, 2]}')
+
+
+@pytest.mark.parametrize("data", [b"", b"\x01" * 23, b"\x01" * 25])
+def test_autonomy_bad_size(data):
+    with pytest.raises(ValueError):
+        decode(data)
+
+
+def test_autonomy_wrong_version_or_type():
+    with pytest.raises(ValueError):
+        decode(AUTONOMY_STRUCT.pack(WIRE_VERSION + 1, MSG_AUTONOMY, 0, 0, 0.0, 0, 0, 0, 0))
+    with pytest.raises(ValueError):
+        decode(AUTONOMY_STRUCT.pack(WIRE_VERSION, MSG_AUTONOMY + 1, 0, 0, 0.0, 0, 0, 0, 0))
+
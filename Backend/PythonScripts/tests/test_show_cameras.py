@@ -0,0 +1,60 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from camerafeed.GUI_Camerafeed_Main import ExecutionClass
+from frame_ring import FrameRingBuffer
+from mode_registry import CAMERA_ORDER, MODE_ALL_CAMERAS
+
+
+class FakeCamera:
+    def __init__(self, name, stalled=False):
+        self.name = name
+        self.stalled = stalled
+        self.frame = np.zeros((4, 6, 3), np.uint8)
+
+    def get_frame(self, wait_for_new=True, timeout=1.0):
+        if self.stalled:
+            time.sleep(timeout)  # No frame arrives before the timeout
+            return None
+        time.sleep(0.01)
+        return self.frame
+
+
+class FakeCameraManager:
+    def __init__(self, cameras):
+        self.cameras = {cam.name: cam for cam in cameras}
+
+    def apply_mode(self, mode, idle="close"):
+        pass
+
+    def camera(self, name):
+        return self.cameras.get(name)
+
+
+@pytest.fixture
+def rings():
+    rings = [FrameRingBuffer(f"Show{name}", max_shape=(4, 6, 3)) for name in CAMERA_ORDER]
+    yield rings
+    for ring in rings:
+        ring.close()
+        ring.unlink()
+
+
+def test_stalled_camera_does_not_hold_up_the_others(rings, monkeypatch):
+    monkeypatch.setattr(cv2, "waitKey", lambda delay: -1)  # No HighGUI in headless OpenCV builds
+    execution = ExecutionClass(None, *rings, manual_flag=None)
+    execution.Camera = FakeCameraManager(
+        [FakeCamera(name, stalled=(name == "StereoL")) for name in CAMERA_ORDER])
+    thread = threading.Thread(target=execution.show_all_cameras, args=(MODE_ALL_CAMERAS,))
+    thread.start()
+    time.sleep(0.5)
+    execution.done = True
+    thread.join(timeout=3.0)
+
+    written = {name: ring.write_seq for name, ring in zip(CAMERA_ORDER, rings)}
+    assert written["StereoL"] == 0
+    assert all(count >= 10 for name, count in written.items() if name != "StereoL")
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from stream_adaptation import MIN_BITRATE, QUALITY_LEVELS, TrackAdapter, level_bitrate, split_budget
+
+FRAME_SIZE = (720, 1280)
+
+
+def report(sent, lost, rtt=0.05):
+    return {
+        "out": SimpleNamespace(type="outbound-rtp", packetsSent=sent),
+        "in": SimpleNamespace(type="remote-inbound-rtp", packetsLost=lost, roundTripTime=rtt),
+    }
+
+
+@pytest.mark.parametrize("budget, floors, expected", [
+    (2000000, [500000, 500000], [1000000, 1000000]),
+    (800000, [500000, 500000], [800000, None]),  # Two shares of 400k would be raised to 500k
+    (900000, [250000, 500000], [900000, None]),
+    (100000, [250000], [None]),
+    (1000000, [], []),
+])
+def test_split_budget(budget, floors, expected):
+    assert split_budget(budget, floors) == expected
+
+
+def test_split_budget_never_exceeds_budget():
+    for budget in range(0, 3000000, 50000):
+        shares = split_budget(budget, [500000, 250000, 500000])
+        assert sum(share for share in shares if share is not None) <= budget
+
+
+def test_level_bitrates_decrease():
+    rates = [level_bitrate(level, FRAME_SIZE) for level in range(len(QUALITY_LEVELS))]
+    assert rates == sorted(rates, reverse=True)
+
+
+def test_choose_best_level_that_fits():
+    adapter = TrackAdapter()
+    scale, fps, bitrate = adapter.choose(600000, FRAME_SIZE, now=adapter.good_since)
+    assert adapter.level == 2
+    assert (scale, fps) == QUALITY_LEVELS[2]
+    assert bitrate == 600000  # Headroom is capped by the allowance
+
+
+def test_choose_respects_remb_estimate():
+    adapter = TrackAdapter()
+    adapter.update({}, remb=300000, now=adapter.good_since)
+    _, _, bitrate = adapter.choose(3000000, FRAME_SIZE, now=adapter.good_since)
+    assert level_bitrate(adapter.level, FRAME_SIZE) <= 300000
+    assert bitrate <= 300000
+
+
+def test_choose_bitrate_floor():
+    adapter = TrackAdapter()
+    adapter.choose(3000000, (90, 160), now=adapter.good_since)
+    assert adapter.bitrate == MIN_BITRATE
+
+
+def test_loss_steps_down_one_level():
+    adapter = TrackAdapter()
+    start = adapter.good_since
+    adapter.choose(3000000, FRAME_SIZE, now=start)
+    assert adapter.level == 0
+    adapter.update(report(100, 0), now=start)
+    adapter.update(report(200, 20), now=start)  # 20 of 100 packets lost
+    assert adapter.loss == pytest.approx(0.2)
+    adapter.choose(3000000, FRAME_SIZE, now=start)
+    assert adapter.level == 1
+
+
+def test_upgrade_waits_for_hold_and_goes_one_step():
+    adapter = TrackAdapter()
+    start = adapter.good_since
+    adapter.choose(600000, FRAME_SIZE, now=start)
+    assert adapter.level == 2
+    adapter.choose(3000000, FRAME_SIZE, now=start + 1.0)
+    assert adapter.level == 2  # Bandwidth is back, but not for long enough
+    adapter.choose(3000000, FRAME_SIZE, now=start + 4.0)
+    assert adapter.level == 1
+    adapter.choose(3000000, FRAME_SIZE, now=start + 5.0)
+    assert adapter.level == 1  # Holds again before the next step
+    adapter.choose(3000000, FRAME_SIZE, now=start + 8.0)
+    assert adapter.level == 0
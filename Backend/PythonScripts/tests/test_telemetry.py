@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+import zmq
+
+from rov_wire import (
+    TELEMETRY_STRUCT, WIRE_VERSION, MSG_AUTONOMY, decode_telemetry, encode_autonomy, encode_telemetry)
+from telemetry import TelemetryStore, TelemetrySubscriber
+from Thread_info import ThreadWatcher
+
+
+def test_telemetry_round_trip():
+    data = encode_telemetry([2.5, 270.0, -1.5, 0.25], seq=3, timestamp=99.0)
+    assert len(data) == TELEMETRY_STRUCT.size == 32
+    packet = decode_telemetry(data)
+    assert (packet.seq, packet.timestamp) == (3, 99.0)
+    assert packet.values == pytest.approx([2.5, 270.0, -1.5, 0.25])
+
+
+def test_telemetry_rejects_other_messages():
+    with pytest.raises(ValueError):
+        decode_telemetry(encode_autonomy([0, 0, 0, 0]))  # Wrong size
+    with pytest.raises(ValueError):
+        decode_telemetry(TELEMETRY_STRUCT.pack(WIRE_VERSION, MSG_AUTONOMY, 0, 0, 0.0, 0, 0, 0, 0))
+
+
+def test_empty_store():
+    store = TelemetryStore()
+    assert store.read() is None
+    assert store.latest() is None
+
+
+def test_latest_sample():
+    store = TelemetryStore()
+    store.write(10.0, [1.0, 90.0, 0.5, -0.5], received=100.0)
+    store.write(11.0, [2.0, 180.0, 1.5, -1.5])
+    sample = store.latest()
+    assert sample.seq == 2
+    assert sample.timestamp == 11.0
+    assert (sample.depth, sample.heading, sample.roll, sample.pitch) == (2.0, 180.0, 1.5, -1.5)
+
+
+def test_max_age():
+    store = TelemetryStore()
+    store.write(10.0, [1.0, 90.0, 0.0, 0.0], received=0.0)  # Received long ago
+    assert store.latest() is not None
+    assert store.latest(max_age=0.5) is None
+
+
+def test_reads_are_never_torn():
+    store = TelemetryStore()
+    stop = threading.Event()
+
+    def writer():
+        value = 0.0
+        while not stop.is_set():
+            value += 1.0
+            store.write(value, [value] * 4)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            row = store.read()
+            if row is not None:
+                assert (row[3:] == row[1]).all()  # Every value from the same write as the timestamp
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_subscriber_closes_its_socket_on_stop():
+    context = zmq.Context()
+    pub = context.socket(zmq.PUB)
+    port = pub.bind_to_random_port("tcp://127.0.0.1")
+    watcher = ThreadWatcher()
+    store = TelemetryStore()
+    subscriber = TelemetrySubscriber(store, watcher, watcher.add_thread(), telemetry_port=port)
+    thread = threading.Thread(target=subscriber.receive_telemetry)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while store.seq == 0 and time.monotonic() < deadline:
+            pub.send(encode_telemetry([1.0, 90.0, 0.0, 0.0], seq=1, timestamp=1.0))  # Until the SUB has joined
+            time.sleep(0.05)
+        assert store.latest().depth == 1.0
+    finally:
+        subscriber.stop()
+        thread.join(timeout=2.0)
+        pub.close()
+        context.term()
+    assert not thread.is_alive()
+    assert subscriber.sub_socket.closed
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import multiprocessing
+
+import pytest
+from aiortc import RTCPeerConnection
+
+from frame_ring import FrameRingBuffer
+from mode_registry import CAMERA_ORDER
+from WebRTC import WebRTCServer
+
+
+class OfferRequest:
+    def __init__(self, description):
+        self.description = description
+
+    async def json(self):
+        return {"sdp": self.description.sdp, "type": self.description.type}
+
+
+def answer_mapping(server, response):
+    """(mid, camera) per video m-line of the answer, in m-line order."""
+    answer = json.loads(response.body)
+    tracks = {track.id: track.camera for track in server.peers[answer["peer"]]}
+    mapping = []
+    mid = None
+    for line in answer["sdp"].splitlines():
+        if line.startswith("a=mid:"):
+            mid = line.split(":", 1)[1]
+        elif line.startswith("a=msid:"):
+            mapping.append((mid, tracks[line.split()[-1]]))
+    return answer, mapping
+
+
+def negotiate(rings, sections=4, **options):
+    """Answers an offer like the frontend's (`sections` recvonly video transceivers), returns (answer, mapping)."""
+    async def run():
+        server = WebRTCServer(rings, multiprocessing.Value("i", 0), **options)
+        server.start_relays()
+        client = RTCPeerConnection()
+        try:
+            for _ in range(sections):
+                client.addTransceiver("video", direction="recvonly")
+            await client.setLocalDescription(await client.createOffer())
+            response = await server.handle_peerjs_offer(OfferRequest(client.localDescription))
+            assert response.status == 200
+            return answer_mapping(server, response)
+        finally:
+            await client.close()
+            for pc in list(server.pcs):
+                await pc.close()
+            for relay in server.relays + [server.mosaic_relay]:
+                relay.stop()
+            server.snapshots.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def rings():
+    rings = [FrameRingBuffer(f"Offer{name}", slots=2, max_shape=(4, 4, 3)) for name in CAMERA_ORDER]
+    yield rings
+    for ring in rings:
+        ring.close()
+        ring.unlink()
+
+
+@pytest.mark.parametrize("options", [{}, {"encode_once": True}])
+def test_mline_i_carries_camera_i(rings, options):
+    answer, mapping = negotiate(rings, **options)
+    assert mapping == [(str(i), name) for i, name in enumerate(CAMERA_ORDER)]
+    if options.get("encode_once"):
+        rtpmaps = [line for line in answer["sdp"].splitlines() if line.startswith("a=rtpmap:")]
+        assert rtpmaps and all("H264" in line or "rtx" in line for line in rtpmaps)
+
+
+def test_fifth_section_carries_mosaic(rings):
+    _, mapping = negotiate(rings, sections=5)
+    assert mapping == [(str(i), name) for i, name in enumerate(CAMERA_ORDER + ("Mosaic",))]
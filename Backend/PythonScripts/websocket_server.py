@@ -1,16 +1,16 @@
 import asyncio
 import websockets
 import json
-import queue
+import time
 from Thread_info import ThreadWatcher
 
 class WebSocketServer:
     def __init__(
             self,
-            command_queue: queue.Queue, 
+            dispatch,
             thread_watcher: ThreadWatcher, 
             id: int):
-        self.command_queue = command_queue
+        self.dispatch = dispatch  # dispatch(command) -> Future of (mode, error), e.g. TaskManager.submit
         self.thread_watcher = thread_watcher
         self.id = id
         self.websocket = None  # Store reference to the active websocket connection
@@ -26,12 +26,12 @@ class WebSocketServer:
             while self.thread_watcher.should_run(self.id):
                 # Continuously listen for messages from the client
                 message = await websocket.recv()  # Non-blocking wait for message
-                self.on_message(message)  # Process incoming message
+                self.on_message(message, websocket)  # Process incoming message
 
         except websockets.exceptions.ConnectionClosed:
             print("[WEBSOCKET] Frontend disconnected")
 
-    def on_message(self, message):
+    def on_message(self, message, websocket=None):
         """Handles an incoming message from the WebSocket."""
         try:
             data = json.loads(message)
@@ -39,12 +39,30 @@ class WebSocketServer:
 
             if command:
                 print(f"[WEBSOCKET] Received command: {command}")
-                self.command_queue.put(command)  # Place command in queue
+                # Acknowledged when done, the connection keeps receiving in the meantime
+                asyncio.ensure_future(self.run_command(command, websocket))
             else:
                 print("[WEBSOCKET] Invalid message format, missing 'command'.")
         except json.JSONDecodeError:
             print("[WEBSOCKET] Failed to parse JSON message.")
 
+    async def run_command(self, command, websocket):
+        """Hands the command to the task manager and acknowledges it with the resulting mode."""
+        start = time.perf_counter()
+        ack = {"type": "ack", "command": command}
+        ack["mode"], error = await asyncio.wrap_future(self.dispatch(command))
+        if error is not None:
+            ack["error"] = error
+        ack["elapsed_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        print(f"[WEBSOCKET] {ack}")
+
+        if websocket is None:
+            return
+        try:
+            await websocket.send(json.dumps(ack))
+        except websockets.exceptions.ConnectionClosed:
+            pass  # The sender went away, the command ran anyway
+
     async def start_server(self):
         """Starts the WebSocket server and listens for incoming connections."""
         try:
@@ -11,6 +11,7 @@ const WebRTCStream = () => {
   const Track1 = useRef<HTMLVideoElement | null>(null);
   const Track2 = useRef<HTMLVideoElement | null>(null);
   const Track3 = useRef<HTMLVideoElement | null>(null);
+  const Track4 = useRef<HTMLVideoElement | null>(null); // Mosaic: all cameras of the mode in one track
 
   useEffect(() => {
     console.log('WebRTC Component Mounted');
@@ -40,7 +41,8 @@ const WebRTCStream = () => {
     // Create a connection to the backend and exchange SDP offer/answer
     const pc = new RTCPeerConnection();
 
-    for (let i = 0; i < 4; i++) {
+    // One section per camera, the fifth carries the mosaic track
+    for (let i = 0; i < 5; i++) {
       pc.addTransceiver('video', {
         direction: 'recvonly',
         sendEncodings: [
@@ -72,6 +74,9 @@ const WebRTCStream = () => {
         } else if (!Track3.current.srcObject) {
           Track3.current.srcObject = stream;
           addMuteUnmuteEventListener(event.track, 3);
+        } else if (!Track4.current.srcObject) {
+          Track4.current.srcObject = stream;
+          addMuteUnmuteEventListener(event.track, 4);
         }
       }
     };
@@ -134,16 +139,18 @@ const WebRTCStream = () => {
       else if (trackIndex == 1) Track1.current.style.display = 'none';
       else if (trackIndex == 2) Track2.current.style.display = 'none';
       else if (trackIndex == 3) Track3.current.style.display = 'none';
+      else if (trackIndex == 4) Track4.current.style.display = 'none';
       console.log('Track received(muted):', track.kind, track.muted);
     });
     // On a unmute event the style of the Video element is set to inline-block, making it visible.
     track.addEventListener('unmute', () => {
       console.log(`Track ${trackIndex} unmuted`);
-      setUnmutedTracksCount((prevCount) => Math.min(prevCount + 1, 4)); // Increase unmuted count
+      setUnmutedTracksCount((prevCount) => Math.min(prevCount + 1, 5)); // Increase unmuted count
       if (trackIndex == 0) Track0.current.style.display = 'inline-block';
       else if (trackIndex == 1) Track1.current.style.display = 'inline-block';
       else if (trackIndex == 2) Track2.current.style.display = 'inline-block';
       else if (trackIndex == 3) Track3.current.style.display = 'inline-block';
+      else if (trackIndex == 4) Track4.current.style.display = 'inline-block';
       console.log('Track received (unmuted):', track.kind, track.muted);
     });
   };
@@ -172,13 +179,13 @@ const WebRTCStream = () => {
         width: '100vw',
       }; // 3 videos: 2 on top, 1 on bottom
     }
-    if (unmutedTracksCount === 4) {
+    if (unmutedTracksCount >= 4) {
       return {
         gridTemplateColumns: '1fr 1fr',
         gridTemplateRows: '1fr 1fr',
         height: '50vh',
         width: '100vw',
-      }; // 4 videos: 2x2 grid
+      }; // 4 videos: 2x2 grid (5 only while switching to or from the mosaic)
     }
     return {};
   };
@@ -248,6 +255,7 @@ const WebRTCStream = () => {
         <video ref={Track1} autoPlay playsInline style={{ objectFit: 'cover' }} />
         <video ref={Track2} autoPlay playsInline style={{ objectFit: 'cover' }} />
         <video ref={Track3} autoPlay playsInline style={{ objectFit: 'cover' }} />
+        <video ref={Track4} autoPlay playsInline style={{ objectFit: 'contain' }} />
       </div>
     </div>
   );